@@ -1,24 +1,255 @@
-from smbus2 import SMBus # type: ignore
+from statistics import median
+from time import perf_counter
+from typing import Callable, Mapping, NamedTuple
+from smbus2 import SMBus, i2c_msg # type: ignore
 from . import constants
 
+class Channel(NamedTuple):
+    """A configured ADC input and its calibration.
+
+    The value reported for a channel is `raw * scale + offset`.
+
+    Attributes:
+        name (str): Name the reading is reported under.
+        channel (int): ADC channel number (0-7).
+        differential (bool): Whether the channel is read differentially against its pair.
+        scale (float): Multiplier applied to the raw value.
+        offset (float): Added to the scaled value.
+    """
+
+    name: str
+    channel: int
+    differential: bool = False
+    scale: float = 1.0
+    offset: float = 0.0
+
+
+def command_byte(channel: int, differential: bool = False, power_down: int = constants.PowerDown.REF_ON_ADC_ON) -> int:
+    """Build the command byte that selects a channel.
+
+    Args:
+        channel (int): ADC channel number (0-7)
+        differential (bool): Read the channel pair differentially instead of single-ended
+        power_down (int): Power management mode (default: REF_ON_ADC_ON)
+
+    Returns:
+        int: The command byte to write to the device
+
+    Raises:
+        ValueError: If channel number is invalid
+    """
+
+    if not 0 <= channel <= 7:
+        raise ValueError("Invalid channel. Channel must be between 0 and 7.")
+
+    if differential:
+        command: int = constants.DIFF_CH0_CH1 + (channel // 2)
+    elif channel % 2 == 0:
+        command: int = constants.SINGLE_CH0 + (channel // 2)
+    else:
+        command: int = constants.SINGLE_CH1 + ((channel - 1) // 2)
+
+    command <<= 4                       # Move the channel info into bits 7–4
+    command |= (power_down << 2)        # Set power-down bits in bits 3–2
+    return command
+
+def trimmed_mean(samples: list[int], trim: float = 0.1) -> float:
+    """Mean of the samples after dropping the `trim` fraction from each end."""
+
+    samples = sorted(samples)
+    cut = int(len(samples) * trim)
+    if cut and len(samples) > 2 * cut:
+        samples = samples[cut:-cut]
+    return sum(samples) / len(samples)
+
+# Ways of reducing a burst of samples to one value
+REDUCERS: dict[str, Callable[[list[int], float], float]] = {
+    "mean": lambda samples, trim: sum(samples) / len(samples),
+    "median": lambda samples, trim: median(samples),
+    "trimmed": trimmed_mean,
+}
+
+def check_oversampling(oversample: int, reducer: str, trim: float) -> None:
+    """Check the oversampling settings of a reader.
+
+    Raises:
+        ValueError: If `oversample` is less than 1, `reducer` is unknown or `trim` isn't in [0, 0.5).
+    """
+
+    if oversample < 1:
+        raise ValueError("oversample must be at least 1.")
+    if reducer not in REDUCERS:
+        raise ValueError(f"Unknown reducer `{reducer}`. Must be one of: {', '.join(REDUCERS)}.")
+    if not 0 <= trim < 0.5:
+        raise ValueError("trim must be at least 0 and less than 0.5.")
+
+def parse_channels(section: Mapping[str, str]) -> list[Channel]:
+    """Read the channel list from a `[sensors.ads7830]` config section.
+
+    Each channel is a `channel.<name>` key holding the channel number, with
+    `diff` in front of it for a differential read. Optional `scale.<name>`
+    and `offset.<name>` keys set its calibration. For example:
+
+        channel.wind_vane = 0
+        scale.wind_vane = 1.41176
+        channel.rain = diff 2
+
+    Returns:
+        list[Channel]: The configured channels, in the order they appear.
+
+    Raises:
+        ValueError: If a channel definition can't be parsed, or its channel isn't 0-7.
+    """
+
+    channels = []
+    for key, value in section.items():
+        if not key.startswith("channel."):
+            continue
+
+        name = key.removeprefix("channel.")
+        parts = value.split()
+        if len(parts) == 2 and parts[0] == "diff":
+            differential, number = True, parts[1]
+        elif len(parts) == 1:
+            differential, number = False, parts[0]
+        else:
+            raise ValueError(f"Invalid channel definition `{key} = {value}`.")
+        if not 0 <= int(number) <= 7:
+            raise ValueError(f"Invalid channel `{key} = {value}`. Channel must be between 0 and 7.")
+
+        channels.append(Channel(
+            name=name,
+            channel=int(number),
+            differential=differential,
+            scale=float(section.get(f"scale.{name}", 1.0)),
+            offset=float(section.get(f"offset.{name}", 0.0)),
+        ))
+    return channels
+
+
 class ADS7830Reader:
     """ADS7830 Analog-to-Digital Converter (ADC) Reader.
 
     This class provides an interface to read analog values from the ADS7830 ADC chip
-    over I2C communication.
+    over I2C communication. `get_readings` scans every configured channel in a
+    single combined I2C transaction and returns calibrated values.
+
+    With `oversample` above 1, each channel is converted that many times back
+    to back in the same transaction and the burst is reduced to one value with
+    the chosen reducer. Averaging the samples also gives values between the
+    8-bit steps. The achieved rate is reported as `sample_rate` (conversions
+    per second).
 
     Attributes:
         i2c_addr (int): The I2C address of the ADS7830 device
-        bus (SMBus): SMBus object for I2C communication
+        bus (SMBus): SMBus object for I2C communication (may be a shared bus)
+        bus_number (int): The I2C bus number
+        channels (list[Channel]): The channels read by `get_readings`
+        oversample (int): Number of conversions per channel in each scan
+        sample_rate (float): Conversions per second achieved by the last scan
+
+    Raises:
+        ValueError: If `oversample` is less than 1, `reducer` is unknown or `trim` isn't in [0, 0.5)
 
     Args:
-        i2c_addr (int): I2C address of the device (default: constants.ADS7830_I2C_ADDR)
-        bus_num (int): I2C bus number to use (default: 2)
+        bus_number (int): I2C bus number to use (default: 2)
+        device_address (int): I2C address of the device (default: constants.ADS7830_I2C_ADDR)
+        channels (list[Channel], optional): Channels to scan. If omitted, all 8 channels are read single-ended.
+        oversample (int): Conversions per channel in each scan (default: 1)
+        reducer (str): How to reduce a burst: `mean`, `median` or `trimmed` (default: mean)
+        trim (float): Fraction dropped from each end of a burst by the `trimmed` reducer (default: 0.1)
+        bus (SMBus, optional): Bus handle to use, e.g. a shared bus. If omitted, opens its own.
     """
 
-    def __init__(self, bus_number: int = 2, device_address: int = 0x48) -> None:
+    BUS = "i2c"
+
+    def __init__(self, bus_number: int = 2, device_address: int = constants.ADS7830_I2C_ADDR,
+                 channels: list[Channel] | None = None, oversample: int = 1, reducer: str = "mean",
+                 trim: float = 0.1, bus=None) -> None:
+        check_oversampling(oversample, reducer, trim)
+
         self.i2c_addr = device_address
-        self.bus = SMBus(bus_number)
+        self.bus_number = bus_number
+        self.bus = SMBus(bus_number) if bus is None else bus
+        self.channels: list[Channel] = channels or [Channel(f"ch{n}", n) for n in range(8)]
+        self.oversample: int = oversample
+        self.sample_rate: float = 0.0
+        self._reduce = REDUCERS[reducer]
+        self._trim: float = trim
+
+        self._prepare_scan()
+
+    @staticmethod
+    def options_from_config(section: Mapping[str, str]) -> dict:
+        """Return the constructor arguments set in the sensor's config section.
+
+        Raises:
+            ValueError: If a setting can't be parsed or is out of range.
+        """
+
+        options = {
+            "channels": parse_channels(section) or None,
+            "oversample": int(section.get("oversample", 1)),
+            "reducer": section.get("reducer", "mean"),
+            "trim": float(section.get("trim", 0.1)),
+        }
+        check_oversampling(options["oversample"], options["reducer"], options["trim"])
+        return options
+
+    def _prepare_scan(self) -> None:
+        """Build the I2C messages for a full scan once, so each scan only has to send them.
+
+        Each conversion is a command byte write followed by a one byte read,
+        repeated `oversample` times per channel. The messages are split into
+        batches that fit in a single `I2C_RDWR` call.
+        """
+
+        messages = []
+        self._results: list[list[i2c_msg]] = []
+        for channel in self.channels:
+            command = i2c_msg.write(self.i2c_addr, [command_byte(channel.channel, channel.differential)])
+            results = [i2c_msg.read(self.i2c_addr, 1) for _ in range(self.oversample)]
+            for result in results:
+                messages += [command, result]
+            self._results.append(results)
+
+        step = constants.I2C_RDWR_MAX_MSGS - constants.I2C_RDWR_MAX_MSGS % 2
+        self._batches: list[list[i2c_msg]] = [messages[i:i + step] for i in range(0, len(messages), step)]
+
+    def get_readings(self) -> dict:
+        """Scan every configured channel and return the calibrated values.
+
+        Returns:
+            dict: The value of each channel, keyed by channel name. When
+            oversampling, also `sample_rate` in conversions per second.
+
+        Raises:
+            RuntimeError: If I2C communication fails
+        """
+
+        start = perf_counter()
+        try:
+            for batch in self._batches:
+                self.bus.i2c_rdwr(*batch)
+        except Exception as e:
+            raise RuntimeError(f"I2C Read error: {e}") from e
+        elapsed = perf_counter() - start
+
+        if elapsed > 0:
+            self.sample_rate = len(self.channels) * self.oversample / elapsed
+
+        if self.oversample == 1:
+            return {
+                channel.name: ord(results[0].buf[0]) * channel.scale + channel.offset
+                for channel, results in zip(self.channels, self._results)
+            }
+
+        readings = {
+            channel.name: self._reduce([ord(result.buf[0]) for result in results], self._trim) * channel.scale + channel.offset
+            for channel, results in zip(self.channels, self._results)
+        }
+        readings["sample_rate"] = self.sample_rate
+        return readings
 
     def read_adc_single(self, channel: int, power_down=constants.PowerDown.REF_ON_ADC_ON) -> int:
         """Read a single-ended analog value from the specified channel.
@@ -37,16 +268,7 @@ class ADS7830Reader:
             RuntimeError: If I2C communication fails
         """
 
-        if channel > 7:
-            raise ValueError("Invalid channel. Channel must be between 0 and 7.")
-
-        if channel % 2 == 0:
-            command: int = constants.SINGLE_CH0 + (channel // 2)
-        else:
-            command: int = constants.SINGLE_CH1 + ((channel - 1) // 2)
-
-        command <<= 4                       # Move the channel info into bits 7–4
-        command |= (power_down << 2)        # Set power-down bits in bits 3–2
+        command: int = command_byte(channel, power_down=power_down)
 
         try:
             self.bus.write_byte(self.i2c_addr, command)
@@ -75,16 +297,7 @@ class ADS7830Reader:
             RuntimeError: If I2C communication fails
         """
 
-        if channel > 7:
-            raise ValueError("Invalid channel. Channel must be between 0 and 7.")
-
-        if channel % 2 == 0:
-            command: int = constants.DIFF_CH0_CH1 + (channel // 2)
-        else:
-            command: int = constants.DIFF_CH0_CH1 + ((channel - 1) // 2)
-
-        command <<= 4
-        command |= (power_down << 2)
+        command: int = command_byte(channel, differential=True, power_down=power_down)
 
         try:
             self.bus.write_byte(self.i2c_addr, command)
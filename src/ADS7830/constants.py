@@ -1,6 +1,9 @@
 # Default I2C Address
 ADS7830_I2C_ADDR: int = 0x48
 
+# Most messages the kernel accepts in a single I2C_RDWR ioctl
+I2C_RDWR_MAX_MSGS: int = 42
+
 # Power-Down Selection Enum
 class PowerDown:
     BETWEEN_CONVERSIONS: int = 0x00
@@ -1,11 +1,17 @@
 # /// script
 # dependencies = [
-#   "bme680",
+#   "bme680>=2.0,<3",
 #   "smbus2"
 # ]
 # ///
 
+from time import sleep
+
 import bme680 # type: ignore
+from bme680 import constants # type: ignore
+
+# Status polls `collect` makes before giving up on a conversion, as the driver's own read does
+COLLECT_POLLS = 10
 
 class BME680Reader:
     """A class to handle reading data from a BME680 environmental sensor.
@@ -16,14 +22,20 @@ class BME680Reader:
 
     Attributes:
         sensor: The BME680 sensor instance used for measurements.
+        bus_number (int): The I2C bus number the sensor is connected to.
 
     Args:
         bus_number (int): The I2C bus number to use (default: 2).
         device_address (int): The I2C device address of the BME680 (default: 0x77).
         _debug_sensor: Optional mock sensor for testing (default: None).
+        bus: Optional SMBus handle to use, e.g. a shared bus (default: None).
     """
 
-    def __init__(self, bus_number: int = 2, device_address: int = 0x77, _debug_sensor=None) -> None:
+    BUS = "i2c"
+    # Seconds a forced-mode conversion takes at these oversampling and heater settings
+    conversion_time: float = 0.19
+
+    def __init__(self, bus_number: int = 2, device_address: int = 0x77, _debug_sensor=None, bus=None) -> None:
         """Initialize the BME680Reader with specified bus and address.
 
         Sets up the BME680 sensor on the specified I2C bus and address, or uses a
@@ -33,11 +45,16 @@ class BME680Reader:
             bus_number (int): The I2C bus number to use.
             device_address (int): The I2C device address of the BME680.
             _debug_sensor (int): Optional mock sensor for testing.
+            bus: Optional SMBus handle to use. If omitted, opens its own.
         """
-        
+
+        self.bus_number: int = bus_number
+
         if _debug_sensor is None:
-            from smbus2 import SMBus
-            self.sensor = bme680.BME680(device_address, SMBus(bus_number))
+            if bus is None:
+                from smbus2 import SMBus
+                bus = SMBus(bus_number)
+            self.sensor = bme680.BME680(device_address, bus)
         else:
             self.sensor = _debug_sensor
 
@@ -61,6 +78,73 @@ class BME680Reader:
         self.sensor.set_gas_heater_duration(150)
         self.sensor.select_gas_heater_profile(0)
     
+    def trigger(self) -> None:
+        """Start a conversion and return without waiting for it. See `collect`."""
+
+        self.sensor.set_power_mode(bme680.FORCED_MODE, blocking=False)
+
+    def collect(self) -> dict | None:
+        """Return the readings of the conversion started by `trigger`.
+
+        The driver's `get_sensor_data` always starts a conversion of its own
+        first, so this waits for the running one and reads it with the same
+        register reads and compensation instead.
+
+        Returns:
+            dict | None: The same as `get_readings`.
+        """
+
+        if not self._read_conversion():
+            return None
+        return self._readings()
+
+    def _read_conversion(self) -> bool:
+        """Poll for the new-data flag, then read and compensate the field registers into `sensor.data`.
+
+        Mirrors `BME680.get_sensor_data` of the bme680 2.0.0 driver, minus
+        starting the conversion, and uses its private register and
+        compensation methods; pyproject.toml pins the driver to 2.x for this.
+
+        Returns:
+            bool: Whether a conversion finished within COLLECT_POLLS polls.
+        """
+
+        sensor = self.sensor
+        for _ in range(COLLECT_POLLS):
+            if sensor._get_regs(constants.FIELD0_ADDR, 1) & constants.NEW_DATA_MSK:
+                break
+            sleep(constants.POLL_PERIOD_MS / 1000.0)
+        else:
+            return False
+
+        regs = sensor._get_regs(constants.FIELD0_ADDR, constants.FIELD_LENGTH)
+        adc_pres = (regs[2] << 12) | (regs[3] << 4) | (regs[4] >> 4)
+        adc_temp = (regs[5] << 12) | (regs[6] << 4) | (regs[7] >> 4)
+        adc_hum = (regs[8] << 8) | regs[9]
+        # The high variant keeps its gas reading and status in other registers
+        high = sensor._variant == constants.VARIANT_HIGH
+        gas_msb, gas_lsb = (regs[15], regs[16]) if high else (regs[13], regs[14])
+        adc_gas = (gas_msb << 2) | (gas_lsb >> 6)
+        gas_range = gas_lsb & constants.GAS_RANGE_MSK
+
+        data = sensor.data
+        data.status = (regs[0] & constants.NEW_DATA_MSK) | (gas_lsb & constants.GASM_VALID_MSK) | (gas_lsb & constants.HEAT_STAB_MSK)
+        data.gas_index = regs[0] & constants.GAS_INDEX_MSK
+        data.meas_index = regs[1]
+        data.heat_stable = (data.status & constants.HEAT_STAB_MSK) > 0
+
+        temperature = sensor._calc_temperature(adc_temp)
+        data.temperature = temperature / 100.0
+        # The driver works out the heater resistance from the last temperature
+        sensor.ambient_temperature = temperature
+        data.pressure = sensor._calc_pressure(adc_pres) / 100.0
+        data.humidity = sensor._calc_humidity(adc_hum) / 1000.0
+        if high:
+            data.gas_resistance = sensor._calc_gas_resistance_high(adc_gas, gas_range)
+        else:
+            data.gas_resistance = sensor._calc_gas_resistance_low(adc_gas, gas_range)
+        return True
+
     def get_readings(self) -> dict | None:
         """Read current sensor data from the BME680.
 
@@ -78,7 +162,9 @@ class BME680Reader:
 
         if not self.sensor.get_sensor_data():
             return None
-        
+        return self._readings()
+
+    def _readings(self) -> dict:
         return {
             "temperature": self.sensor.data.temperature,
             "pressure": self.sensor.data.pressure,
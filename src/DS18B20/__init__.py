@@ -1,34 +1,70 @@
 import glob
+import os
+import re
+from time import sleep
+from functools import partial
+from acquisition import Worker
 from . import constants
 
+# Matches the `crc=xx YES` / `crc=xx NO` check at the end of the first line of w1_slave
+CRC_PATTERN = re.compile(r"crc=[0-9a-f]{2} (YES|NO)")
+
 class DS18B20Reader:
     """Class for reading temperature from DS18B20 sensors via DS2482 bridge.
 
     This class handles the initialization of the DS2482 I2C-to-1-Wire bridge
-    and reading temperature values from connected DS18B20 sensors.
+    and reading temperature values from every DS18B20 sensor connected to it.
+
+    Where the kernel supports it, a single bulk conversion is started on the
+    bus master, so every probe converts at the same time, and each probe's
+    result is then read from its `temperature` attribute without converting
+    again: N probes cost one conversion time. Otherwise each probe's
+    `w1_slave` is read, which runs a conversion of its own; those are read
+    concurrently.
 
     Attributes:
         bus_number (int): The I2C bus number where the DS2482 is connected.
         device_address (int): The I2C address of the DS2482 device.
-        output_path (str): Path to the temperature sensor's output file.
+        output_path (list[str]): Paths to the temperature sensors' output files.
+        devices (dict[str, str]): Map of each probe's ROM id to its output file.
 
     Args:
         bus_number (int, optional): I2C bus number. Defaults to 2.
         device_address (int, optional): DS2482 I2C address. Defaults to 0x18.
-        init (bool, optional): Whether to initialize the DS2482 on creation. Defaults to True.
 
     Raises:
         FileNotFoundError: If no DS18B20 devices are found after initialization.
     """
 
+    # Reads go through the kernel's 1-Wire master rather than straight to the
+    # I2C bus, so they don't need to wait for other sensors on the same bus.
+    BUS = "w1"
+
     def __init__(self, bus_number: int = 2, device_address: int = 0x18) -> None:
         self.bus_number: int = bus_number
         self.device_address: int = device_address
-        self.output_path: str = glob.glob(constants.OUTPUT_PATH)
 
         self._initialize_ds2482()
-        
+
+        self.devices: dict[str, str] = {
+            os.path.basename(os.path.dirname(path)): path for path in self.output_path
+        }
+        self._bulk_read_paths: list[str] = glob.glob(constants.BULK_READ_PATH)
+        # One reader thread per probe, started on the first concurrent read
+        self._workers: list[Worker] = []
+        # Whether the last trigger started a bulk conversion to collect
+        self._converted: bool = False
     
+    @property
+    def conversion_time(self) -> float:
+        """Seconds between `trigger` and `collect`.
+
+        After a bulk conversion, the results can be collected once it is done.
+        Without one, `collect` runs the conversions itself, so there is nothing to wait for.
+        """
+
+        return constants.CONVERSION_TIME if self._converted else 0.0
+
     def _initialize_ds2482(self) -> None:
         """Initialize the DS2482 I2C-to-1-Wire bridge.
 
@@ -47,25 +83,112 @@ class DS18B20Reader:
         except Exception as e:
             print(f"Error: {e}")
 
+        self.output_path: list[str] = sorted(glob.glob(constants.OUTPUT_PATH))
+
         if not self.output_path:
             raise FileNotFoundError(f"No DS18B20 devices found. Could not find file at {constants.OUTPUT_PATH}")
 
+    def _trigger_bulk_conversion(self) -> bool:
+        """Start a conversion on every probe at once.
+
+        Returns:
+            bool: Whether a bulk conversion was started.
+        """
+
+        triggered = False
+        for path in self._bulk_read_paths:
+            try:
+                with open(path, 'w') as f:
+                    f.write("trigger\n")
+                triggered = True
+            except OSError:
+                pass
+        return triggered
+
+    def _read_converted(self, path: str) -> float | None:
+        """Read a probe's result of the bulk conversion from its `temperature` attribute.
+
+        The attribute is empty (or fails to read) while the conversion is still
+        running, so it is polled until the conversion should be done.
+
+        Returns:
+            float: The temperature in degrees Celsius.
+            None: If no result turned up in time.
+        """
+
+        temperature_path = os.path.join(os.path.dirname(path), "temperature")
+        for attempt in range(1 + constants.BULK_READ_POLLS):
+            if attempt:
+                sleep(constants.BULK_READ_POLL_INTERVAL)
+            try:
+                with open(temperature_path, 'r') as f:
+                    text: str = f.read().strip()
+                if text:
+                    return int(text) / 1000
+            except (OSError, ValueError):
+                pass
+        return None
+
+    def _read_probe(self, path: str) -> float | None:
+        """Read one probe's temperature, retrying on a CRC failure.
+
+        Returns:
+            float: The temperature in degrees Celsius.
+            None: If every attempt failed the CRC check.
+        """
+
+        for _ in range(1 + constants.CRC_RETRIES):
+            with open(path, 'r') as f:
+                content: str = f.read()
+
+            crc = CRC_PATTERN.search(content)
+            if crc is None or crc.group(1) != "YES" or "t=" not in content:
+                continue
+
+            temp: str = content.split("t=")[1]
+            return float(temp) / 1000
+        return None
+
     def get_readings(self) -> dict:
-        """Read the current temperature from the DS18B20 sensor.
+        """Read the current temperature from every DS18B20 sensor.
 
-        Reads the raw temperature value from the sensor's output file
+        Reads the raw temperature value from each sensor's output file
         and converts it to degrees Celsius.
 
         Returns:
-            dict: Dictionary containing the temperature in degrees Celsius.
+            dict: The temperature of each probe in degrees Celsius, keyed by
+            its ROM id (e.g. `28-000005e2fdc3`). A probe that keeps failing
+            its CRC check reads as None.
 
         Note:
             The raw temperature value is divided by 1000 to convert
             from millidegrees to degrees Celsius.
         """
-        with open(self.output_path[0], 'r') as f:
-            content: str = f.read()
-            temp: str = content.split("t=")[1]
-            return {
-                "temperature": float(temp) / 1000
-            }
\ No newline at end of file
+
+        self.trigger()
+        return self.collect()
+
+    def trigger(self) -> None:
+        """Start a bulk conversion, if the kernel supports it, without waiting for it."""
+
+        self._converted = self._trigger_bulk_conversion()
+
+    def collect(self) -> dict:
+        """Read every probe, after `trigger`.
+
+        Returns:
+            dict: The same as `get_readings`.
+        """
+
+        if self._converted:
+            self._converted = False
+            return {rom: self._read_converted(path) for rom, path in self.devices.items()}
+
+        if len(self.devices) == 1:
+            return {rom: self._read_probe(path) for rom, path in self.devices.items()}
+
+        if not self._workers:
+            self._workers = [Worker(f"ds18b20-{rom}") for rom in self.devices]
+
+        futures = [worker.submit(partial(self._read_probe, path)) for worker, path in zip(self._workers, self.devices.values())]
+        return {rom: future.result() for rom, future in zip(self.devices, futures)}
@@ -4,4 +4,18 @@
 OUTPUT_PATH = "/sys/bus/w1/devices/28-*/w1_slave"
 
 # I2C new_device file path
-I2C_NEW_DEVICE_PATH = "/sys/bus/i2c/devices/i2c-{}/new_device"
\ No newline at end of file
+I2C_NEW_DEVICE_PATH = "/sys/bus/i2c/devices/i2c-{}/new_device"
+
+# Bulk conversion trigger of each 1-Wire bus master (kernel 5.10+)
+BULK_READ_PATH = "/sys/bus/w1/devices/w1_bus_master*/therm_bulk_read"
+
+# Number of times to re-read a probe after a CRC failure
+CRC_RETRIES = 3
+
+# Seconds a 12-bit temperature conversion takes
+CONVERSION_TIME = 0.75
+
+# How often, and how many more times, a probe's `temperature` attribute is
+# read while a bulk conversion is still running (about one conversion time)
+BULK_READ_POLL_INTERVAL = 0.05
+BULK_READ_POLLS = 16
@@ -0,0 +1,277 @@
+import random
+from concurrent.futures import Future, TimeoutError
+from queue import SimpleQueue
+from threading import Thread
+from time import monotonic, sleep
+from typing import Any, Callable
+
+from instrumentation import STATS
+from resilience import CircuitBreaker, RetryPolicy
+
+DEFAULT_TIMEOUT: float = 5.0
+
+def _timed_read(name: str, reader: Any) -> Any:
+    with STATS.time("read", name):
+        return reader.get_readings()
+
+def _describe(error: BaseException) -> str:
+    return f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
+
+def read_with_retries(name: str, reader: Any, policy: RetryPolicy, deadline: float,
+                      rng: random.Random | None = None, first: Callable[[], Any] | None = None) -> dict[str, Any]:
+    """Read a sensor, trying again after a jittered wait if the read fails.
+
+    A read fails if `get_readings` raises or returns nothing (like the BME680
+    when it has no new data). Waits that would run past `deadline` (monotonic)
+    aren't started, so retries never hold up the bus beyond the sensor's timeout.
+
+    Args:
+        first (callable, optional): Used instead of `get_readings` for the first
+            try, e.g. the `collect` of a conversion that is already running.
+
+    Returns:
+        dict: The readings, or an `{"error": ...}` entry describing the last failure.
+    """
+
+    error = "No data"
+    for attempt in range(policy.attempts):
+        if attempt:
+            wait = policy.delay(attempt - 1, rng)
+            if monotonic() + wait >= deadline:
+                break
+            sleep(wait)
+        try:
+            if attempt == 0 and first is not None:
+                readings = first()
+            else:
+                readings = _timed_read(name, reader)
+        except Exception as e:
+            error = _describe(e)
+            continue
+        if readings:
+            return readings
+        error = "No data"
+    return {"error": error}
+
+def is_split_phase(reader: object) -> bool:
+    """Return whether a reader can start a conversion and collect it later.
+
+    Split-phase readers have a `trigger()` method that starts a conversion and
+    returns straight away, a `collect()` method that returns the readings once
+    it has finished, and a `conversion_time` attribute: the seconds to leave
+    between the two. Their `get_readings` still does both in one go.
+    """
+
+    return callable(getattr(reader, "trigger", None)) and callable(getattr(reader, "collect", None))
+
+def _trigger(reader: Any) -> float | None:
+    """Start a conversion and return when it started (monotonic), or None if it couldn't be started."""
+
+    started = monotonic()
+    try:
+        reader.trigger()
+    except Exception:
+        return None
+    return started
+
+def _collect(name: str, reader: Any, started: float | None, policy: RetryPolicy, deadline: float,
+             rng: random.Random | None = None) -> dict[str, Any]:
+    """Collect a conversion started by `_trigger`, falling back to a full read if it failed."""
+
+    if started is None:
+        return read_with_retries(name, reader, policy, deadline, rng)
+
+    wait = started + getattr(reader, "conversion_time", 0.0) - monotonic()
+    if wait > 0:
+        sleep(wait)
+
+    def collect() -> Any:
+        # The read latency of a split read runs from its trigger
+        try:
+            return reader.collect()
+        finally:
+            STATS.observe("read", name, monotonic() - started)
+
+    return read_with_retries(name, reader, policy, deadline, rng, first=collect)
+
+def bus_key(reader: object) -> tuple[str, int | None]:
+    """Return the key of the bus a reader talks over.
+
+    Readers set a `BUS` class attribute naming the kind of bus (`"i2c"` by
+    default) and a `bus_number` attribute. Readers with the same key share a
+    worker, so their reads never overlap and happen in the order requested.
+    """
+
+    return getattr(reader, "BUS", "i2c"), getattr(reader, "bus_number", None)
+
+
+class Worker:
+    """A daemon thread that runs submitted calls one at a time, e.g. the reads of one bus.
+
+    A plain thread is used instead of a `ThreadPoolExecutor` so that a device
+    that never returns can't stop the interpreter from exiting.
+    """
+
+    def __init__(self, name: str) -> None:
+        self._queue: SimpleQueue = SimpleQueue()
+        self._thread = Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable[[], Any]) -> Future:
+        future: Future = Future()
+        self._queue.put((future, fn))
+        return future
+
+    def close(self) -> None:
+        self._queue.put((None, None))
+
+    def _run(self) -> None:
+        while True:
+            future, fn = self._queue.get()
+            if future is None:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+
+
+class AcquisitionEngine:
+    """Reads sensors concurrently, one worker per bus.
+
+    Sensors on different buses are read at the same time, so a cycle takes as
+    long as the slowest bus instead of the sum of every sensor. Sensors that
+    share a bus are read one after another in the order they were requested.
+
+    Every sensor has a timeout. A sensor that doesn't answer in time gets an
+    error entry and the rest of the sample is returned without it. Until the
+    late read finishes, later cycles report that sensor as busy rather than
+    queueing more reads behind it.
+
+    Split-phase readers (see `is_split_phase`) are triggered before anything
+    else is read and collected last, so a cycle takes about as long as the
+    slowest conversion rather than the sum of them.
+
+    A read that fails is retried (see `read_with_retries`) and, if it still
+    fails, reported as an error entry; it never stops the other sensors being
+    read. Each sensor has a `CircuitBreaker`, so a sensor that keeps failing or
+    timing out is skipped for a while instead of tying up its bus.
+
+    Attributes:
+        instances (dict): Map of sensor names to reader instances.
+        timeouts (dict): Map of sensor names to their timeout in seconds.
+        retry (RetryPolicy): How failed reads are retried.
+        breakers (dict): Map of sensor names to their circuit breaker.
+
+    Args:
+        instances (dict): Map of sensor names to reader instances.
+        timeouts (dict, optional): Per-sensor timeouts in seconds.
+        default_timeout (float, optional): Timeout for sensors not in `timeouts`. Defaults to DEFAULT_TIMEOUT.
+        retry (RetryPolicy, optional): How failed reads are retried. Defaults to `RetryPolicy()`.
+        breaker (callable, optional): Creates the circuit breaker of each sensor. Defaults to `CircuitBreaker`.
+    """
+
+    def __init__(self, instances: dict[str, object], timeouts: dict[str, float] | None = None,
+                 default_timeout: float = DEFAULT_TIMEOUT, retry: RetryPolicy | None = None,
+                 breaker: Callable[[], CircuitBreaker] = CircuitBreaker) -> None:
+        self.instances: dict[str, object] = instances
+        self.timeouts: dict[str, float] = timeouts if timeouts is not None else {}
+        self.default_timeout: float = default_timeout
+        self.retry: RetryPolicy = retry or RetryPolicy()
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self._new_breaker = breaker
+        self._rng = random.Random()
+        self._workers: dict[tuple, Worker] = {}
+        self._pending: dict[str, Future] = {}
+
+    def _worker(self, key: tuple) -> Worker:
+        if key not in self._workers:
+            self._workers[key] = Worker(f"{key[0]}-{key[1]}")
+        return self._workers[key]
+
+    def read(self, sensor_names: list[str]) -> dict[str, dict[str, Any]]:
+        """Read the named sensors and return their readings by name.
+
+        Returns:
+            dict: Readings for each sensor, in the order given. Sensors that are
+            unknown, busy, failing, timed out or skipped by their circuit breaker
+            have an `{"error": ...}` entry instead.
+        """
+
+        start = monotonic()
+        results: dict[str, Any] = {}
+        deadlines: dict[str, float] = {}
+        bus_deadlines: dict[tuple, float] = {}
+        due: list[str] = []
+
+        for name in sensor_names:
+            reader = self.instances.get(name)
+            if reader is None:
+                results[name] = {"error": "Unknown sensor"}
+                continue
+
+            previous = self._pending.get(name)
+            if previous is not None and not previous.done():
+                results[name] = {"error": "Previous read still in progress"}
+                STATS.count_error(name)
+                continue
+
+            breaker = self.breakers.get(name)
+            if breaker is None:
+                breaker = self.breakers[name] = self._new_breaker()
+            if not breaker.allow():
+                results[name] = {"error": f"Skipped after {breaker.failures} failed reads; trying again in {breaker.retry_in():.0f} s"}
+                continue
+
+            due.append(name)
+            results[name] = None
+
+        # Start every conversion first, then do the plain reads while they
+        # run, and only then collect the conversions. On a shared bus the
+        # conversions overlap the other reads instead of adding to them.
+        triggers = {
+            name: self._worker(bus_key(self.instances[name])).submit(lambda reader=self.instances[name]: _trigger(reader))
+            for name in due if is_split_phase(self.instances[name])
+        }
+        for name in [name for name in due if name not in triggers] + list(triggers):
+            reader = self.instances[name]
+
+            # Reads on the same bus queue behind each other, so each one's
+            # deadline starts where the one before it ends.
+            key = bus_key(reader)
+            timeout = self.timeouts.get(name, self.default_timeout)
+            deadlines[name] = bus_deadlines.get(key, start) + timeout
+            bus_deadlines[key] = deadlines[name]
+
+            if name in triggers:
+                job = lambda name=name, reader=reader, deadline=deadlines[name]: _collect(
+                    name, reader, triggers[name].result(), self.retry, deadline, self._rng
+                )
+            else:
+                job = lambda name=name, reader=reader, deadline=deadlines[name]: read_with_retries(name, reader, self.retry, deadline, self._rng)
+            self._pending[name] = self._worker(key).submit(job)
+
+        for name, deadline in deadlines.items():
+            try:
+                results[name] = self._pending[name].result(timeout=max(0.0, deadline - monotonic()))
+            except TimeoutError:
+                results[name] = {"error": f"Timed out after {self.timeouts.get(name, self.default_timeout):g} s"}
+            except Exception as e:
+                results[name] = {"error": _describe(e)}
+
+            if isinstance(results[name], dict) and "error" in results[name]:
+                self.breakers[name].record_failure()
+                STATS.count_error(name)
+            else:
+                self.breakers[name].record_success()
+
+        return results
+
+    def close(self) -> None:
+        """Stop the bus workers once they finish their current reads."""
+
+        for worker in self._workers.values():
+            worker.close()
+        self._workers.clear()
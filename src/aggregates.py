@@ -0,0 +1,214 @@
+from array import array
+from collections import deque
+from math import ceil
+from time import monotonic
+from typing import Any
+
+# Seconds in each window suffix accepted by `parse_window`
+_WINDOW_UNITS: dict[str, float] = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Pressure fields always get a window of this length for their tendency
+PRESSURE_TENDENCY_WINDOW: float = 3 * 3600
+# Change (in hPa) over the tendency window beyond which pressure is rising or falling
+PRESSURE_TENDENCY_THRESHOLD: float = 1.0
+# Most readings kept per field, whatever the windows and interval
+MAX_CAPACITY: int = 100_000
+
+def parse_window(value: str) -> float:
+    """Parse a window like `90`, `15m`, `1h` or `1d` into seconds.
+
+    Raises:
+        ValueError: If the window can't be parsed or isn't positive.
+    """
+
+    text = value.strip().lower()
+    unit = text[-1:] if text[-1:] in _WINDOW_UNITS else "s"
+    seconds = float(text.removesuffix(unit)) * _WINDOW_UNITS[unit]
+    if seconds <= 0:
+        raise ValueError(f"Window must be positive: `{value}`.")
+    return seconds
+
+def format_window(seconds: float) -> str:
+    """Return the shortest name of a window, e.g. `3h` for 10800 seconds."""
+
+    for unit, size in sorted(_WINDOW_UNITS.items(), key=lambda item: -item[1]):
+        if seconds >= size and seconds % size == 0:
+            return f"{int(seconds // size)}{unit}"
+    return f"{seconds:g}s"
+
+def capacity_for(windows: list[float], interval: float) -> int:
+    """Return how many readings a field must keep to cover the longest window at the given interval."""
+
+    return max(2, min(MAX_CAPACITY, ceil(max(windows) / interval) + 1))
+
+def pressure_tendency(change: float, threshold: float = PRESSURE_TENDENCY_THRESHOLD) -> str:
+    """Classify a change in pressure as `rising`, `falling` or `steady`."""
+
+    if change > threshold:
+        return "rising"
+    if change < -threshold:
+        return "falling"
+    return "steady"
+
+
+class _Window:
+    """Running state of one window over a series: its oldest reading, sum and min/max candidates."""
+
+    __slots__ = ("seconds", "start", "total", "minima", "maxima")
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds: float = seconds
+        self.start: int = 0
+        self.total: float = 0.0
+        # Sequence numbers of the readings that can still become the min/max
+        self.minima: deque[int] = deque()
+        self.maxima: deque[int] = deque()
+
+
+class RollingSeries:
+    """A fixed-size ring buffer of one field's readings with rolling aggregates.
+
+    Readings are kept in two preallocated arrays (times and values), so memory
+    stays the same however long the process runs. Each window keeps a running
+    sum and monotonic deques of its minimum and maximum candidates, so adding
+    a reading and reading the aggregates are O(1) amortised.
+
+    If the buffer is too small to hold a whole window, the window only covers
+    the readings still in the buffer.
+
+    Args:
+        capacity (int): Most readings kept.
+        windows (list[float]): Window lengths in seconds.
+    """
+
+    def __init__(self, capacity: int, windows: list[float]) -> None:
+        self.capacity: int = capacity
+        self.times: array = array("d", bytes(8 * capacity))
+        self.values: array = array("d", bytes(8 * capacity))
+        self.windows: list[_Window] = [_Window(seconds) for seconds in windows]
+        # Sequence number of the next reading; reading `n` is stored at `n % capacity`
+        self._next: int = 0
+
+    def __len__(self) -> int:
+        return min(self._next, self.capacity)
+
+    def append(self, value: float, now: float | None = None) -> None:
+        """Add a reading taken at `now` (monotonic seconds, defaults to the current time)."""
+
+        now = monotonic() if now is None else now
+        sequence = self._next
+        slot = sequence % self.capacity
+        self.times[slot] = now
+        self.values[slot] = value
+        self._next += 1
+        oldest_kept = self._next - self.capacity
+
+        for window in self.windows:
+            window.total += value
+            while window.minima and self.values[window.minima[-1] % self.capacity] >= value:
+                window.minima.pop()
+            window.minima.append(sequence)
+            while window.maxima and self.values[window.maxima[-1] % self.capacity] <= value:
+                window.maxima.pop()
+            window.maxima.append(sequence)
+
+            cutoff = now - window.seconds
+            while window.start < sequence and (
+                window.start < oldest_kept or self.times[window.start % self.capacity] <= cutoff
+            ):
+                window.total -= self.values[window.start % self.capacity]
+                window.start += 1
+            while window.minima[0] < window.start:
+                window.minima.popleft()
+            while window.maxima[0] < window.start:
+                window.maxima.popleft()
+
+        # Re-add the sums from scratch once per lap of the buffer so rounding errors can't build up
+        if slot == self.capacity - 1:
+            for window in self.windows:
+                window.total = sum(self.values[n % self.capacity] for n in range(window.start, self._next))
+
+    def aggregates(self, index: int = 0) -> dict[str, float] | None:
+        """Return the `count`, `mean`, `min`, `max` and `change` (newest minus oldest) of a window, or None if empty."""
+
+        if not self._next:
+            return None
+
+        window = self.windows[index]
+        count = self._next - window.start
+        return {
+            "count": count,
+            "mean": window.total / count,
+            "min": self.values[window.minima[0] % self.capacity],
+            "max": self.values[window.maxima[0] % self.capacity],
+            "change": self.values[(self._next - 1) % self.capacity] - self.values[window.start % self.capacity],
+        }
+
+
+class Aggregator:
+    """Rolling aggregates of every numeric field of every sensor.
+
+    A `RollingSeries` is created for each `sensor.field` the first time it is
+    seen. Fields called `pressure` also get a PRESSURE_TENDENCY_WINDOW window,
+    reported as their `tendency`, and keep `tendency_capacity` readings so it
+    is covered even when the other windows are shorter.
+
+    Args:
+        windows (list[float]): Window lengths in seconds.
+        capacity (int): Most readings kept per field. See `capacity_for`.
+        tendency_capacity (int, optional): Most readings kept per pressure field. Defaults to `capacity`.
+    """
+
+    def __init__(self, windows: list[float], capacity: int, tendency_capacity: int | None = None) -> None:
+        self.windows: list[float] = sorted(set(windows))
+        self.capacity: int = capacity
+        self.tendency_capacity: int = tendency_capacity or capacity
+        self.series: dict[str, RollingSeries] = {}
+
+    @classmethod
+    def for_interval(cls, windows: list[float], interval: float) -> "Aggregator":
+        """Create an aggregator that keeps enough readings, taken every `interval` seconds, to cover its windows."""
+
+        return cls(windows, capacity_for(windows, interval), capacity_for([*windows, PRESSURE_TENDENCY_WINDOW], interval))
+
+    def update(self, data: dict[str, dict], now: float | None = None) -> None:
+        """Add the numeric fields of a reading. Errors and non-numeric values are skipped."""
+
+        now = monotonic() if now is None else now
+        for sensor, readings in data.items():
+            if not isinstance(readings, dict) or "error" in readings:
+                continue
+            for field, value in readings.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{sensor}.{field}"
+                series = self.series.get(name)
+                if series is None:
+                    if field == "pressure":
+                        series = RollingSeries(self.tendency_capacity, self.windows + [PRESSURE_TENDENCY_WINDOW])
+                    else:
+                        series = RollingSeries(self.capacity, self.windows)
+                    self.series[name] = series
+                series.append(value, now)
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        """Return the aggregates of every field, as `{"sensor.field": {"1h": {...}, "tendency": ...}}`."""
+
+        summary: dict[str, dict[str, Any]] = {}
+        for name, series in self.series.items():
+            fields = summary[name] = {format_window(seconds): series.aggregates(index) for index, seconds in enumerate(self.windows)}
+            if name.endswith(".pressure"):
+                fields["tendency"] = pressure_tendency(series.aggregates(len(self.windows))["change"])
+        return summary
+
+    def flat(self) -> dict[str, Any]:
+        """Return the aggregates as flat `sensor.field.window.stat` keys, to add to a reading."""
+
+        flat: dict[str, Any] = {}
+        for name, fields in self.summary().items():
+            for window, aggregates in fields.items():
+                if isinstance(aggregates, dict):
+                    flat.update({f"{name}.{window}.{stat}": value for stat, value in aggregates.items()})
+                else:
+                    flat[f"{name}.{window}"] = aggregates
+        return flat
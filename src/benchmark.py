@@ -0,0 +1,140 @@
+import os
+from glob import escape, glob
+import tracemalloc
+from contextlib import redirect_stdout
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Callable
+
+from acquisition import AcquisitionEngine
+from simulated import PROFILES, SimulatedReader
+from writers import FILE_ONLY_FORMATS, WRITERS, open_writer
+
+DEFAULT_CYCLES = 200
+# Simulated sensors take this fraction of the real sensors' read time
+DEFAULT_LATENCY_SCALE = 0.01
+# Row template the template format is benchmarked with
+BENCH_TEMPLATE = "{timestamp} {bme680.temperature:.2f} {bme680.pressure:.1f} {bme680.humidity:.1f} {ads7830.ch0:.0f}"
+
+def percentile(values: list[float], q: float) -> float:
+    """Return the `q`th percentile (0-100) of the values, by nearest rank."""
+
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+def simulated_engine(latency_scale: float = DEFAULT_LATENCY_SCALE, seed: int = 0) -> AcquisitionEngine:
+    """Return an acquisition engine reading one simulated sensor of each type."""
+
+    return AcquisitionEngine({
+        kind: SimulatedReader(kind, latency=profile["latency"] * latency_scale, seed=seed)
+        for kind, profile in PROFILES.items()
+    })
+
+def bench_acquisition(read: Callable[[list[str]], dict], sensor_names: list[str], cycles: int) -> dict[str, float]:
+    """Time `cycles` reads of the sensors.
+
+    Returns:
+        dict: Readings per second and the per-cycle latency percentiles in milliseconds.
+    """
+
+    latencies = []
+    start = perf_counter()
+    for _ in range(cycles):
+        cycle_start = perf_counter()
+        read(sensor_names)
+        latencies.append((perf_counter() - cycle_start) * 1000)
+    elapsed = perf_counter() - start
+
+    return {
+        "readings_per_second": cycles * len(sensor_names) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p90_ms": percentile(latencies, 90),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies),
+    }
+
+def bench_memory(read: Callable[[list[str]], dict], sensor_names: list[str], cycles: int) -> dict[str, float]:
+    """Measure how much memory the process holds on to over `cycles` reads.
+
+    The first tenth of the cycles warm up caches and are not counted.
+
+    Returns:
+        dict: Bytes of growth in total and per cycle.
+    """
+
+    warmup = max(1, cycles // 10)
+    for _ in range(warmup):
+        read(sensor_names)
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        for _ in range(cycles - warmup):
+            read(sensor_names)
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    growth = after - before
+    return {"growth_bytes": growth, "growth_bytes_per_cycle": growth / max(1, cycles - warmup)}
+
+def bench_output(fmt: str, data: dict[str, Any], cycles: int, output_path: str | None = None) -> dict[str, float]:
+    """Time `cycles` writes of the same reading with one output format.
+
+    Console output is sent to `os.devnull`.
+
+    Returns:
+        dict: Microseconds per reading (mean and p99) and bytes written to the file
+            (or the files next to it, for formats that split their output).
+    """
+
+    costs = []
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        settings = {"template": BENCH_TEMPLATE} if fmt == "template" else {}
+        with open_writer(fmt, output_path, timestamps=True, **settings) as writer:
+            for _ in range(cycles):
+                start = perf_counter()
+                writer.write(dict(data))
+                costs.append((perf_counter() - start) * 1_000_000)
+
+    return {
+        "mean_us": sum(costs) / len(costs),
+        "p99_us": percentile(costs, 99),
+        "bytes": sum(os.path.getsize(path) for path in glob(f"{escape(output_path)}*")) if output_path else 0,
+    }
+
+def run_benchmarks(cycles: int = DEFAULT_CYCLES, latency_scale: float = DEFAULT_LATENCY_SCALE) -> dict[str, dict]:
+    """Run every benchmark against simulated sensors.
+
+    Returns:
+        dict: The results of each benchmark, by name.
+    """
+
+    engine = simulated_engine(latency_scale)
+    sensor_names = list(engine.instances)
+    report: dict[str, dict] = {
+        "acquisition": bench_acquisition(engine.read, sensor_names, cycles),
+        "memory": bench_memory(engine.read, sensor_names, cycles),
+    }
+
+    data = engine.read(sensor_names)
+    with TemporaryDirectory() as directory:
+        for fmt in WRITERS:
+            if fmt not in FILE_ONLY_FORMATS:
+                report[f"output.{fmt}.console"] = bench_output(fmt, data, cycles)
+            report[f"output.{fmt}.file"] = bench_output(fmt, data, cycles, os.path.join(directory, f"bench.{fmt}"))
+
+    engine.close()
+    return report
+
+def format_report(report: dict[str, dict]) -> str:
+    """Format a benchmark report as one line per benchmark."""
+
+    lines = []
+    for name, results in report.items():
+        values = ", ".join(f"{key}={value:.6g}" for key, value in results.items())
+        lines.append(f"{name}: {values}")
+    return "\n".join(lines)
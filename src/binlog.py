@@ -0,0 +1,362 @@
+"""Compact binary log format for long-running captures.
+
+A capture is a series of chunk files (`data.000000.wsb`, `data.000001.wsb`, ...).
+Each chunk starts with a small header followed by fixed-width records:
+
+    magic       8 bytes   b"WSBLOG01"
+    length      uint32    total header length, including padding
+    schema      JSON      {"columns": [[name, dtype], ...]}
+    padding               up to a multiple of 8 bytes
+    records     packed little-endian rows, one column after another
+
+The first two columns are always `t_mono` (monotonic clock) and `t_wall` (seconds
+since the epoch), both float64. Each sensor field becomes a `sensor.field` column
+of float32 (`<f4`, missing values are NaN) or int64 (`<i8`, missing values are
+INT_MISSING). Records are only ever appended, and the record count comes from
+the file size, so a crash can at most lose a partial last record.
+
+A new chunk is started when the current one is full or a reading doesn't fit
+its schema (e.g. a new field appears).
+"""
+
+import csv
+import mmap
+import os
+import struct
+from glob import escape, glob
+from json import dumps, loads
+from time import localtime, monotonic, strftime, time
+from typing import Any, Iterator, TextIO
+
+from derived import DerivedMetrics
+from instrumentation import STATS
+from output import OutputOptions
+from writers import TIMESTAMP_FORMAT, Writer
+
+MAGIC = b"WSBLOG01"
+SUFFIX = ".wsb"
+DEFAULT_CHUNK_RECORDS = 100_000
+INT_MISSING = -(2 ** 63)
+TIME_COLUMNS: list[list[str]] = [["t_mono", "<f8"], ["t_wall", "<f8"]]
+
+# struct codes of the column types
+_STRUCT_CODES: dict[str, str] = {"<f8": "d", "<f4": "f", "<i8": "q"}
+
+def _column_type(value: Any) -> str | None:
+    """Return the column type a value needs, or None if it isn't numeric."""
+
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return "<i8" if isinstance(value, int) else "<f4"
+
+def flatten(data: dict[str, dict]) -> dict[str, Any]:
+    """Flatten a reading into `sensor.field` columns, keeping numeric values only."""
+
+    columns = {}
+    for sensor, readings in data.items():
+        if not isinstance(readings, dict):
+            continue
+        for field, value in readings.items():
+            columns[f"{sensor}.{field}"] = value
+    return columns
+
+def split_column(name: str) -> tuple[str, str]:
+    """Split a `sensor.field` column name into the sensor and the field.
+
+    Sensor names can contain dots (`bme680.outdoor`) and field names can't,
+    except for the `aggregates` pseudo-sensor, whose fields are `sensor.field.window.stat` keys.
+    """
+
+    if name.startswith("aggregates."):
+        return "aggregates", name.removeprefix("aggregates.")
+    sensor, _, field = name.rpartition(".")
+    return sensor, field
+
+def chunk_paths(base_path: str) -> list[str]:
+    """Return the chunk files of a capture, in order."""
+
+    stem = base_path.removesuffix(SUFFIX)
+    return sorted(glob(f"{escape(stem)}.[0-9][0-9][0-9][0-9][0-9][0-9]{SUFFIX}"))
+
+def read_header(path: str) -> tuple[list[list[str]], int]:
+    """Read the schema of a chunk file.
+
+    Returns:
+        tuple: The columns as `[name, dtype]` pairs, and the header length in bytes.
+
+    Raises:
+        ValueError: If the file is not a binary log chunk.
+    """
+
+    with open(path, "rb") as f:
+        prefix = f.read(12)
+        if len(prefix) < 12 or prefix[:8] != MAGIC:
+            raise ValueError(f"{path} is not a weathersensors binary log.")
+        (header_length,) = struct.unpack("<I", prefix[8:])
+        schema = loads(f.read(header_length - 12).rstrip(b" "))
+    return schema["columns"], header_length
+
+def _record_struct(columns: list[list[str]]) -> struct.Struct:
+    return struct.Struct("<" + "".join(_STRUCT_CODES[dtype] for _, dtype in columns))
+
+def iter_records(path: str) -> Iterator[dict[str, Any]]:
+    """Yield each record of a chunk file as a dict of columns, without NumPy.
+
+    Missing values are returned as None.
+    """
+
+    columns, header_length = read_header(path)
+    record = _record_struct(columns)
+    names = [name for name, _ in columns]
+    int_columns = {index for index, (_, dtype) in enumerate(columns) if dtype == "<i8"}
+
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        count = (size - header_length) // record.size
+        if count <= 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            end = header_length + count * record.size
+            for values in record.iter_unpack(view[header_length:end]):
+                yield {
+                    name: None if (value != value or (index in int_columns and value == INT_MISSING)) else value
+                    for index, (name, value) in enumerate(zip(names, values))
+                }
+
+def load(path: str):
+    """Memory-map a chunk file as a NumPy structured array, without copying.
+
+    Each column is a field of the array, e.g. `load(path)["bme680.pressure"]`.
+
+    Raises:
+        ImportError: If NumPy is not installed.
+    """
+
+    import numpy as np
+
+    columns, header_length = read_header(path)
+    dtype = np.dtype([(name, dtype) for name, dtype in columns])
+    count = (os.path.getsize(path) - header_length) // dtype.itemsize
+    if count <= 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=header_length, shape=(count,))
+
+def load_columns(paths: list[str]) -> dict[str, Any]:
+    """Load several chunk files as one float64 NumPy array per column.
+
+    Chunks with different schemas are joined, with NaN where a chunk doesn't
+    have a column.
+
+    Raises:
+        ImportError: If NumPy is not installed.
+    """
+
+    import numpy as np
+
+    chunks = [load(path) for path in paths]
+    names: list[str] = []
+    for chunk in chunks:
+        names += [name for name in chunk.dtype.names if name not in names]
+
+    columns = {}
+    for name in names:
+        parts = []
+        for chunk in chunks:
+            if name not in chunk.dtype.names:
+                parts.append(np.full(len(chunk), np.nan))
+                continue
+            values = chunk[name].astype(np.float64)
+            if chunk.dtype[name].kind == "i":
+                values[chunk[name] == INT_MISSING] = np.nan
+            parts.append(values)
+        columns[name] = np.concatenate(parts) if parts else np.zeros(0)
+    return columns
+
+
+class BinaryWriter(Writer):
+    """Writes readings to a chunked binary log (see the module docstring).
+
+    Args:
+        output_path (str): Base path of the capture. Chunks are written next to it.
+        timestamps (bool, optional): Ignored; every record has its timestamps.
+        options (OutputOptions, optional): Buffering and sync settings. Rotation is
+            ignored, as captures are already split into chunks.
+        chunk_records (int, optional): Records per chunk. Defaults to DEFAULT_CHUNK_RECORDS.
+
+    Raises:
+        ValueError: If no output path is given.
+    """
+
+    def __init__(self, output_path: str | None = None, timestamps: bool = False,
+                 options: OutputOptions | None = None, chunk_records: int = DEFAULT_CHUNK_RECORDS) -> None:
+        if not output_path:
+            raise ValueError("The binary format can only be written to a file. Use -o to give one.")
+
+        super().__init__(output_path, timestamps, options)
+        self.chunk_records: int = chunk_records
+        self._stem: str = output_path.removesuffix(SUFFIX)
+        existing = chunk_paths(output_path)
+        self._next_chunk: int = int(existing[-1][-len(SUFFIX) - 6:-len(SUFFIX)]) + 1 if existing else 0
+        self._file = None
+        self._columns: list[list[str]] = []
+        self._record: struct.Struct | None = None
+        self._defaults: list[Any] = []
+        self._records_in_chunk: int = 0
+        self._pending: int = 0
+        self._oldest: float = 0.0
+
+    def _fits(self, values: dict[str, Any]) -> bool:
+        types = dict(self._columns)
+        for name, value in values.items():
+            column_type = _column_type(value)
+            if value is None or column_type is None:
+                continue
+            if name not in types or (types[name] == "<i8" and column_type != "<i8"):
+                return False
+        return True
+
+    def _start_chunk(self, values: dict[str, Any]) -> None:
+        """Close the current chunk and start a new one with a schema that fits the values."""
+
+        types = dict(self._columns[len(TIME_COLUMNS):])
+        for name, value in values.items():
+            column_type = _column_type(value)
+            if column_type is None:
+                continue
+            if name not in types or (types[name] == "<i8" and column_type == "<f4"):
+                types[name] = column_type
+        self._columns = TIME_COLUMNS + [[name, dtype] for name, dtype in types.items()]
+        self._record = _record_struct(self._columns)
+        self._defaults = [float("nan") if dtype != "<i8" else INT_MISSING for _, dtype in self._columns]
+
+        schema = dumps({"columns": self._columns}).encode()
+        header_length = 12 + len(schema)
+        header_length += -header_length % 8
+        header = MAGIC + struct.pack("<I", header_length) + schema.ljust(header_length - 12, b" ")
+
+        self.close()
+        self._file = open(f"{self._stem}.{self._next_chunk:06d}{SUFFIX}", "wb")
+        self._file.write(header)
+        self._next_chunk += 1
+        self._records_in_chunk = 0
+
+    def write(self, data: dict) -> None:
+        with STATS.time("format", "binary"):
+            values = flatten(data)
+            if self._file is None or self._records_in_chunk >= self.chunk_records or not self._fits(values):
+                self._start_chunk(values)
+
+            row = list(self._defaults)
+            row[0], row[1] = monotonic(), time()
+            for index, (name, dtype) in enumerate(self._columns[len(TIME_COLUMNS):], len(TIME_COLUMNS)):
+                value = values.get(name)
+                if value is not None and _column_type(value) is not None:
+                    row[index] = value
+            record = self._record.pack(*row)
+
+        self._file.write(record)
+        self._records_in_chunk += 1
+        STATS.add_bytes("binary", len(record))
+
+        if not self._pending:
+            self._oldest = monotonic()
+        self._pending += 1
+        if self.options.flush_due(self._pending, self._oldest):
+            self._flush()
+
+    def flush_if_due(self) -> None:
+        if self._pending and self.options.flush_due(self._pending, self._oldest):
+            self._flush()
+
+    def _flush(self) -> None:
+        with STATS.time("flush", "binary"):
+            self._file.flush()
+            if self.options.fsync == "batch":
+                os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+            if self.options.fsync != "never":
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+            self._pending = 0
+
+
+def _export_columns(columns: dict[str, Any], fmt: str, out: TextIO) -> int:
+    """Write columns loaded by `load_columns` as CSV or JSON Lines, with NaN as missing."""
+
+    fields = [name for name in columns if name not in ("t_mono", "t_wall")]
+    rows = zip(*(columns[name].tolist() for name in ["t_wall", "t_mono", *fields]))
+
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(["timestamp", "t_mono"] + fields)
+        for t_wall, t_mono, *values in rows:
+            writer.writerow([strftime(TIMESTAMP_FORMAT, localtime(t_wall)), t_mono] + ["" if value != value else value for value in values])
+            count += 1
+        return count
+
+    for t_wall, t_mono, *values in rows:
+        nested: dict[str, Any] = {"timestamp": strftime(TIMESTAMP_FORMAT, localtime(t_wall)), "t_mono": t_mono}
+        for name, value in zip(fields, values):
+            sensor, field = split_column(name)
+            nested.setdefault(sensor, {})[field] = None if value != value else value
+        out.write(dumps(nested, separators=(",", ":")) + "\n")
+        count += 1
+    return count
+
+def export(paths: list[str], fmt: str, out: TextIO, derived: DerivedMetrics | None = None) -> int:
+    """Convert chunk files to CSV or JSON Lines.
+
+    CSV has a `timestamp` column followed by every `sensor.field` column of
+    the chunks. JSON Lines records have the same nested layout as the `jsonl`
+    output format, plus `t_mono`.
+
+    Args:
+        paths (list[str]): Chunk files, in order.
+        fmt (str): `csv` or `json`.
+        out: Text file to write to.
+        derived (DerivedMetrics, optional): Also add the derived metrics, computed over
+            whole columns at once. Needs NumPy.
+
+    Returns:
+        int: The number of records exported.
+
+    Raises:
+        ImportError: If derived metrics are asked for and NumPy is not installed.
+    """
+
+    if derived is not None:
+        columns = load_columns(paths)
+        return _export_columns({**columns, **derived.compute_columns(columns)}, fmt, out)
+
+    count = 0
+    if fmt == "csv":
+        names: list[str] = []
+        for path in paths:
+            names += [name for name, _ in read_header(path)[0] if name not in names]
+        fields = [name for name in names if name not in ("t_mono", "t_wall")]
+
+        writer = csv.writer(out)
+        writer.writerow(["timestamp", "t_mono"] + fields)
+        for path in paths:
+            for record in iter_records(path):
+                writer.writerow([strftime(TIMESTAMP_FORMAT, localtime(record["t_wall"])), record["t_mono"]] + [
+                    "" if record.get(name) is None else record[name] for name in fields
+                ])
+                count += 1
+        return count
+
+    for path in paths:
+        for record in iter_records(path):
+            nested: dict[str, Any] = {"timestamp": strftime(TIMESTAMP_FORMAT, localtime(record.pop("t_wall"))), "t_mono": record.pop("t_mono")}
+            for name, value in record.items():
+                sensor, field = split_column(name)
+                nested.setdefault(sensor, {})[field] = value
+            out.write(dumps(nested, separators=(",", ":")) + "\n")
+            count += 1
+    return count
@@ -0,0 +1,163 @@
+from threading import Lock, RLock
+from typing import Any, Callable
+
+# Bytes moved by each fixed-size SMBus transfer, not counting the address byte
+_FIXED_SIZES: dict[str, int] = {
+    "write_quick": 0,
+    "read_byte": 1,
+    "write_byte": 1,
+    "read_byte_data": 2,
+    "write_byte_data": 2,
+    "read_word_data": 3,
+    "write_word_data": 3,
+    "process_call": 5,
+}
+
+# SMBus methods that talk to the bus
+TRANSFER_METHODS: frozenset[str] = frozenset(_FIXED_SIZES) | {
+    "read_i2c_block_data",
+    "write_i2c_block_data",
+    "read_block_data",
+    "write_block_data",
+    "block_process_call",
+    "i2c_rdwr",
+}
+
+def transfer_size(method: str, args: tuple, result: Any) -> int:
+    """Return the number of data bytes moved by an SMBus call."""
+
+    if method in _FIXED_SIZES:
+        return _FIXED_SIZES[method]
+    if method == "read_i2c_block_data":
+        return 1 + args[2]
+    if method in ("write_i2c_block_data", "write_block_data"):
+        return 1 + len(args[2])
+    if method == "read_block_data":
+        return 2 + len(result)
+    if method == "block_process_call":
+        return 3 + len(args[2]) + len(result)
+    if method == "i2c_rdwr":
+        return sum(message.len for message in args)
+    return 0
+
+
+class SharedBus:
+    """An SMBus handle shared by every reader on one bus.
+
+    Behaves like `smbus2.SMBus`. Every transfer runs under the bus lock and is
+    counted. Readers that need several transfers in a row without another
+    reader cutting in can hold `lock` themselves. If a transfer fails with an
+    `OSError`, the handle is reopened and the transfer is tried once more.
+
+    Attributes:
+        bus_number (int): The I2C bus number.
+        lock (RLock): Held for the duration of every transfer.
+        transactions (int): Number of transfers made.
+        bytes (int): Number of data bytes moved.
+        errors (int): Number of transfers that raised an `OSError`.
+        reopens (int): Number of times the handle was reopened.
+
+    Args:
+        bus_number (int): The I2C bus number.
+        smbus_factory (callable): Opens a handle for a bus number, e.g. `smbus2.SMBus`.
+    """
+
+    def __init__(self, bus_number: int, smbus_factory: Callable[[int], Any]) -> None:
+        self.bus_number: int = bus_number
+        self.lock = RLock()
+        self.transactions: int = 0
+        self.bytes: int = 0
+        self.errors: int = 0
+        self.reopens: int = 0
+        self._factory = smbus_factory
+        self._bus = smbus_factory(bus_number)
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in TRANSFER_METHODS:
+            return getattr(self._bus, name)
+
+        def transfer(*args, **kwargs):
+            return self._transfer(name, args, kwargs)
+        return transfer
+
+    def _transfer(self, method: str, args: tuple, kwargs: dict) -> Any:
+        with self.lock:
+            try:
+                result = getattr(self._bus, method)(*args, **kwargs)
+            except OSError:
+                self.errors += 1
+                self._reopen()
+                result = getattr(self._bus, method)(*args, **kwargs)
+
+            self.transactions += 1
+            self.bytes += transfer_size(method, args, result)
+            return result
+
+    def _reopen(self) -> None:
+        try:
+            self._bus.close()
+        except OSError:
+            pass
+        self._bus = self._factory(self.bus_number)
+        self.reopens += 1
+
+    def close(self) -> None:
+        with self.lock:
+            self._bus.close()
+
+    def stats(self) -> dict[str, int]:
+        """Return the transfer counters of this bus."""
+
+        return {
+            "transactions": self.transactions,
+            "bytes": self.bytes,
+            "errors": self.errors,
+            "reopens": self.reopens,
+        }
+
+
+class BusManager:
+    """Hands out one `SharedBus` per bus number.
+
+    Args:
+        smbus_factory (callable, optional): Opens a handle for a bus number.
+            Defaults to `smbus2.SMBus`, imported on first use.
+    """
+
+    def __init__(self, smbus_factory: Callable[[int], Any] | None = None) -> None:
+        self._factory = smbus_factory
+        self._buses: dict[int, SharedBus] = {}
+        self._lock = Lock()
+
+    def get(self, bus_number: int) -> SharedBus:
+        """Return the shared handle of a bus, opening it the first time."""
+
+        with self._lock:
+            if bus_number not in self._buses:
+                if self._factory is None:
+                    from smbus2 import SMBus # type: ignore
+                    self._factory = SMBus
+                self._buses[bus_number] = SharedBus(bus_number, self._factory)
+            return self._buses[bus_number]
+
+    def stats(self) -> dict[int, dict[str, int]]:
+        """Return the transfer counters of every open bus."""
+
+        return {number: bus.stats() for number, bus in self._buses.items()}
+
+    def summary(self) -> str:
+        """Return a line per open bus with its transfer counters."""
+
+        return "\n".join(
+            f"Bus {number}: {stats['transactions']} transactions, {stats['bytes']} bytes, "
+            f"{stats['errors']} errors, {stats['reopens']} reopens"
+            for number, stats in self.stats().items()
+        )
+
+    def close(self) -> None:
+        """Close every open bus."""
+
+        with self._lock:
+            for bus in self._buses.values():
+                bus.close()
+            self._buses.clear()
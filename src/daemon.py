@@ -0,0 +1,192 @@
+import os
+import socket
+import socketserver
+import stat
+import sys
+from json import dumps, loads
+from threading import Lock, Thread
+from typing import Any, Callable
+
+from aggregates import Aggregator
+from scheduler import MultiRateScheduler
+
+DEFAULT_SOCKET_PATH = "/run/weathersensors.sock"
+DEFAULT_CLIENT_TIMEOUT: float = 2.0
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answers one query: a JSON line in, a JSON line out.
+
+    The request is `{"sensors": [...]}` (or an empty line for every sensor),
+    with `"aggregates": true` to also get the rolling aggregates. The response
+    is `{"readings": {...}, "timestamps": {...}}`, with the timestamps in
+    seconds since the epoch, plus `"aggregates": {...}` if asked for.
+    """
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        try:
+            request = loads(line) if line.strip() else {}
+            response = self.server.sensor_daemon.snapshot(request.get("sensors"), request.get("aggregates", False))
+        except (ValueError, AttributeError) as e:
+            response = {"error": f"Bad request: {e}"}
+        self.wfile.write(dumps(response, separators=(",", ":")).encode() + b"\n")
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    # Connections beyond the backlog fail straight away on a Unix socket
+    request_queue_size = 128
+
+
+class SensorDaemon:
+    """Keeps the sensors warm and serves their latest readings over a Unix socket.
+
+    A background thread reads the sensors on schedule and caches the latest
+    reading of each one. Clients connect to the socket and get the cached
+    readings back straight away, without touching the I2C bus, so any number
+    of consumers can query at once.
+
+    Attributes:
+        socket_path (str): Path of the Unix domain socket.
+        intervals (dict): Map of sensor names to their polling interval in seconds.
+
+    Args:
+        read (callable): Reads the named sensors, like `main.read_sensors`.
+        intervals (dict): Map of sensor names to their polling interval in seconds.
+        socket_path (str, optional): Path of the Unix domain socket. Defaults to DEFAULT_SOCKET_PATH.
+        align (bool, optional): Align the reads to the wall clock. Defaults to False.
+        aggregator (Aggregator, optional): Rolling aggregates to keep of every reading.
+    """
+
+    def __init__(self, read: Callable[[list[str]], dict[str, Any]], intervals: dict[str, float],
+                 socket_path: str = DEFAULT_SOCKET_PATH, align: bool = False,
+                 aggregator: Aggregator | None = None) -> None:
+        self.socket_path: str = socket_path
+        self.intervals: dict[str, float] = intervals
+        self._read = read
+        self._align = align
+        self._lock = Lock()
+        self._latest: dict[str, tuple[float, dict]] = {}
+        self._aggregator: Aggregator | None = aggregator
+        self._server: _Server | None = None
+
+    def sample_forever(self) -> None:
+        """Read the sensors on schedule and cache each result. Never returns.
+
+        A read that fails is reported on stderr and sampling goes on; the
+        sensors keep their last reading, whose timestamp shows its age.
+        """
+
+        scheduler = MultiRateScheduler(self.intervals, align=self._align)
+        for tick, due in scheduler.ticks():
+            try:
+                self._sample(tick.timestamp, due)
+            except Exception as e:
+                print(f"Reading {', '.join(due)} failed: {e!r}", file=sys.stderr)
+
+    def _sample(self, timestamp: float, names: list[str]) -> None:
+        data = self._read(names)
+        with self._lock:
+            for name, readings in data.items():
+                self._latest[name] = (timestamp, readings)
+            if self._aggregator is not None:
+                self._aggregator.update(data)
+
+    def snapshot(self, sensor_names: list[str] | None = None, aggregates: bool = False) -> dict[str, dict]:
+        """Return the cached readings of the named sensors (all if omitted), and their aggregates if asked for."""
+
+        with self._lock:
+            latest = dict(self._latest)
+            summary = self._aggregator.summary() if aggregates and self._aggregator is not None else {}
+
+        response: dict[str, dict] = {"readings": {}, "timestamps": {}}
+        for name in sensor_names or self.intervals:
+            if name in latest:
+                response["timestamps"][name], response["readings"][name] = latest[name]
+            else:
+                response["readings"][name] = {"error": "No reading yet"}
+        if aggregates:
+            names = sensor_names or self.intervals
+            # Keys are `sensor.field`; sensor names can contain dots, field names can't
+            response["aggregates"] = {field: values for field, values in summary.items() if field.rpartition(".")[0] in names}
+        return response
+
+    def serve_forever(self) -> None:
+        """Start sampling and answer queries on the socket until shut down.
+
+        Raises:
+            FileExistsError: If something other than a stale socket is at `socket_path`.
+        """
+
+        remove_stale_socket(self.socket_path)
+        Thread(target=self.sample_forever, name="sampler", daemon=True).start()
+
+        self._server = _Server(self.socket_path, _RequestHandler)
+        self._server.sensor_daemon = self
+        # Readings aren't sensitive; let non-root consumers query them
+        os.chmod(self.socket_path, 0o666)
+
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            os.unlink(self.socket_path)
+
+    def shutdown(self) -> None:
+        """Stop answering queries. Call from another thread."""
+
+        if self._server is not None:
+            self._server.shutdown()
+
+
+def remove_stale_socket(path: str) -> None:
+    """Remove a socket left behind by a daemon that didn't shut down cleanly.
+
+    Only a socket that refuses connections is removed; anything else at the
+    path is left alone.
+
+    Raises:
+        FileExistsError: If the path isn't a socket, or a daemon is still serving on it.
+    """
+
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and isn't a socket.")
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+    raise FileExistsError(f"A daemon is already serving on {path}.")
+
+def query_daemon(socket_path: str = DEFAULT_SOCKET_PATH, sensor_names: list[str] | None = None,
+                 timeout: float = DEFAULT_CLIENT_TIMEOUT, aggregates: bool = False) -> dict[str, dict]:
+    """Ask a running daemon for its latest readings.
+
+    Args:
+        socket_path (str, optional): Path of the daemon's socket. Defaults to DEFAULT_SOCKET_PATH.
+        sensor_names (list[str], optional): Sensors to get. If omitted, gets all of them.
+        timeout (float, optional): Seconds to wait for the daemon. Defaults to DEFAULT_CLIENT_TIMEOUT.
+        aggregates (bool, optional): Also get the rolling aggregates. Defaults to False.
+
+    Returns:
+        dict: `{"readings": {...}, "timestamps": {...}}` as sent by the daemon, plus `"aggregates"` if asked for.
+
+    Raises:
+        OSError: If the daemon can't be reached.
+    """
+
+    request: dict[str, Any] = {"sensors": sensor_names} if sensor_names else {}
+    if aggregates:
+        request["aggregates"] = True
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(dumps(request).encode() + b"\n")
+        with sock.makefile("rb") as f:
+            return loads(f.readline())
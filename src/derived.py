@@ -0,0 +1,174 @@
+"""Metrics derived from the raw readings: dew point, sea-level pressure, heat index and IAQ.
+
+Every formula works on plain floats (for the live polling loop) and on NumPy
+arrays (for backfilling whole logs in one go), using the same code. NumPy is
+only imported when an array is passed in.
+"""
+
+import math
+from typing import Any, Mapping
+
+# Magnus formula coefficients (over water, -45 to 60 °C)
+MAGNUS_A: float = 17.62
+MAGNUS_B: float = 243.12
+# Humidity and gas baseline the air quality score is measured against
+IAQ_HUMIDITY_BASELINE: float = 40.0
+IAQ_HUMIDITY_WEIGHTING: float = 0.25
+DEFAULT_GAS_BASELINE: float = 50_000.0
+
+def _ops(*values: Any):
+    """Return the module to do maths on the values with: NumPy for arrays, otherwise `math`."""
+
+    if any(hasattr(value, "__array__") for value in values):
+        import numpy
+        return numpy
+    return math
+
+def _where(condition: Any, if_true: Any, if_false: Any) -> Any:
+    if hasattr(condition, "__array__"):
+        import numpy
+        return numpy.where(condition, if_true, if_false)
+    return if_true if condition else if_false
+
+def dew_point(temperature: Any, humidity: Any) -> Any:
+    """Return the dew point in °C from the temperature (°C) and relative humidity (%)."""
+
+    ops = _ops(temperature, humidity)
+    gamma = ops.log(humidity / 100) + MAGNUS_A * temperature / (MAGNUS_B + temperature)
+    return MAGNUS_B * gamma / (MAGNUS_A - gamma)
+
+def sea_level_pressure(pressure: Any, temperature: Any, altitude: float) -> Any:
+    """Return the pressure (hPa) reduced to sea level from the station's altitude (m) and temperature (°C)."""
+
+    return pressure * (1 - 0.0065 * altitude / (temperature + 0.0065 * altitude + 273.15)) ** -5.257
+
+def heat_index(temperature: Any, humidity: Any) -> Any:
+    """Return the heat index ("feels like" temperature) in °C, by the US National Weather Service method."""
+
+    ops = _ops(temperature, humidity)
+    t = temperature * 9 / 5 + 32
+    rh = humidity
+
+    simple = 0.5 * (t + 61.0 + (t - 68.0) * 1.2 + rh * 0.094)
+    full = (
+        -42.379 + 2.04901523 * t + 10.14333127 * rh - 0.22475541 * t * rh
+        - 0.00683783 * t * t - 0.05481717 * rh * rh + 0.00122874 * t * t * rh
+        + 0.00085282 * t * rh * rh - 0.00000199 * t * t * rh * rh
+    )
+    # Adjustments for dry heat and for humid, moderate heat
+    if ops is math:
+        dry = rh < 13 and 80 <= t <= 112
+        humid = rh > 85 and 80 <= t <= 87
+        absolute = math.fabs
+    else:
+        dry = (rh < 13) & (t >= 80) & (t <= 112)
+        humid = (rh > 85) & (t >= 80) & (t <= 87)
+        absolute = ops.abs
+    full = _where(dry, full - (13 - rh) / 4 * ops.sqrt(absolute(17 - absolute(t - 95)) / 17), full)
+    full = _where(humid, full + (rh - 85) / 10 * (87 - t) / 5, full)
+
+    index = _where((simple + t) / 2 >= 80, full, simple)
+    return (index - 32) * 5 / 9
+
+def air_quality(gas_resistance: Any, humidity: Any, gas_baseline: float = DEFAULT_GAS_BASELINE) -> Any:
+    """Return an indoor air quality index from 0 (clean) to 500 (very polluted).
+
+    This is the usual open-source approximation: a 0-100 score made up of
+    how far the humidity is from IAQ_HUMIDITY_BASELINE (25%) and how far the
+    gas resistance has dropped below its clean-air baseline (75%), scaled to
+    the 0-500 range of Bosch's IAQ. It is not Bosch's (closed-source) BSEC IAQ.
+    """
+
+    humidity_share = IAQ_HUMIDITY_WEIGHTING * 100
+    offset = humidity - IAQ_HUMIDITY_BASELINE
+    humidity_score = _where(
+        offset > 0,
+        (100 - IAQ_HUMIDITY_BASELINE - offset) / (100 - IAQ_HUMIDITY_BASELINE) * humidity_share,
+        (IAQ_HUMIDITY_BASELINE + offset) / IAQ_HUMIDITY_BASELINE * humidity_share,
+    )
+    gas_score = _where(
+        gas_resistance < gas_baseline,
+        gas_resistance / gas_baseline * (100 - humidity_share),
+        100 - humidity_share,
+    )
+    return (100 - (humidity_score + gas_score)) * 5
+
+
+class DerivedMetrics:
+    """Adds derived metrics to the readings of any sensor that has the fields they need.
+
+    - `dew_point` and `heat_index` need `temperature` and `humidity`.
+    - `sea_level_pressure` needs `pressure`, `temperature` and the station altitude.
+    - `iaq` needs `gas_resistance` and `humidity`.
+
+    Args:
+        altitude (float, optional): Altitude of the station in metres. Without it, sea-level pressure isn't derived.
+        gas_baseline (float, optional): Gas resistance (Ω) of the sensor in clean air. Defaults to DEFAULT_GAS_BASELINE.
+    """
+
+    def __init__(self, altitude: float | None = None, gas_baseline: float = DEFAULT_GAS_BASELINE) -> None:
+        self.altitude: float | None = altitude
+        self.gas_baseline: float = gas_baseline
+
+    @classmethod
+    def from_config(cls, section: Mapping[str, str] | None) -> "DerivedMetrics":
+        """Create from the `[station]` section of the config (which may be missing).
+
+        Raises:
+            ValueError: If a setting isn't a number.
+        """
+
+        section = section or {}
+        altitude = float(section["altitude"]) if "altitude" in section else None
+        return cls(altitude, float(section.get("gas_baseline", DEFAULT_GAS_BASELINE)))
+
+    def compute(self, fields: Mapping[str, Any]) -> dict[str, Any]:
+        """Return the metrics that can be derived from a sensor's fields (floats or arrays)."""
+
+        derived = {}
+        temperature, humidity = fields.get("temperature"), fields.get("humidity")
+        if temperature is not None and humidity is not None:
+            derived["dew_point"] = dew_point(temperature, humidity)
+            derived["heat_index"] = heat_index(temperature, humidity)
+        if self.altitude is not None and fields.get("pressure") is not None and temperature is not None:
+            derived["sea_level_pressure"] = sea_level_pressure(fields["pressure"], temperature, self.altitude)
+        if fields.get("gas_resistance") is not None and humidity is not None:
+            derived["iaq"] = air_quality(fields["gas_resistance"], humidity, self.gas_baseline)
+        return derived
+
+    def apply(self, data: dict[str, dict]) -> dict[str, dict]:
+        """Add the derived metrics to each sensor's readings, in place, and return them."""
+
+        for readings in data.values():
+            if isinstance(readings, dict) and "error" not in readings:
+                try:
+                    readings.update(self.compute(readings))
+                except (ArithmeticError, TypeError, ValueError):
+                    # e.g. a humidity of 0, which has no dew point
+                    pass
+        return data
+
+    def compute_columns(self, columns: Mapping[str, Any]) -> dict[str, Any]:
+        """Derive metrics from whole columns at once, as loaded by `binlog.load_columns`.
+
+        Args:
+            columns (dict): NumPy arrays by `sensor.field` name.
+
+        Returns:
+            dict: The derived columns, named `sensor.metric`.
+        """
+
+        import numpy
+
+        sensors: dict[str, dict[str, Any]] = {}
+        for name, values in columns.items():
+            sensor, _, field = name.rpartition(".")
+            if sensor:
+                sensors.setdefault(sensor, {})[field] = values
+
+        derived = {}
+        # Missing values are NaN and stay NaN; don't warn about them
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            for sensor, fields in sensors.items():
+                derived.update({f"{sensor}.{metric}": values for metric, values in self.compute(fields).items()})
+        return derived
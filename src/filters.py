@@ -0,0 +1,160 @@
+from math import floor
+from time import monotonic
+from typing import Any, Mapping, NamedTuple
+
+class DeadbandSettings(NamedTuple):
+    """When a sensor's reading is worth writing.
+
+    Attributes:
+        default (float | None): How far any field must move, unless it has its own deadband. None to only go by `fields`.
+        fields (dict): How far each named field must move.
+        heartbeat (float | None): Write the reading anyway once this many seconds have passed since the last one written.
+    """
+
+    default: float | None
+    fields: dict[str, float]
+    heartbeat: float | None
+
+    @classmethod
+    def from_config(cls, section: Mapping[str, str]) -> "DeadbandSettings | None":
+        """Read the `deadband`, `deadband.<field>` and `heartbeat` keys of a sensor's config section.
+
+        Returns:
+            DeadbandSettings | None: The settings, or None if the section has none.
+
+        Raises:
+            ValueError: If a setting isn't a number.
+        """
+
+        default = float(section["deadband"]) if "deadband" in section else None
+        fields = {key.removeprefix("deadband."): float(value) for key, value in section.items() if key.startswith("deadband.")}
+        heartbeat = float(section["heartbeat"]) if "heartbeat" in section else None
+        if default is None and not fields and heartbeat is None:
+            return None
+        if default is None and not fields:
+            # A heartbeat on its own: write on any change, or when it expires
+            default = 0.0
+        return cls(default, fields, heartbeat)
+
+
+class DeadbandFilter:
+    """Drops sensor readings that haven't moved since the last one written.
+
+    A sensor's reading is kept if any of its fields has moved further than its
+    deadband from the value last written, if a field has appeared or changed
+    type, if it is an error, or if the sensor's heartbeat has expired. Kept
+    readings are kept whole, so every record still has all of a sensor's
+    fields. Sensors without settings are always kept.
+
+    Args:
+        settings (dict): Map of sensor names to their `DeadbandSettings`.
+    """
+
+    def __init__(self, settings: dict[str, DeadbandSettings]) -> None:
+        self.settings: dict[str, DeadbandSettings] = settings
+        self._written: dict[str, tuple[float, dict]] = {}
+
+    def _changed(self, settings: DeadbandSettings, previous: dict, readings: dict) -> bool:
+        for field, value in readings.items():
+            threshold = settings.fields.get(field, settings.default)
+            if threshold is None:
+                continue
+            last = previous.get(field)
+            if isinstance(value, (int, float)) and isinstance(last, (int, float)):
+                if abs(value - last) > threshold:
+                    return True
+            elif value != last:
+                return True
+        return False
+
+    def apply(self, data: dict[str, dict], now: float | None = None) -> dict[str, dict]:
+        """Return the readings worth writing (possibly none)."""
+
+        now = monotonic() if now is None else now
+        kept = {}
+        for sensor, readings in data.items():
+            settings = self.settings.get(sensor)
+            if settings is None or not isinstance(readings, dict) or "error" in readings:
+                kept[sensor] = readings
+                continue
+
+            written = self._written.get(sensor)
+            if (
+                written is None
+                or (settings.heartbeat is not None and now - written[0] >= settings.heartbeat)
+                or self._changed(settings, written[1], readings)
+            ):
+                self._written[sensor] = (now, readings)
+                kept[sensor] = readings
+        return kept
+
+
+class Downsampler:
+    """Averages readings over fixed periods, so fast sampling doesn't mean fast writing.
+
+    Readings are grouped into periods of `seconds` (by their timestamp, so the
+    periods line up with the clock). When a reading arrives in a new period,
+    the previous period is returned with the mean of each numeric field and
+    the last value of any other field. Missing (None) values are left out of
+    the mean. A sensor that only had errors in a period gets its last error.
+
+    Args:
+        seconds (float): Length of each period.
+    """
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds: float = seconds
+        self._period: int | None = None
+        self._sums: dict[str, dict[str, list]] = {}
+        self._errors: dict[str, dict] = {}
+
+    def add(self, data: dict[str, dict], timestamp: float) -> dict[str, dict] | None:
+        """Add a reading taken at `timestamp` (seconds since the epoch).
+
+        Returns:
+            dict | None: The downsampled reading of the period that just ended, if any.
+        """
+
+        period = floor(timestamp / self.seconds)
+        finished = None
+        if self._period is not None and period != self._period:
+            finished = self.flush()
+        self._period = period
+
+        for sensor, readings in data.items():
+            if not isinstance(readings, dict):
+                continue
+            if "error" in readings:
+                self._errors[sensor] = readings
+                continue
+            sums = self._sums.setdefault(sensor, {})
+            for field, value in readings.items():
+                entry = sums.get(field)
+                if value is None:
+                    # e.g. a failed probe; the field is only None if it never had a value
+                    sums.setdefault(field, [None, None])
+                elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                    # Keep the last non-numeric value, but never in place of a mean
+                    if entry is None or entry[1] is None:
+                        sums[field] = [value, None]
+                elif entry is None or entry[1] is None:
+                    sums[field] = [value, 1]
+                else:
+                    entry[0] += value
+                    entry[1] += 1
+        return finished
+
+    def flush(self) -> dict[str, dict] | None:
+        """Return the downsampled reading of the current period (None if it is empty) and start afresh."""
+
+        result: dict[str, dict[str, Any]] = {}
+        for sensor in dict.fromkeys([*self._sums, *self._errors]):
+            sums = self._sums.get(sensor)
+            if sums:
+                result[sensor] = {field: total if count is None else total / count for field, (total, count) in sums.items()}
+            else:
+                result[sensor] = self._errors[sensor]
+        self._sums.clear()
+        self._errors.clear()
+        self._period = None
+        return result or None
@@ -0,0 +1,176 @@
+import os
+from bisect import bisect_left
+from contextlib import nullcontext
+from threading import Lock
+from time import perf_counter
+
+# Upper bounds (in seconds) of the latency histogram buckets
+BUCKETS: tuple[float, ...] = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+_DISABLED = nullcontext()
+
+class Histogram:
+    """A latency histogram with fixed buckets.
+
+    Attributes:
+        counts (list[int]): Observations per bucket, with one extra bucket for anything over the last bound.
+        count (int): Number of observations.
+        total (float): Sum of the observations in seconds.
+        max (float): Largest observation in seconds.
+    """
+
+    def __init__(self) -> None:
+        self.counts: list[int] = [0] * (len(BUCKETS) + 1)
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Return the upper bound of the bucket holding the `q` quantile (0-1)."""
+
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+
+class _Timer:
+    __slots__ = ("_stats", "_key", "_start")
+
+    def __init__(self, stats: "Stats", key: tuple[str, str]) -> None:
+        self._stats = stats
+        self._key = key
+
+    def __enter__(self) -> None:
+        self._start = perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        self._stats.observe(self._key[0], self._key[1], perf_counter() - self._start)
+
+
+class Stats:
+    """Per-stage latency histograms and counters for the polling loop.
+
+    Stages are things like `read` (labelled by sensor), `format` and `write`
+    (labelled by output format) and `cycle`. When disabled, `time` returns a
+    shared no-op context manager and the other methods return straight away,
+    so the hooks cost next to nothing.
+
+    Attributes:
+        enabled (bool): Whether anything is recorded.
+        histograms (dict): Latency histogram of each `(stage, label)`.
+        errors (dict): Number of errors of each sensor.
+        bytes_written (dict): Bytes written by each output format.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled: bool = enabled
+        self.histograms: dict[tuple[str, str], Histogram] = {}
+        self.errors: dict[str, int] = {}
+        self.bytes_written: dict[str, int] = {}
+        self._lock = Lock()
+
+    def time(self, stage: str, label: str = ""):
+        """Return a context manager that records how long its block takes."""
+
+        if not self.enabled:
+            return _DISABLED
+        return _Timer(self, (stage, label))
+
+    def observe(self, stage: str, label: str, seconds: float) -> None:
+        """Record a latency in seconds."""
+
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get((stage, label))
+            if histogram is None:
+                histogram = self.histograms[(stage, label)] = Histogram()
+            histogram.observe(seconds)
+
+    def count_error(self, sensor: str) -> None:
+        if self.enabled:
+            with self._lock:
+                self.errors[sensor] = self.errors.get(sensor, 0) + 1
+
+    def add_bytes(self, fmt: str, count: int) -> None:
+        if self.enabled:
+            with self._lock:
+                self.bytes_written[fmt] = self.bytes_written.get(fmt, 0) + count
+
+    def summary(self) -> str:
+        """Return a human-readable report of everything recorded."""
+
+        with self._lock:
+            lines = []
+            for (stage, label), histogram in sorted(self.histograms.items()):
+                name = f"{stage}[{label}]" if label else stage
+                mean = histogram.total / histogram.count if histogram.count else 0.0
+                lines.append(
+                    f"{name}: n={histogram.count} mean={mean * 1000:.3f}ms "
+                    f"p50<={histogram.quantile(0.5) * 1000:.3f}ms p99<={histogram.quantile(0.99) * 1000:.3f}ms "
+                    f"max={histogram.max * 1000:.3f}ms"
+                )
+            for sensor, count in sorted(self.errors.items()):
+                lines.append(f"errors[{sensor}]: {count}")
+            for fmt, count in sorted(self.bytes_written.items()):
+                lines.append(f"bytes_written[{fmt}]: {count}")
+            return "\n".join(lines)
+
+    def prometheus(self, buses: dict[int, dict[str, int]] | None = None) -> str:
+        """Return everything recorded in the Prometheus text exposition format.
+
+        Args:
+            buses (dict, optional): Bus counters to include, as returned by `BusManager.stats`.
+        """
+
+        with self._lock:
+            lines = [
+                "# HELP weathersensors_stage_seconds Time spent in each stage of the polling loop.",
+                "# TYPE weathersensors_stage_seconds histogram",
+            ]
+            for (stage, label), histogram in sorted(self.histograms.items()):
+                labels = f'stage="{stage}",label="{label}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'weathersensors_stage_seconds_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+                lines.append(f'weathersensors_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"weathersensors_stage_seconds_sum{{{labels}}} {histogram.total:.9f}")
+                lines.append(f"weathersensors_stage_seconds_count{{{labels}}} {histogram.count}")
+
+            lines += ["# TYPE weathersensors_errors_total counter"]
+            lines += [f'weathersensors_errors_total{{sensor="{sensor}"}} {count}' for sensor, count in sorted(self.errors.items())]
+            lines += ["# TYPE weathersensors_bytes_written_total counter"]
+            lines += [f'weathersensors_bytes_written_total{{format="{fmt}"}} {count}' for fmt, count in sorted(self.bytes_written.items())]
+
+        for key in ("transactions", "bytes", "errors", "reopens"):
+            lines.append(f"# TYPE weathersensors_bus_{key}_total counter")
+            lines += [f'weathersensors_bus_{key}_total{{bus="{number}"}} {stats[key]}' for number, stats in sorted((buses or {}).items())]
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, buses: dict[int, dict[str, int]] | None = None) -> None:
+        """Write the Prometheus export to a file, replacing it atomically."""
+
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(self.prometheus(buses))
+        os.replace(temp_path, path)
+
+
+# Shared by the whole process; enabled by `--profile`
+STATS = Stats()
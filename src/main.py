@@ -1,22 +1,45 @@
 from argparse import ArgumentParser, Namespace
-from sys import platform, stderr, exit
-from time import strftime, sleep
-from json import dumps, loads
-from typing import Any
+from sys import platform, stderr, stdout, exit
+from typing import Any, Callable, NamedTuple
+from time import monotonic, sleep
 from pathlib import Path
-from BME680 import BME680Reader
-from DS18B20 import DS18B20Reader
+from json import dumps
+import signal
+from importlib import import_module
+from functools import cache
+from contextlib import nullcontext
+from scheduler import MultiRateScheduler, Scheduler
+from acquisition import AcquisitionEngine, DEFAULT_TIMEOUT
+from aggregates import Aggregator, parse_window
+from bus import BusManager
+from derived import DerivedMetrics
+from filters import DeadbandFilter, DeadbandSettings, Downsampler
+from instrumentation import STATS
+from daemon import DEFAULT_SOCKET_PATH, SensorDaemon, query_daemon
+from output import FSYNC_POLICIES, OutputOptions, parse_size
+from writers import FILE_ONLY_FORMATS, WRITERS, compile_template, open_writer, convert_json_to_jsonl, format_sensor_data
 import configparser
 
 VERSION = "1.0.1"
 DEFAULT_CONFIG_PATH = "sensors.ini"
 
-# Map of sensor names to their respective reader functions
-SENSOR_MAP: dict[str, type] = {
-    "bme680": BME680Reader,
-    "ds18b20": DS18B20Reader
+# Map of sensor names to their reader classes, as `module:class`. The driver
+# modules are only imported when a sensor is set up, so `--list` and config
+# checks don't pay for (or need) the hardware libraries.
+SENSOR_MAP: dict[str, str] = {
+    "bme680": "BME680:BME680Reader",
+    "ds18b20": "DS18B20:DS18B20Reader",
+    "ads7830": "ADS7830:ADS7830Reader"
 }
 SENSOR_INSTANCES: dict[str, object] = {}
+SENSOR_TIMEOUTS: dict[str, float] = {}
+SENSOR_INTERVALS: dict[str, float] = {}
+SENSOR_DEADBANDS: dict[str, DeadbandSettings] = {}
+ENGINE = AcquisitionEngine(SENSOR_INSTANCES, SENSOR_TIMEOUTS)
+# Seconds between the idle tasks (e.g. a requested stats report) while waiting for the next read
+IDLE_POLL_INTERVAL: float = 0.5
+REPORT_REQUESTED: bool = False
+BUS_MANAGER = BusManager()
 
 def parse_args() -> Namespace:
     """Parse and return command line arguments."""
@@ -28,46 +51,251 @@ def parse_args() -> Namespace:
         "-s",
         "--sensor",
         nargs="+",
-        choices=list(SENSOR_MAP.keys()),
-        help="Sensor(s) to read from. If omitted, reads all.",
+        metavar="SENSOR",
+        help="Sensor(s) to read from: a type (e.g. `bme680`, for all of them) or a named one (e.g. `bme680.outdoor`). If omitted, reads all.",
     )
     parser.add_argument("-c", "--config", help=f"Path to the configuration file. If omitted, defaults to `./{DEFAULT_CONFIG_PATH}`.")
-    parser.add_argument("-i", "--interval", type=int, help="Interval (in seconds) between reads.")
-    parser.add_argument("-c", "--count", type=int, help="Number of reads to perform (requires --interval). If omitted, reads indefinitely.")
-    parser.add_argument("-j", "--json", action="store_true", help="Output in JSON format.")
+    parser.add_argument("--simulate", action="store_true", help="Use simulated sensors instead of the hardware.")
+    parser.add_argument("--check-config", action="store_true", help="Check the configuration file and exit, without touching the sensors.")
+    parser.add_argument("-i", "--interval", type=float, help="Interval (in seconds) between reads. Can be less than a second.")
+    parser.add_argument("--align", action="store_true", help="Align reads to wall-clock multiples of --interval (e.g. `:00` of every minute).")
+    parser.add_argument("-n", "--count", type=int, help="Number of reads to perform (requires --interval). If omitted, reads indefinitely.")
+    parser.add_argument("-j", "--json", action="store_true", help="Output in JSON format. Same as `--format json`.")
+    parser.add_argument("-f", "--format", choices=list(WRITERS), default="text", help="Output format. Defaults to `text`.")
+    parser.add_argument("--template", help="Row template of the template format, e.g. `\"{timestamp} {bme680.temperature:.1f}\"`. Implies `--format template`.")
+    parser.add_argument("--line-buffered", action="store_true", help="Write console output after every reading, even into a pipe.")
     parser.add_argument("--overwrite", action="store_true", help="Overwrites data in output file.")
     parser.add_argument("-t", "--timestamps", action="store_true", help="Add timestamps to output.")
     parser.add_argument("-o", "--output", help="Output file path.")
+    parser.add_argument("--batch", type=int, default=1, help="Number of readings to buffer before writing to the output file. Defaults to 1.")
+    parser.add_argument("--flush-interval", type=float, default=0.0, help="Also write buffered readings once the oldest is this many seconds old.")
+    parser.add_argument("--fsync", choices=FSYNC_POLICIES, default="never", help="When to sync the output file to the disk. Defaults to `never` (left to the OS).")
+    parser.add_argument("--rotate-size", type=parse_size, default=0, help="Start a new output file once it would grow past this size (e.g. `10M`).")
+    parser.add_argument("--rotate-daily", action="store_true", help="Start a new output file every day.")
+    parser.add_argument("--compress", action="store_true", help="Gzip rotated output files.")
+    parser.add_argument("--profile", "--stats", dest="profile", action="store_true", help="Record per-sensor and per-stage timings and print a report on exit or SIGUSR1.")
+    parser.add_argument("--stats-file", help="Also write the timing report in Prometheus text format to this file (implies --profile).")
+    parser.add_argument("--derived", action="store_true", help="Add dew point, heat index, sea-level pressure and air quality to the readings.")
+    parser.add_argument("--aggregate", nargs="+", type=parse_window, metavar="WINDOW", help="Add rolling mean/min/max/change over these windows (e.g. `1h 24h`) to each reading (requires --interval).")
+    parser.add_argument("--downsample", type=parse_window, metavar="PERIOD", help="Write the mean of each field over every PERIOD (e.g. `1m`) instead of every reading (requires --interval).")
+    parser.add_argument("--upload", metavar="URL", help="Also send readings to this http(s):// or mqtt://host/topic URL, spooling them on disk until delivered.")
+    parser.add_argument("--spool", default="weathersensors-spool.db", help="Spool database for --upload. Defaults to `weathersensors-spool.db`.")
+    parser.add_argument("--upload-batch", type=int, default=100, help="Most readings sent per upload. Defaults to 100.")
+    parser.add_argument("--socket", help="Get readings from a running daemon listening on this socket instead of the sensors.")
+
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    convert = subparsers.add_parser("convert", help="Convert a legacy JSON output file to JSON Lines.")
+    convert.add_argument("source", help="Legacy JSON file with `reading_N` keys.")
+    convert.add_argument("destination", help="JSON Lines file to append the readings to.")
+
+    bench = subparsers.add_parser("bench", help="Benchmark reading and output with simulated sensors.")
+    bench.add_argument("--cycles", type=int, default=200, help="Number of reads and writes to time. Defaults to 200.")
+    bench.add_argument("--latency-scale", type=float, default=0.01, help="Fraction of the real sensors' read time the simulated ones take. Defaults to 0.01.")
+    bench.add_argument("--save", help="Also save the report as JSON to this path.")
+
+    export = subparsers.add_parser("export", help="Convert binary log files to CSV or JSON Lines.")
+    export.add_argument("files", nargs="+", help="Chunk files, or the base path given to `-o` when capturing.")
+    export.add_argument("--to", choices=["csv", "json"], default="csv", help="Format to convert to. Defaults to `csv`.")
+    export.add_argument("--derived", dest="export_derived", action="store_true", help="Add the derived metrics (see --derived). Needs NumPy.")
+    export.add_argument("-o", "--output", dest="export_output", help="File to write to. If omitted, writes to the console.")
+
+    query = subparsers.add_parser("query", help="Query readings stored with `-o sqlite:///path.db`.")
+    query.add_argument("database", help="Database file or `sqlite:///path.db` URL.")
+    query.add_argument("--from", dest="start", help="Earliest time: ISO date/time, seconds since the epoch, or a duration ago like `24h`.")
+    query.add_argument("--to", dest="end", help="Latest time (exclusive), in the same forms as --from.")
+    query.add_argument("--sensor", dest="query_sensors", nargs="+", help="Only these sensors. A type (e.g. `bme680`) includes its named sensors.")
+    query.add_argument("--field", dest="query_fields", nargs="+", help="Only these fields.")
+    query.add_argument("--resample", type=parse_window, metavar="PERIOD", help="Average into buckets of this length (e.g. `5m`), with min, max and count.")
+    query.add_argument("-f", "--format", dest="query_format", choices=["csv", "json"], default="csv", help="Output format. Defaults to `csv`.")
+
+    scan = subparsers.add_parser("scan", help="Find known sensors on the I2C buses and print a config for them.")
+    scan.add_argument("--bus", dest="scan_buses", type=int, nargs="+", help="Buses to scan. Defaults to the buses in the config, or every I2C bus.")
+    scan.add_argument("-o", "--output", dest="scan_output", help="Write the config to this new file instead of the console.")
+
+    daemon = subparsers.add_parser("daemon", help="Keep reading the sensors and serve the latest readings on a Unix socket.")
+    daemon.add_argument("--socket", dest="daemon_socket", default=DEFAULT_SOCKET_PATH, help=f"Socket path. Defaults to `{DEFAULT_SOCKET_PATH}`.")
+    daemon.add_argument("-i", "--interval", dest="daemon_interval", type=float, default=10.0, help="Interval (in seconds) between reads. Defaults to 10.")
+    daemon.add_argument("--align", dest="daemon_align", action="store_true", help="Align reads to wall-clock multiples of the interval.")
+    daemon.add_argument("--aggregate", dest="daemon_aggregate", nargs="+", type=parse_window, metavar="WINDOW", help="Keep rolling aggregates over these windows (e.g. `1h 24h`) for clients to query.")
+
     return parser.parse_args()
 
-def setup_sensors(config_path:str = None) -> None:
-    """Initialize and configure the sensors. Populate the SENSOR_MAP dictionary."""
+class SensorConfig(NamedTuple):
+    """The validated config section of a sensor."""
+
+    sensor_class: type
+    address: int
+    bus: int
+    timeout: float
+    interval: float | None
+    options: dict
+    deadband: DeadbandSettings | None = None
+
+def load_sensor_class(sensor: str) -> type:
+    """Import and return the reader class of a sensor type."""
+
+    module_name, _, class_name = SENSOR_MAP[sensor].partition(":")
+    return getattr(import_module(module_name), class_name)
+
+@cache
+def read_config(config_path: str | None = None) -> configparser.ConfigParser:
+    """Read the config file (the default one if no path is given), once per run."""
+
     config = configparser.ConfigParser()
 
     if config_path:
         config.read(config_path)
     else:
-        print("No config specified, using default config file: " + DEFAULT_CONFIG_PATH)
+        print("No config specified, using default config file: " + DEFAULT_CONFIG_PATH, file=stderr)
         config.read(DEFAULT_CONFIG_PATH)
 
-    # Add the sensors
-    for sensor in SENSOR_MAP.keys():
+    return config
+
+def sensor_type(name: str) -> str:
+    """Return the type of a sensor: `bme680` for both `bme680` and `bme680.outdoor`."""
+
+    return name.partition(".")[0]
+
+def configured_sensors(config: configparser.ConfigParser) -> list[str]:
+    """Return the sensors with a section in the config.
+
+    `[sensors.bme680]` is named `bme680`, and `[sensors.bme680.outdoor]`
+    `bme680.outdoor`, so there can be several sensors of one type.
+    """
+
+    return [section.removeprefix("sensors.") for section in config.sections() if section.startswith("sensors.")]
 
-        if not config.has_section(f"sensors.{sensor}"):
-            print(f"Error in config file: No `[sensors.{sensor}]` section found.", file=stderr)
+def select_sensors(config_path: str | None = None, requested: list[str] | None = None, simulate: bool = False) -> list[str]:
+    """Return the names of the sensors to read.
+
+    A requested sensor type (e.g. `bme680`) selects every configured sensor of
+    that type. If nothing is requested, every configured sensor is selected,
+    plus, when simulating, every type that isn't configured. A config without
+    any sensors selects every type, so `load_config` can say what is missing.
+    """
+
+    configured = configured_sensors(read_config(config_path))
+    if not requested:
+        if simulate:
+            configured += [sensor for sensor in SENSOR_MAP if sensor not in map(sensor_type, configured)]
+        return configured or list(SENSOR_MAP)
+
+    selected = []
+    for name in requested:
+        matches = [sensor for sensor in configured if sensor == name or ("." not in name and sensor_type(sensor) == name)]
+        selected += matches or [name]
+    return list(dict.fromkeys(selected))
+
+def load_derived_metrics(config_path: str | None = None) -> DerivedMetrics:
+    """Set up the derived metrics from the `[station]` section of the config.
+
+    Exits with an error message if the section is invalid.
+    """
+
+    config = read_config(config_path)
+    try:
+        return DerivedMetrics.from_config(config["station"] if config.has_section("station") else None)
+    except ValueError as e:
+        print(f"Error in config file: [station]: {e}", file=stderr)
+        exit(1)
+
+def load_config(config_path: str = None, sensor_names: list[str] = None, simulate: bool = False) -> dict[str, SensorConfig]:
+    """Read and validate the config sections of the given sensors (see `select_sensors` if omitted).
+
+    Sensors are simulated if `simulate` is set or their section has
+    `simulate = true`. Simulated sensors don't need a config section.
+
+    Nothing here touches the hardware, so this is safe to run anywhere.
+    Exits with an error message if the config is invalid.
+    """
+    config = read_config(config_path)
+
+    sensor_configs: dict[str, SensorConfig] = {}
+    for sensor in sensor_names or select_sensors(config_path, None, simulate):
+        kind = sensor_type(sensor)
+        section_name = f"sensors.{sensor}"
+        if kind not in SENSOR_MAP:
+            print(f"Unknown sensor `{sensor}`. Available types: {', '.join(SENSOR_MAP)}.", file=stderr)
             exit(1)
+        simulated = simulate or config.getboolean(section_name, "simulate", fallback=False)
+
+        if not config.has_section(section_name):
+            if not simulated:
+                if not configured_sensors(config):
+                    print("Error in config file: No sensors configured. Run `weathersensors scan` to find them.", file=stderr)
+                else:
+                    print(f"Error in config file: No `[{section_name}]` section found.", file=stderr)
+                exit(1)
+            config.add_section(section_name)
         
-        sensor_section = config[f"sensors.{sensor}"]
+        sensor_section = config[section_name]
+        if simulated:
+            # Simulated sensors don't need an address or bus
+            sensor_section.setdefault("address", "0x00")
+            sensor_section.setdefault("bus", "0")
 
-        addr: int = int(sensor_section["address"], 16)
-        bus: int = int(sensor_section["bus"])
-        sensor_class: object = SENSOR_MAP[sensor]
+        try:
+            if simulated:
+                from simulated import SimulatedReader
+                sensor_class: type = SimulatedReader
+                options: dict = {"kind": kind, **SimulatedReader.options_from_config(sensor_section)}
+            else:
+                sensor_class: type = load_sensor_class(kind)
+                # Readers with extra settings (e.g. ADC channels) read them from their own section
+                options: dict = {}
+                if hasattr(sensor_class, "options_from_config"):
+                    options = sensor_class.options_from_config(sensor_section)
+
+            sensor_configs[sensor] = SensorConfig(
+                sensor_class=sensor_class,
+                address=int(sensor_section["address"], 16),
+                bus=int(sensor_section["bus"]),
+                timeout=sensor_section.getfloat("timeout", DEFAULT_TIMEOUT),
+                interval=sensor_section.getfloat("interval"),
+                options=options,
+                deadband=DeadbandSettings.from_config(sensor_section),
+            )
+        except KeyError as e:
+            print(f"Error in config file: [{section_name}]: Missing key {e}.", file=stderr)
+            exit(1)
+        except ValueError as e:
+            print(f"Error in config file: [{section_name}]: {e}", file=stderr)
+            exit(1)
+
+    return sensor_configs
+
+def configured_buses(config_path: str | None = None) -> list[int]:
+    """Return the I2C buses of the configured hardware sensors, for `scan`."""
+
+    config = read_config(config_path)
+    buses = set()
+    for sensor in configured_sensors(config):
+        section = config[f"sensors.{sensor}"]
+        if not section.getboolean("simulate", fallback=False) and section.get("bus", "").strip().isdigit():
+            buses.add(int(section["bus"]))
+    return sorted(buses)
 
-        print(f"Initializing {sensor} sensor at address {addr} on bus {bus}...")
+def setup_sensors(config_path: str = None, sensor_names: list[str] = None, simulate: bool = False) -> None:
+    """Initialize and configure the given sensors (all configured if omitted). Populate the SENSOR_INSTANCES dictionary."""
 
-        SENSOR_INSTANCES[sensor] = sensor_class(device_address=addr, bus_number=bus)
+    for sensor, sensor_config in load_config(config_path, sensor_names, simulate).items():
+        addr, bus = sensor_config.address, sensor_config.bus
+
+        print(f"Initializing {sensor} sensor at address {addr} on bus {bus}...", file=stderr)
+
+        # Every I2C reader on a bus shares a single handle to it
+        options = dict(sensor_config.options)
+        if getattr(sensor_config.sensor_class, "BUS", "i2c") == "i2c":
+            options["bus"] = BUS_MANAGER.get(bus)
+
+        SENSOR_INSTANCES[sensor] = sensor_config.sensor_class(device_address=addr, bus_number=bus, **options)
+        SENSOR_TIMEOUTS[sensor] = sensor_config.timeout
+        if sensor_config.interval is not None:
+            SENSOR_INTERVALS[sensor] = sensor_config.interval
+        if sensor_config.deadband is not None:
+            SENSOR_DEADBANDS[sensor] = sensor_config.deadband
     
-    print("Done.")
+    print("Done.", file=stderr)
 
 
 def confirm_permissions() -> None:
@@ -87,32 +315,31 @@ def confirm_permissions() -> None:
             exit(1)
 
 def read_sensors(sensor_names: list[str]) -> dict[str, dict[str, Any]]:
-    """Read data from specified sensors and return as a dictionary."""
+    """Read data from specified sensors and return as a dictionary.
 
-    return {
-        name: SENSOR_INSTANCES[name].get_readings() if name in SENSOR_MAP else {"error": "Unknown sensor"}
-        for name in sensor_names
-    }
+    Sensors on different buses are read concurrently by the acquisition engine.
+    """
 
-def format_sensor_data(data: dict, timestamps: bool) -> str:
-    """Format sensor data as a human-readable string."""
+    return ENGINE.read(sensor_names)
 
-    lines = []
-    timestamp = strftime("%Y-%m-%d %H:%M:%S")
-    for sensor in data:
-        if timestamps:
-            lines.append(f"({timestamp}) - {sensor.upper()}:")
-        else:
-            lines.append(f"{sensor.upper()}:")
-        for key, value in data[sensor].items():
-            lines.append(f"\t{key}: {value}")
-    return "\n".join(lines)
+def read_from_daemon(socket_path: str, sensor_names: list[str]) -> dict[str, dict[str, Any]]:
+    """Get the latest readings of the specified sensors from a running daemon."""
+
+    try:
+        response = query_daemon(socket_path, sensor_names)
+    except OSError as e:
+        print(f"Could not reach the daemon at {socket_path}: {e}", file=stderr)
+        exit(1)
+    if "error" in response:
+        print(f"The daemon at {socket_path} refused the query: {response['error']}", file=stderr)
+        exit(1)
+    return response["readings"]
 
 def check_output_file(output_path: str, overwrite: bool) -> None:
     """Check if output file exists and handle according to overwrite flag."""
 
     path = Path(output_path)
-    if path.exists() and path.read_text().strip() != "":
+    if path.exists() and path.stat().st_size > 0:
         if overwrite:
             print(f"Overwriting {path.name}")
             path.write_text("")  # Wipe it
@@ -120,47 +347,140 @@ def check_output_file(output_path: str, overwrite: bool) -> None:
             print("Output file is not empty. Use --overwrite to overwrite.", file=stderr)
             exit(1)
 
-def output_results(data: dict, use_json: bool = False, output_path: str = None, timestamps: bool = False) -> None:
-    """Output sensor data either to console or file in specified format."""
+def check_binary_output(output_path: str, overwrite: bool) -> None:
+    """Check for chunks of an earlier binary capture at the output path, removing them if overwriting.
 
-    if not output_path:
-        print(dumps(data, indent=2) if use_json else format_sensor_data(data, timestamps))
+    The base path itself is never written, so this looks at its chunk files instead.
+    """
+
+    from binlog import chunk_paths
+    chunks = chunk_paths(output_path)
+    if not chunks:
         return
-    
-    path = Path(output_path)
+    if overwrite:
+        print(f"Overwriting {len(chunks)} chunks of {Path(output_path).name}")
+        for chunk in chunks:
+            Path(chunk).unlink()
+    else:
+        print("Output already has binary log chunks. Use --overwrite to overwrite.", file=stderr)
+        exit(1)
 
-    if use_json:
-        # Handle JSON output format
-        try:
-            current_data = loads(path.read_text())
-        except Exception:
-            current_data = {}
-        next_index = len(current_data) + 1
-        current_data[f"reading_{next_index}"] = data
-        if timestamps:
-            current_data[f"reading_{next_index}"]["timestamp"] = strftime("%Y-%m-%d %H:%M:%S")
-        output_data = current_data
+def report_stats(stats_file: str | None = None) -> None:
+    """Print the timing report, and write the Prometheus export if a file is given."""
 
-        path.write_text(dumps(output_data, indent=2) + '\n')
+    print(STATS.summary(), file=stderr)
+    if stats_file:
+        STATS.write_prometheus(stats_file, BUS_MANAGER.stats())
 
-    else:
-        # Handle plain text output format
-        formatted = format_sensor_data(data, timestamps)
-        with open(output_path, 'a') as f:
-            f.write(formatted + '\n')
+def request_report(*_) -> None:
+    """SIGUSR1 handler. Only flags the report; the polling loop prints it.
+
+    Printing from the handler could deadlock: the handler runs on the main
+    thread, which may be holding the stats lock when the signal arrives.
+    """
+
+    global REPORT_REQUESTED
+    REPORT_REQUESTED = True
+
+def report_if_requested(stats_file: str | None = None) -> None:
+    """Print the timing report if SIGUSR1 asked for one."""
+
+    global REPORT_REQUESTED
+    if REPORT_REQUESTED:
+        REPORT_REQUESTED = False
+        report_stats(stats_file)
+
+def idle_sleep(seconds: float, tasks: list[Callable[[], None]]) -> None:
+    """Sleep for `seconds`, running the tasks every IDLE_POLL_INTERVAL while waiting."""
+
+    end = monotonic() + seconds
+    while True:
+        for task in tasks:
+            task()
+        remaining = end - monotonic()
+        if remaining <= 0:
+            return
+        sleep(min(remaining, IDLE_POLL_INTERVAL))
 
 def main() -> None:
     """Main function to handle sensor reading and output."""
 
-    confirm_permissions()
-
     args: Namespace = parse_args()
-    sensor_names: list[str] = args.sensor or list(SENSOR_MAP) # If sensor names aren't provided, use all of them
 
-    setup_sensors(args.config or None)
-    
-    if args.output:
-        check_output_file(args.output, args.overwrite)
+    if args.command == "convert":
+        try:
+            count = convert_json_to_jsonl(args.source, args.destination)
+        except (OSError, ValueError) as e:
+            print(f"Could not convert {args.source}: {e}", file=stderr)
+            exit(1)
+        print(f"Converted {count} readings to {args.destination}")
+        return
+
+    if args.command == "bench":
+        from benchmark import format_report, run_benchmarks
+        report = run_benchmarks(args.cycles, args.latency_scale)
+        print(format_report(report))
+        if args.save:
+            Path(args.save).write_text(dumps(report, indent=2) + '\n')
+        return
+
+    if args.command == "export":
+        from binlog import chunk_paths, export
+        paths = [path for name in args.files for path in ([name] if Path(name).is_file() else chunk_paths(name))]
+        if not paths:
+            print("No binary log files found.", file=stderr)
+            exit(1)
+        derived = load_derived_metrics(args.config or None) if args.export_derived else None
+        try:
+            if args.export_output:
+                with open(args.export_output, "w", newline="") as f:
+                    count = export(paths, args.to, f, derived)
+                print(f"Exported {count} records to {args.export_output}")
+            else:
+                export(paths, args.to, stdout, derived)
+        except ImportError:
+            print("Exporting derived metrics needs NumPy. Install it with `pip install numpy`.", file=stderr)
+            exit(1)
+        return
+
+    if args.command == "query":
+        from store import connect, parse_time, path_from_url, query, write_rows
+        path = path_from_url(args.database)
+        if not Path(path).is_file():
+            print(f"No database at {path}.", file=stderr)
+            exit(1)
+        try:
+            start = parse_time(args.start) if args.start else None
+            end = parse_time(args.end) if args.end else None
+        except ValueError as e:
+            print(f"Invalid time: {e}", file=stderr)
+            exit(1)
+        rows = query(connect(path), start, end, args.query_sensors, args.query_fields, args.resample)
+        write_rows(rows, args.resample, args.query_format, stdout)
+        return
+
+    if args.command == "scan":
+        from scan import available_buses, generate_config, scan
+        if args.scan_output and Path(args.scan_output).exists():
+            print(f"{args.scan_output} already exists; give a new file.", file=stderr)
+            exit(1)
+        buses = args.scan_buses or configured_buses(args.config or None) or available_buses()
+        if not buses:
+            print("No I2C buses found.", file=stderr)
+            exit(1)
+        print(f"Scanning bus{'es' if len(buses) > 1 else ''} {', '.join(map(str, buses))}...", file=stderr)
+        devices = scan(buses)
+        for device in devices:
+            print(f"Found {device.sensor} at {device.address:#04x} on bus {device.bus}", file=stderr)
+        if not devices:
+            print("No known sensors found.", file=stderr)
+            exit(1)
+        if args.scan_output:
+            Path(args.scan_output).write_text(generate_config(devices))
+            print(f"Wrote {args.scan_output}", file=stderr)
+        else:
+            print(generate_config(devices), end="")
+        return
 
     if args.list:
         print("Available sensors:")
@@ -168,18 +488,171 @@ def main() -> None:
             print(f"- {sensor}")
         exit(0)
 
-    if args.interval:
-        # Continuous reading mode with interval
-        count = args.count if args.count else float("inf")
-        for i in range(int(count)):
-            data = read_sensors(sensor_names)
-            output_results(data, use_json=args.json, output_path=args.output, timestamps=args.timestamps)
-            if i < count - 1:
-                sleep(args.interval)
+    output_format: str = "json" if args.json else args.format
+    if args.template:
+        output_format = "template"
+        try:
+            compile_template(args.template)
+        except ValueError as e:
+            print(f"Invalid template: {e}", file=stderr)
+            exit(1)
+    elif output_format == "template":
+        print("The template format needs a template. Use --template to give one.", file=stderr)
+        exit(1)
+    if args.output and args.output.startswith("sqlite://"):
+        output_format = "sqlite"
+    if output_format in FILE_ONLY_FORMATS and not args.output:
+        print(f"The {output_format} format can only be written to a file. Use -o to give one.", file=stderr)
+        exit(1)
+    sensor_names: list[str] = select_sensors(args.config or None, args.sensor, args.simulate)
+
+    if args.check_config:
+        load_config(args.config or None, sensor_names, args.simulate)
+        print("Config OK.")
+        exit(0)
+
+    if args.command == "daemon":
+        if not args.simulate:
+            confirm_permissions()
+        setup_sensors(args.config or None, sensor_names, args.simulate)
+        intervals = {name: SENSOR_INTERVALS.get(name, args.daemon_interval) for name in sensor_names}
+        read = read_sensors
+        if args.derived:
+            derived = load_derived_metrics(args.config or None)
+            read = lambda names: derived.apply(read_sensors(names))
+        aggregator = None
+        if args.daemon_aggregate:
+            aggregator = Aggregator.for_interval(args.daemon_aggregate, min(intervals.values()))
+        print(f"Serving readings on {args.daemon_socket}")
+        try:
+            SensorDaemon(read, intervals, args.daemon_socket, args.daemon_align, aggregator).serve_forever()
+        except KeyboardInterrupt:
+            pass
+        except FileExistsError as e:
+            print(f"Could not start the daemon: {e}", file=stderr)
+            exit(1)
+        return
+
+    if args.socket:
+        # Thin client: the daemon owns the sensors
+        read = lambda names: read_from_daemon(args.socket, names)
     else:
-        # Single reading mode
-        data = read_sensors(sensor_names)
-        output_results(data, use_json=args.json, output_path=args.output, timestamps=args.timestamps)
+        if not args.simulate:
+            confirm_permissions()
+        setup_sensors(args.config or None, sensor_names, args.simulate)
+        read = read_sensors
+
+    if args.derived:
+        derived = load_derived_metrics(args.config or None)
+        source = read
+        read = lambda names: derived.apply(source(names))
+
+    # A database is meant to be added to, so it is never in the way
+    if args.output and output_format == "binary":
+        check_binary_output(args.output, args.overwrite)
+    elif args.output and output_format != "sqlite":
+        check_output_file(args.output, args.overwrite)
+
+    if args.profile or args.stats_file:
+        STATS.enabled = True
+        signal.signal(signal.SIGUSR1, request_report)
+
+    options = OutputOptions(
+        batch_size=max(1, args.batch),
+        flush_interval=args.flush_interval,
+        fsync=args.fsync,
+        rotate_size=args.rotate_size,
+        rotate_daily=args.rotate_daily,
+        compress=args.compress,
+        line_buffered=args.line_buffered,
+    )
+    # Stop cleanly on SIGTERM (e.g. from systemd) so buffered readings are written
+    signal.signal(signal.SIGTERM, lambda *_: exit(0))
+
+    uploader = None
+    if args.upload:
+        from uploader import Uploader, open_transport
+        try:
+            uploader = Uploader(open_transport(args.upload), args.spool, max(1, args.upload_batch))
+        except ImportError:
+            print("Uploading over MQTT needs paho-mqtt. Install it with `pip install paho-mqtt`.", file=stderr)
+            exit(1)
+        except ValueError as e:
+            print(e, file=stderr)
+            exit(1)
+
+    settings = {"template": args.template} if output_format == "template" else {}
+    with open_writer(output_format, args.output, args.timestamps, options, **settings) as writer, uploader or nullcontext():
+        if args.interval:
+            # Continuous reading mode with interval
+            intervals = {name: SENSOR_INTERVALS.get(name, args.interval) for name in sensor_names}
+            # Buffered output is written out on time even when reads are far apart
+            idle_tasks: list[Callable[[], None]] = [writer.flush_if_due]
+            if STATS.enabled:
+                idle_tasks.append(lambda: report_if_requested(args.stats_file))
+            wait = lambda seconds: idle_sleep(seconds, idle_tasks)
+            if len(set(intervals.values())) > 1:
+                # Sensors with their own interval in the config are read on their own schedule
+                scheduler = MultiRateScheduler(intervals, align=args.align, sleep=wait)
+                schedule = scheduler.ticks(args.count or None)
+            else:
+                scheduler = Scheduler(intervals[sensor_names[0]], align=args.align, sleep=wait)
+                schedule = ((tick, sensor_names) for tick in scheduler.ticks(args.count or None))
+
+            aggregator = None
+            if args.aggregate:
+                aggregator = Aggregator.for_interval(args.aggregate, min(intervals.values()))
+            downsampler = Downsampler(args.downsample) if args.downsample else None
+            deadband = DeadbandFilter(SENSOR_DEADBANDS) if SENSOR_DEADBANDS else None
+
+            def emit(data: dict[str, dict]) -> None:
+                """Write a reading, unless the deadbands filter all of it out."""
+
+                if deadband is not None:
+                    data = deadband.apply(data)
+                    if not data:
+                        return
+                if aggregator is not None:
+                    data["aggregates"] = aggregator.flat()
+                with STATS.time("write", output_format):
+                    writer.write(data)
+                if uploader is not None:
+                    uploader.put(data)
+
+            try:
+                for tick, due in schedule:
+                    if tick.missed:
+                        print(f"Warning: last read overran the interval, skipped {tick.missed} read(s).", file=stderr)
+                    with STATS.time("cycle"):
+                        data = read(due)
+                        if aggregator is not None:
+                            aggregator.update(data)
+                        if downsampler is not None:
+                            data = downsampler.add(data, tick.timestamp)
+                        if data:
+                            emit(data)
+                    # Also when cycles overrun and the scheduler never sleeps
+                    for task in idle_tasks:
+                        task()
+            finally:
+                # Write the last, partial period
+                if downsampler is not None and (data := downsampler.flush()):
+                    emit(data)
+                print(f"Scheduler: {scheduler.summary()}", file=stderr)
+                if BUS_MANAGER.stats():
+                    print(BUS_MANAGER.summary(), file=stderr)
+                if STATS.enabled:
+                    report_stats(args.stats_file)
+        else:
+            # Single reading mode
+            with STATS.time("cycle"):
+                data = read(sensor_names)
+                with STATS.time("write", output_format):
+                    writer.write(data)
+                if uploader is not None:
+                    uploader.put(data)
+            if STATS.enabled:
+                report_stats(args.stats_file)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,264 @@
+import gzip
+import os
+import shutil
+import sys
+from datetime import date, datetime
+from threading import Thread
+from time import monotonic
+from typing import NamedTuple, TextIO
+
+from instrumentation import STATS
+
+FSYNC_POLICIES: tuple[str, ...] = ("never", "close", "batch")
+# Characters of console output held back before writing them out in one go
+CONSOLE_BUFFER_SIZE: int = 64 * 1024
+# Seconds console output is held back at most, unless `flush_interval` is set
+CONSOLE_FLUSH_INTERVAL: float = 1.0
+
+# Multipliers of the size suffixes accepted by `parse_size`
+_SIZE_UNITS: dict[str, int] = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+def parse_size(value: str) -> int:
+    """Parse a size like `512`, `64K`, `10M` or `1G` into bytes.
+
+    Raises:
+        ValueError: If the size can't be parsed.
+    """
+
+    text = value.strip().upper().removesuffix("B")
+    unit = text[-1:] if text[-1:] in _SIZE_UNITS else ""
+    number = float(text[:len(text) - len(unit)])
+    if number < 0:
+        raise ValueError(f"Size can't be negative: `{value}`.")
+    return int(number * _SIZE_UNITS[unit])
+
+
+class OutputOptions(NamedTuple):
+    """How an output file is buffered, synced and rotated.
+
+    Attributes:
+        batch_size (int): Readings to buffer before writing them out. 1 writes every reading straight away.
+        flush_interval (float): Also write the buffer out once its oldest reading is this many seconds old. 0 to only go by `batch_size`.
+        fsync (str): When to sync the file to the disk: `never` (leave it to the OS), `close` (when a file is rotated or closed), or `batch` (after every write).
+        rotate_size (int): Start a new file once the current one would grow past this many bytes. 0 to never rotate by size.
+        rotate_daily (bool): Start a new file when the date changes.
+        compress (bool): Gzip rotated files.
+        line_buffered (bool): Write console output out after every line, even when it isn't a terminal.
+    """
+
+    batch_size: int = 1
+    flush_interval: float = 0.0
+    fsync: str = "never"
+    rotate_size: int = 0
+    rotate_daily: bool = False
+    compress: bool = False
+    line_buffered: bool = False
+
+    def flush_due(self, pending: int, oldest: float) -> bool:
+        """Return whether a buffer of `pending` readings, the oldest buffered at `oldest` (monotonic), should be written out."""
+
+        if pending >= self.batch_size:
+            return True
+        return bool(self.flush_interval) and monotonic() - oldest >= self.flush_interval
+
+
+class OutputFile:
+    """An append-only output file that stays open for the whole run.
+
+    Writes are buffered according to the options and written out in one go.
+    The file being written always keeps its original path; when it is
+    rotated, it is renamed to `<stem>.<YYYYmmdd-HHMMSS><suffix>` (the time it
+    was started) and, if enabled, gzipped in the background.
+
+    Note:
+        Buffered readings that haven't been written out are lost if the
+        process is killed, so `batch_size` and `flush_interval` bound how much
+        a crash can lose.
+
+    Attributes:
+        header (str): Written at the start of every new file that rotation starts, e.g. a CSV header line.
+
+    Args:
+        path (str): File to append to.
+        options (OutputOptions, optional): Buffering, sync and rotation settings.
+        label (str, optional): Label for the `flush` timings (e.g. the output format).
+    """
+
+    def __init__(self, path: str, options: OutputOptions | None = None, label: str = "") -> None:
+        self.path: str = path
+        self.options: OutputOptions = options or OutputOptions()
+        self.label: str = label
+        self.header: str = ""
+        self._buffer: list[str] = []
+        self._oldest: float = 0.0
+        self._compressors: list[Thread] = []
+        self._open()
+
+    def _open(self) -> None:
+        self._file = open(self.path, "a")
+        self._size: int = os.fstat(self._file.fileno()).st_size
+        self._started: datetime = datetime.now()
+        self._day: date = self._started.date()
+        if self.header and not self._size:
+            self._file.write(self.header)
+            self._size += len(self.header.encode(self._file.encoding))
+
+    def write(self, text: str) -> None:
+        """Buffer `text`, writing the buffer out if it is due."""
+
+        if not self._buffer:
+            self._oldest = monotonic()
+        self._buffer.append(text)
+        if self.options.flush_due(len(self._buffer), self._oldest):
+            self.flush()
+
+    def flush_if_due(self) -> None:
+        """Write out the buffer if `flush_interval` has passed since its oldest reading.
+
+        Buffers are otherwise only checked when something is written, so the
+        polling loop calls this between reads.
+        """
+
+        if self._buffer and self.options.flush_due(len(self._buffer), self._oldest):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write out everything buffered, rotating the file first if needed."""
+
+        if not self._buffer:
+            return
+
+        data = "".join(self._buffer)
+        self._buffer.clear()
+        # Rotation sizes are in bytes, not characters
+        size = len(data.encode(self._file.encoding))
+        with STATS.time("flush", self.label):
+            if self._size and self._rotation_due(size):
+                self.rotate()
+            self._file.write(data)
+            self._file.flush()
+            if self.options.fsync == "batch":
+                os.fsync(self._file.fileno())
+        self._size += size
+
+    def _rotation_due(self, incoming: int) -> bool:
+        if self.options.rotate_daily and date.today() != self._day:
+            return True
+        return bool(self.options.rotate_size) and self._size + incoming > self.options.rotate_size
+
+    def rotate(self) -> str:
+        """Close the current file, move it aside and start a new one.
+
+        Returns:
+            str: Path the closed file was moved to (before compression).
+        """
+
+        self._close_file()
+        stem, suffix = os.path.splitext(self.path)
+        rotated = f"{stem}.{self._started:%Y%m%d-%H%M%S}{suffix}"
+        counter = 1
+        while os.path.exists(rotated) or os.path.exists(rotated + ".gz"):
+            rotated = f"{stem}.{self._started:%Y%m%d-%H%M%S}-{counter}{suffix}"
+            counter += 1
+        os.replace(self.path, rotated)
+
+        if self.options.compress:
+            compressor = Thread(target=compress_file, args=(rotated,), name="output-gzip", daemon=True)
+            compressor.start()
+            self._compressors.append(compressor)
+        self._open()
+        return rotated
+
+    def _close_file(self) -> None:
+        self._file.flush()
+        if self.options.fsync != "never":
+            os.fsync(self._file.fileno())
+        self._file.close()
+
+    def close(self) -> None:
+        """Write out the buffer, close the file and wait for any compression to finish."""
+
+        if self._file.closed:
+            return
+        self.flush()
+        self._close_file()
+        for compressor in self._compressors:
+            compressor.join()
+        self._compressors.clear()
+
+
+class ConsoleOutput:
+    """Console output for the formats meant to be piped into other tools.
+
+    Text is collected and written to stdout in large blocks, so a fast
+    polling loop makes a write call every few thousand lines rather than
+    every line. When stdout is a terminal, or with `line_buffered`, every line
+    is written out straight away instead, so a reader at the other end of a
+    pipe sees each reading as it comes. Held back text is also written out
+    once it is `flush_interval` seconds old, so a slow polling interval
+    doesn't leave readings sitting in the buffer.
+
+    Args:
+        line_buffered (bool, optional): Write out every line straight away. Defaults to False.
+        buffer_size (int, optional): Characters to hold back. Defaults to CONSOLE_BUFFER_SIZE.
+        stream (TextIO, optional): Where to write. Defaults to `sys.stdout` at the time it is created.
+        flush_interval (float, optional): Seconds to hold text back at most. Defaults to CONSOLE_FLUSH_INTERVAL.
+    """
+
+    def __init__(self, line_buffered: bool = False, buffer_size: int = CONSOLE_BUFFER_SIZE,
+                 stream: TextIO | None = None, flush_interval: float = CONSOLE_FLUSH_INTERVAL) -> None:
+        self.stream: TextIO = stream or sys.stdout
+        self.line_buffered: bool = line_buffered or self.stream.isatty()
+        self.buffer_size: int = buffer_size
+        self.flush_interval: float = flush_interval
+        self._buffer: list[str] = []
+        self._size: int = 0
+        self._oldest: float = 0.0
+
+    def write(self, text: str) -> None:
+        if self.line_buffered:
+            self.stream.write(text)
+            self.stream.flush()
+            return
+
+        if not self._buffer:
+            self._oldest = monotonic()
+        self._buffer.append(text)
+        self._size += len(text)
+        if self._size >= self.buffer_size:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self) -> None:
+        """Write out the held back text if the oldest of it is `flush_interval` seconds old."""
+
+        if self._buffer and monotonic() - self._oldest >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self.stream.write("".join(self._buffer))
+            self._buffer.clear()
+            self._size = 0
+        self.stream.flush()
+
+    def close(self) -> None:
+        """Write out what is held back. The stream itself is left open."""
+
+        self.flush()
+
+
+def compress_file(path: str) -> str:
+    """Gzip a file next to itself and remove the original.
+
+    Returns:
+        str: Path of the compressed file.
+    """
+
+    compressed = path + ".gz"
+    with open(path, "rb") as source, gzip.open(compressed + ".tmp", "wb") as destination:
+        shutil.copyfileobj(source, destination)
+    os.replace(compressed + ".tmp", compressed)
+    os.remove(path)
+    return compressed
@@ -0,0 +1,84 @@
+import random
+from time import monotonic
+from typing import Callable, NamedTuple
+
+class RetryPolicy(NamedTuple):
+    """How often and how soon a failed read is tried again.
+
+    Waits grow exponentially from `base_delay` up to `max_delay`, with "full
+    jitter": each wait is picked at random between 0 and its limit, so sensors
+    that failed together don't retry in lockstep.
+
+    Attributes:
+        attempts (int): Tries per read, including the first. 1 never retries.
+        base_delay (float): Limit of the first wait, in seconds.
+        max_delay (float): Largest limit of any wait, in seconds.
+    """
+
+    attempts: int = 3
+    base_delay: float = 0.05
+    max_delay: float = 1.0
+
+    def delay(self, attempt: int, rng: random.Random | None = None) -> float:
+        """Return how long to wait after failed try number `attempt` (0 for the first)."""
+
+        return (rng or random).uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Stops reading a sensor that keeps failing, and tries it again later.
+
+    The breaker is `closed` while reads work. After `failure_threshold` failed
+    reads in a row it `open`s: reads are refused straight away without
+    touching the bus. Once `reset_timeout` has passed it is `half-open` and
+    lets one read through as a probe. If the probe works the breaker closes;
+    if not it opens again, waiting twice as long (up to `max_reset_timeout`).
+
+    Attributes:
+        state (str): `closed`, `open` or `half-open`.
+        failures (int): Failed reads in a row.
+
+    Args:
+        failure_threshold (int, optional): Failed reads in a row that open the breaker. Defaults to 5.
+        reset_timeout (float, optional): Seconds before the first probe. Defaults to 30.
+        max_reset_timeout (float, optional): Longest wait between probes. Defaults to 600.
+        clock (callable, optional): Monotonic clock. Defaults to `time.monotonic`.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 max_reset_timeout: float = 600.0, clock: Callable[[], float] = monotonic) -> None:
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout: float = reset_timeout
+        self.max_reset_timeout: float = max_reset_timeout
+        self.state: str = "closed"
+        self.failures: int = 0
+        self._clock = clock
+        self._wait: float = reset_timeout
+        self._opened_at: float = 0.0
+
+    def retry_in(self) -> float:
+        """Return the seconds until the next probe (0 unless open)."""
+
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self._opened_at + self._wait - self._clock())
+
+    def allow(self) -> bool:
+        """Return whether a read may go ahead, moving from open to half-open when it's time to probe."""
+
+        if self.state == "open" and self.retry_in() == 0:
+            self.state = "half-open"
+        return self.state != "open"
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._wait = self.reset_timeout
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half-open":
+            self._wait = min(self._wait * 2, self.max_reset_timeout)
+        if self.state == "half-open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self._opened_at = self._clock()
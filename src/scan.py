@@ -0,0 +1,145 @@
+"""Finding known sensors on I2C buses, and writing a config for them.
+
+Each bus is probed in one pass over the addresses the known chips can have.
+A chip is only reported if it answers like that chip:
+
+- BME680: its chip id register (0xD0) reads 0x61.
+- DS2482 (the 1-Wire bridge of the DS18B20s): after a device reset its status
+  register reads "reset done". An address the kernel's ds2482 driver already
+  holds counts as a DS2482 too.
+- ADS7830: it answers a channel 0 conversion. It has no id register, so any
+  chip that answers at 0x48-0x4B is taken for one.
+"""
+
+import errno
+import glob
+import sys
+from typing import Any, Callable, NamedTuple
+
+BME680_CHIP_ID_REGISTER = 0xD0
+BME680_CHIP_ID = 0x61
+DS2482_DEVICE_RESET = 0xF0
+# Status register after a reset: RST set, ignoring the 1-Wire line level (LL)
+DS2482_RESET_STATUS = 0x10
+DS2482_STATUS_MASK = 0xF7
+# Single-ended channel 0, internal reference off, converter on
+ADS7830_PROBE_COMMAND = 0x84
+
+class Chip(NamedTuple):
+    """A chip `scan` knows how to recognise.
+
+    Attributes:
+        sensor (str): The sensor type it is configured as.
+        addresses (tuple[int, ...]): Addresses it can have.
+        identify (callable): Takes a bus handle and an address; returns whether the chip there is this one.
+        kernel_driver (bool): Whether an address held by a kernel driver is taken to be this chip.
+    """
+
+    sensor: str
+    addresses: tuple[int, ...]
+    identify: Callable[[Any, int], bool]
+    kernel_driver: bool = False
+
+
+class Device(NamedTuple):
+    """A sensor found by `scan`."""
+
+    sensor: str
+    bus: int
+    address: int
+
+
+def _is_bme680(bus: Any, address: int) -> bool:
+    return bus.read_byte_data(address, BME680_CHIP_ID_REGISTER) == BME680_CHIP_ID
+
+def _is_ds2482(bus: Any, address: int) -> bool:
+    bus.write_byte(address, DS2482_DEVICE_RESET)
+    return bus.read_byte(address) & DS2482_STATUS_MASK == DS2482_RESET_STATUS
+
+def _is_ads7830(bus: Any, address: int) -> bool:
+    bus.read_byte_data(address, ADS7830_PROBE_COMMAND)
+    return True
+
+CHIPS: list[Chip] = [
+    Chip("ds18b20", (0x18, 0x19, 0x1A, 0x1B), _is_ds2482, kernel_driver=True),
+    Chip("ads7830", (0x48, 0x49, 0x4A, 0x4B), _is_ads7830),
+    Chip("bme680", (0x76, 0x77), _is_bme680),
+]
+
+def available_buses() -> list[int]:
+    """Return the numbers of the I2C buses the system has (`/dev/i2c-*`)."""
+
+    return sorted(int(path.rpartition("-")[2]) for path in glob.glob("/dev/i2c-*") if path.rpartition("-")[2].isdigit())
+
+def probe_bus(bus: Any, bus_number: int) -> list[Device]:
+    """Return the known chips that answer on an open bus, in address order."""
+
+    found = []
+    candidates = sorted((address, chip) for chip in CHIPS for address in chip.addresses)
+    for address, chip in candidates:
+        try:
+            if chip.identify(bus, address):
+                found.append(Device(chip.sensor, bus_number, address))
+        except OSError as e:
+            # Nothing there (ENXIO/EREMOTEIO), unless a driver holds the address
+            if e.errno == errno.EBUSY and chip.kernel_driver:
+                found.append(Device(chip.sensor, bus_number, address))
+    return found
+
+def scan(buses: list[int], smbus_factory: Callable[[int], Any] | None = None) -> list[Device]:
+    """Probe every bus for known chips.
+
+    Buses that can't be opened are reported on stderr and skipped.
+
+    Args:
+        buses (list[int]): Bus numbers to probe.
+        smbus_factory (callable, optional): Opens a bus by number. Defaults to `smbus2.SMBus`.
+
+    Returns:
+        list[Device]: The chips found, by bus and address.
+    """
+
+    if smbus_factory is None:
+        from smbus2 import SMBus # type: ignore
+        smbus_factory = SMBus
+
+    found = []
+    for number in buses:
+        try:
+            bus = smbus_factory(number)
+        except OSError as e:
+            print(f"Could not open bus {number}: {e}", file=sys.stderr)
+            continue
+        try:
+            found += probe_bus(bus, number)
+        finally:
+            bus.close()
+    return found
+
+def instance_names(devices: list[Device]) -> dict[Device, str]:
+    """Name the devices found for their config sections.
+
+    A sensor type found once keeps the plain type name (`bme680`). Several of
+    one type are named by address (`bme680.0x76`), and by bus as well if the
+    same address is found on more than one (`bme680.bus1-0x76`).
+    """
+
+    names = {}
+    for device in devices:
+        same_type = [other for other in devices if other.sensor == device.sensor]
+        if len(same_type) == 1:
+            names[device] = device.sensor
+        elif sum(other.address == device.address for other in same_type) == 1:
+            names[device] = f"{device.sensor}.{device.address:#04x}"
+        else:
+            names[device] = f"{device.sensor}.bus{device.bus}-{device.address:#04x}"
+    return names
+
+def generate_config(devices: list[Device]) -> str:
+    """Return the text of a config file with a section for each device found."""
+
+    sections = [
+        f"[sensors.{name}]\naddress = {device.address:#04x}\nbus = {device.bus}\n"
+        for device, name in instance_names(devices).items()
+    ]
+    return "\n".join(sections)
@@ -0,0 +1,216 @@
+from heapq import heapify, heappop, heappush
+from time import monotonic, sleep, time
+from typing import Callable, Iterator, NamedTuple
+
+class Tick(NamedTuple):
+    """A single firing of the scheduler.
+
+    Attributes:
+        index (int): Number of the deadline this tick fired for, counting skipped deadlines.
+        deadline (float): The monotonic time the tick was due.
+        timestamp (float): The wall-clock time (seconds since the epoch) the tick was due.
+        lateness (float): Seconds between the deadline and the tick actually firing.
+        missed (int): Deadlines skipped just before this tick because the previous cycle overran.
+    """
+
+    index: int
+    deadline: float
+    timestamp: float
+    lateness: float
+    missed: int
+
+
+class Scheduler:
+    """Fires ticks on absolute deadlines of a monotonic clock.
+
+    Deadlines are fixed multiples of the interval from the first tick, so time
+    spent reading sensors and writing output doesn't push later ticks back.
+    If a cycle runs past one or more deadlines, those deadlines are skipped
+    (and counted) and the next tick fires on the next deadline still ahead,
+    rather than firing the missed ones back to back.
+
+    Attributes:
+        interval (float): Seconds between ticks.
+        align (bool): Whether ticks line up with wall-clock multiples of the interval.
+        ticks_fired (int): Number of ticks fired so far.
+        overruns (int): Number of cycles that ran past the next deadline.
+        missed (int): Total number of deadlines skipped because of overruns.
+        max_jitter (float): Largest lateness seen, in seconds.
+
+    Args:
+        interval (float): Seconds between ticks. Can be less than one.
+        align (bool, optional): Line ticks up with the wall clock, e.g. on `:00` of every
+            minute for a 60 second interval. Defaults to False.
+        clock (callable, optional): Monotonic clock. Defaults to `time.monotonic`.
+        wall_clock (callable, optional): Wall clock. Defaults to `time.time`.
+        sleep (callable, optional): Sleep function. Defaults to `time.sleep`.
+
+    Raises:
+        ValueError: If the interval is not positive.
+    """
+
+    def __init__(self, interval: float, align: bool = False, clock: Callable[[], float] = monotonic,
+                 wall_clock: Callable[[], float] = time, sleep: Callable[[float], None] = sleep) -> None:
+        if interval <= 0:
+            raise ValueError("Interval must be greater than 0.")
+
+        self.interval: float = interval
+        self.align: bool = align
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._sleep = sleep
+
+        self.ticks_fired: int = 0
+        self.overruns: int = 0
+        self.missed: int = 0
+        self.max_jitter: float = 0.0
+        self._total_jitter: float = 0.0
+
+    @property
+    def mean_jitter(self) -> float:
+        """Mean lateness of the ticks fired so far, in seconds."""
+
+        return self._total_jitter / self.ticks_fired if self.ticks_fired else 0.0
+
+    def ticks(self, count: int | None = None) -> Iterator[Tick]:
+        """Yield ticks on schedule.
+
+        Args:
+            count (int, optional): Number of ticks to fire. If omitted, runs indefinitely.
+        """
+
+        now = self._clock()
+        wall_offset = self._wall_clock() - now
+        origin = now
+        if self.align:
+            origin += (self.interval - (now + wall_offset) % self.interval) % self.interval
+
+        deadline = origin
+        index = 0
+        fired = 0
+        while count is None or fired < count:
+            now = self._clock()
+            missed = 0
+            if fired and now > deadline:
+                # The last cycle ran past this deadline. Skip ahead to the next
+                # one that is still in the future instead of catching up.
+                missed = int((now - deadline) // self.interval) + 1
+                index += missed
+                deadline = origin + index * self.interval
+                self.overruns += 1
+                self.missed += missed
+
+            if deadline > now:
+                self._sleep(deadline - now)
+                now = self._clock()
+
+            lateness = max(0.0, now - deadline)
+            self.ticks_fired += 1
+            self._total_jitter += lateness
+            self.max_jitter = max(self.max_jitter, lateness)
+
+            yield Tick(index, deadline, deadline + wall_offset, lateness, missed)
+
+            fired += 1
+            index += 1
+            deadline = origin + index * self.interval
+
+    def summary(self) -> str:
+        """Return a one-line report of the ticks fired, overruns and jitter."""
+
+        return (
+            f"{self.ticks_fired} ticks, {self.overruns} overruns ({self.missed} missed), "
+            f"jitter mean {self.mean_jitter * 1000:.2f} ms, max {self.max_jitter * 1000:.2f} ms"
+        )
+
+
+class MultiRateScheduler(Scheduler):
+    """Fires ticks for several sensors that each have their own interval.
+
+    Each sensor's next deadline is kept in a priority queue. A tick fires at the
+    earliest deadline and lists every sensor due at that moment, so sensors
+    that line up (e.g. every 10th read of a 1 second sensor and a 10 second
+    sensor) are read together. Overruns are handled like `Scheduler`: any
+    deadline already passed is skipped and counted.
+
+    Args:
+        intervals (dict): Map of sensor names to their interval in seconds.
+        align (bool, optional): Line each sensor up with wall-clock multiples of its interval. Defaults to False.
+        clock (callable, optional): Monotonic clock. Defaults to `time.monotonic`.
+        wall_clock (callable, optional): Wall clock. Defaults to `time.time`.
+        sleep (callable, optional): Sleep function. Defaults to `time.sleep`.
+
+    Raises:
+        ValueError: If there are no intervals or any interval is not positive.
+    """
+
+    # Deadlines closer together than this fire as a single tick.
+    EPSILON: float = 1e-6
+
+    def __init__(self, intervals: dict[str, float], align: bool = False, clock: Callable[[], float] = monotonic,
+                 wall_clock: Callable[[], float] = time, sleep: Callable[[float], None] = sleep) -> None:
+        if not intervals:
+            raise ValueError("At least one interval is required.")
+        if min(intervals.values()) <= 0:
+            raise ValueError("Intervals must be greater than 0.")
+
+        super().__init__(min(intervals.values()), align, clock, wall_clock, sleep)
+        self.intervals: dict[str, float] = dict(intervals)
+
+    def ticks(self, count: int | None = None) -> Iterator[tuple[Tick, list[str]]]:
+        """Yield each tick along with the names of the sensors due on it.
+
+        Args:
+            count (int, optional): Number of ticks to fire. If omitted, runs indefinitely.
+        """
+
+        now = self._clock()
+        wall_offset = self._wall_clock() - now
+
+        # Deadlines are computed as origin + n * interval rather than summed,
+        # so sensors whose schedules line up land on exactly the same time.
+        origins: dict[str, float] = {}
+        queue: list[tuple[float, int, str, int]] = []
+        for position, (name, interval) in enumerate(self.intervals.items()):
+            origins[name] = now
+            if self.align:
+                origins[name] += (interval - (now + wall_offset) % interval) % interval
+            queue.append((origins[name], position, name, 0))
+        heapify(queue)
+
+        def reschedule(position: int, name: str, n: int) -> None:
+            heappush(queue, (origins[name] + n * self.intervals[name], position, name, n))
+
+        fired = 0
+        while count is None or fired < count:
+            now = self._clock()
+            missed = 0
+            if fired and now > queue[0][0]:
+                # Skip every deadline the last cycle ran past.
+                while queue[0][0] < now:
+                    deadline, position, name, n = heappop(queue)
+                    skipped = int((now - deadline) // self.intervals[name]) + 1
+                    missed += skipped
+                    reschedule(position, name, n + skipped)
+                self.overruns += 1
+                self.missed += missed
+
+            deadline = queue[0][0]
+            if deadline > now:
+                self._sleep(deadline - now)
+                now = self._clock()
+
+            due: list[tuple[int, str]] = []
+            while queue and queue[0][0] <= deadline + self.EPSILON:
+                _, position, name, n = heappop(queue)
+                due.append((position, name))
+                reschedule(position, name, n + 1)
+
+            lateness = max(0.0, now - deadline)
+            self.ticks_fired += 1
+            self._total_jitter += lateness
+            self.max_jitter = max(self.max_jitter, lateness)
+
+            yield Tick(fired, deadline, deadline + wall_offset, lateness, missed), [name for _, name in sorted(due)]
+
+            fired += 1
@@ -0,0 +1,111 @@
+import random
+from time import sleep
+from typing import Mapping
+
+# What each sensor type reads like: the bus it sits on, how long a read takes
+# (in seconds) and the baseline value of each field.
+PROFILES: dict[str, dict] = {
+    "bme680": {
+        "bus": "i2c",
+        "latency": 0.19,
+        "fields": {"temperature": 21.0, "pressure": 1013.25, "humidity": 45.0, "gas_resistance": 50000.0},
+    },
+    "ds18b20": {
+        "bus": "w1",
+        "latency": 0.75,
+        "fields": {"28-000000000001": 19.5},
+    },
+    "ads7830": {
+        "bus": "i2c",
+        "latency": 0.001,
+        "fields": {f"ch{n}": 128.0 for n in range(8)},
+    },
+}
+
+class SimulatedReader:
+    """A stand-in for a sensor reader that needs no hardware.
+
+    Takes as long as the real sensor to read, returns its fields with random
+    noise added, and can be made to fail some of its reads.
+
+    Attributes:
+        kind (str): The sensor type being simulated (a key of `PROFILES`).
+        bus_number (int): The bus the sensor pretends to be on.
+        latency (float): Seconds each read takes.
+        conversion_time (float): The same as `latency`; `trigger` and `collect` split a read in two like a real sensor.
+        noise (float): Standard deviation of the noise, relative to each field's baseline.
+        failure_rate (float): Chance (0-1) that a read raises an `OSError`.
+
+    Args:
+        kind (str): The sensor type to simulate.
+        bus_number (int, optional): The bus the sensor pretends to be on. Defaults to 2.
+        device_address (int, optional): Unused; accepted like a real reader. Defaults to 0.
+        latency (float, optional): Seconds each read takes. Defaults to the profile's latency.
+        noise (float, optional): Relative noise. Defaults to 0.01.
+        failure_rate (float, optional): Chance that a read fails. Defaults to 0.
+        seed (int, optional): Seed for the random numbers, for repeatable runs.
+
+    Raises:
+        ValueError: If the sensor type has no profile.
+    """
+
+    # Not a real bus, so setup never hands this class a bus handle. Each
+    # instance sets BUS to the bus of the sensor it simulates.
+    BUS = "sim"
+
+    def __init__(self, kind: str, bus_number: int = 2, device_address: int = 0, latency: float | None = None,
+                 noise: float = 0.01, failure_rate: float = 0.0, seed: int | None = None) -> None:
+        if kind not in PROFILES:
+            raise ValueError(f"No simulation profile for `{kind}`.")
+
+        profile = PROFILES[kind]
+        self.kind: str = kind
+        self.BUS: str = profile["bus"]
+        self.bus_number: int = bus_number
+        self.device_address: int = device_address
+        self.latency: float = profile["latency"] if latency is None else latency
+        self.noise: float = noise
+        self.failure_rate: float = failure_rate
+        self._fields: dict[str, float] = profile["fields"]
+        self.conversion_time: float = self.latency
+        self._random = random.Random(seed)
+
+    @staticmethod
+    def options_from_config(section: Mapping[str, str]) -> dict:
+        """Return the `sim.*` settings of a sensor's config section."""
+
+        options: dict = {}
+        if "sim.latency" in section:
+            options["latency"] = float(section["sim.latency"])
+        if "sim.noise" in section:
+            options["noise"] = float(section["sim.noise"])
+        if "sim.failure_rate" in section:
+            options["failure_rate"] = float(section["sim.failure_rate"])
+        return options
+
+    def get_readings(self) -> dict:
+        """Return a simulated reading after the configured latency.
+
+        Raises:
+            OSError: For the configured fraction of reads.
+        """
+
+        if self.latency:
+            sleep(self.latency)
+        return self.collect()
+
+    def trigger(self) -> None:
+        """Start a simulated conversion. `collect` can be called `conversion_time` later."""
+
+    def collect(self) -> dict:
+        """Return a simulated reading straight away.
+
+        Raises:
+            OSError: For the configured fraction of reads.
+        """
+
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            raise OSError(121, "Remote I/O error (simulated)")
+
+        gauss = self._random.gauss
+        return {field: base * (1 + gauss(0, self.noise)) for field, base in self._fields.items()}
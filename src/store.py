@@ -0,0 +1,255 @@
+"""SQLite storage of readings, with fast time-range queries.
+
+Every numeric field is stored as one row of `readings`, keyed by its series
+(`sensor.field`) and time. The table is clustered on `(series, time)` and
+indexed on `time`, so reading any range of one sensor, or of every sensor,
+only touches the rows in range. The database is in WAL mode, so queries can
+run while the polling loop is writing.
+"""
+
+import csv
+import sqlite3
+import sys
+from datetime import datetime
+from json import dumps
+from time import localtime, monotonic, strftime, time
+from typing import Iterator, TextIO
+
+from instrumentation import STATS
+from output import OutputOptions
+from writers import TIMESTAMP_FORMAT, Writer
+
+URL_PREFIX = "sqlite:///"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    sensor TEXT NOT NULL,
+    field TEXT NOT NULL,
+    UNIQUE (sensor, field)
+);
+CREATE TABLE IF NOT EXISTS readings (
+    series INTEGER NOT NULL REFERENCES series (id),
+    time REAL NOT NULL,
+    value REAL,
+    PRIMARY KEY (series, time)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS readings_time ON readings (time);
+CREATE TABLE IF NOT EXISTS errors (
+    time REAL NOT NULL,
+    sensor TEXT NOT NULL,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS errors_time ON errors (time);
+"""
+
+def path_from_url(output: str) -> str:
+    """Return the database path of a `sqlite:///path.db` URL (or a plain path)."""
+
+    return output.removeprefix(URL_PREFIX)
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open a database, creating the schema if needed."""
+
+    db = sqlite3.connect(path, timeout=30, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+class SQLiteWriter(Writer):
+    """Writes readings to an SQLite database (see the module docstring).
+
+    Readings are inserted in batches, one transaction per batch, as set by
+    the options' `batch_size` and `flush_interval`. With `fsync = batch`
+    every transaction is synced to the disk; otherwise SQLite's `NORMAL`
+    sync level is used, which survives a crash of the process but may lose
+    the last transactions on power loss.
+
+    Args:
+        output_path (str): Database file, or a `sqlite:///path.db` URL.
+        timestamps (bool, optional): Ignored; every reading is stored with its time.
+        options (OutputOptions, optional): Batching and sync settings.
+
+    Raises:
+        ValueError: If no database is given.
+    """
+
+    def __init__(self, output_path: str | None = None, timestamps: bool = False,
+                 options: OutputOptions | None = None) -> None:
+        if not output_path:
+            raise ValueError("The sqlite format can only be written to a file. Use -o to give one.")
+
+        super().__init__(path_from_url(output_path), timestamps, options)
+        self._db = connect(self.output_path)
+        self._db.execute(f"PRAGMA synchronous={'FULL' if self.options.fsync == 'batch' else 'NORMAL'}")
+        self._series: dict[tuple[str, str], int] = {
+            (sensor, field): series for series, sensor, field in self._db.execute("SELECT id, sensor, field FROM series")
+        }
+        self._rows: list[tuple[int, float, float]] = []
+        self._errors: list[tuple[float, str, str]] = []
+        self._pending: int = 0
+        self._oldest: float = 0.0
+
+    def _series_id(self, sensor: str, field: str) -> int:
+        series = self._series.get((sensor, field))
+        if series is None:
+            cursor = self._db.execute("INSERT INTO series (sensor, field) VALUES (?, ?)", (sensor, field))
+            series = self._series[(sensor, field)] = cursor.lastrowid
+        return series
+
+    def write(self, data: dict) -> None:
+        now = time()
+        with STATS.time("format", "sqlite"):
+            for sensor, readings in data.items():
+                if not isinstance(readings, dict):
+                    continue
+                if "error" in readings:
+                    self._errors.append((now, sensor, str(readings["error"])))
+                    continue
+                for field, value in readings.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        self._rows.append((self._series_id(sensor, field), now, value))
+
+        if not self._pending:
+            self._oldest = monotonic()
+        self._pending += 1
+        if self.options.flush_due(self._pending, self._oldest):
+            self.flush()
+
+    def flush_if_due(self) -> None:
+        if self._pending and self.options.flush_due(self._pending, self._oldest):
+            self.flush()
+
+    def flush(self) -> None:
+        """Insert the buffered readings in one transaction.
+
+        If the transaction fails (e.g. the disk is full), it is rolled back,
+        the error is reported on stderr and the readings are kept for the
+        next flush.
+        """
+
+        if not self._rows and not self._errors:
+            self._pending = 0
+            return
+
+        with STATS.time("flush", "sqlite"):
+            try:
+                self._db.execute("BEGIN")
+                self._db.executemany("INSERT OR REPLACE INTO readings (series, time, value) VALUES (?, ?, ?)", self._rows)
+                self._db.executemany("INSERT INTO errors (time, sensor, message) VALUES (?, ?, ?)", self._errors)
+                self._db.execute("COMMIT")
+            except sqlite3.Error as e:
+                if self._db.in_transaction:
+                    self._db.execute("ROLLBACK")
+                print(f"Could not write {self._pending} readings to {self.output_path}, keeping them to retry: {e}", file=sys.stderr)
+                return
+        STATS.add_bytes("sqlite", 24 * len(self._rows))
+        self._rows.clear()
+        self._errors.clear()
+        self._pending = 0
+
+    def close(self) -> None:
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+
+def parse_time(value: str, now: float | None = None) -> float:
+    """Parse a query time: an ISO date/time (local time), seconds since the epoch, or `now`.
+
+    A duration like `90m` or `7d` means that long ago.
+
+    Raises:
+        ValueError: If the time can't be parsed.
+    """
+
+    from aggregates import parse_window
+
+    now = time() if now is None else now
+    text = value.strip()
+    if text == "now":
+        return now
+    if text[-1:].lower() in ("s", "m", "h", "d"):
+        return now - parse_window(text)
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+def query(db: sqlite3.Connection, start: float | None = None, end: float | None = None,
+          sensors: list[str] | None = None, fields: list[str] | None = None,
+          resample: float | None = None) -> Iterator[tuple]:
+    """Query readings in a time range, optionally averaged into buckets.
+
+    Args:
+        db: Connection from `connect`.
+        start (float, optional): Earliest time (seconds since the epoch), inclusive.
+        end (float, optional): Latest time, exclusive.
+        sensors (list[str], optional): Only these sensors, or sensor types (which include their named instances).
+        fields (list[str], optional): Only these fields.
+        resample (float, optional): Bucket length in seconds. Buckets line up with the epoch.
+
+    Yields:
+        tuple: `(time, sensor, field, value)` rows, or `(bucket start, sensor,
+        field, mean, min, max, count)` rows when resampling, in time order.
+    """
+
+    conditions, parameters = [], []
+    if start is not None:
+        conditions.append("r.time >= ?")
+        parameters.append(start)
+    if end is not None:
+        conditions.append("r.time < ?")
+        parameters.append(end)
+    if sensors:
+        # A type (`bme680`) also matches its named instances (`bme680.outdoor`)
+        conditions.append("(" + " OR ".join(["s.sensor = ? OR s.sensor LIKE ? || '.%' ESCAPE '\\'"] * len(sensors)) + ")")
+        for sensor in sensors:
+            parameters += [sensor, sensor.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")]
+    if fields:
+        conditions.append(f"s.field IN ({', '.join('?' * len(fields))})")
+        parameters += fields
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    if resample:
+        sql = f"""
+            SELECT CAST(r.time / ? AS INTEGER) * ? AS bucket, s.sensor, s.field,
+                   AVG(r.value), MIN(r.value), MAX(r.value), COUNT(r.value)
+            FROM readings r JOIN series s ON s.id = r.series
+            {where}
+            GROUP BY r.series, bucket
+            ORDER BY bucket, s.id
+        """
+        parameters = [resample, resample] + parameters
+    else:
+        sql = f"""
+            SELECT r.time, s.sensor, s.field, r.value
+            FROM readings r JOIN series s ON s.id = r.series
+            {where}
+            ORDER BY r.time, s.id
+        """
+    yield from db.execute(sql, parameters)
+
+def write_rows(rows: Iterator[tuple], resample: float | None, fmt: str, out: TextIO) -> int:
+    """Write rows from `query` as CSV or JSON Lines, with the times formatted like the other outputs.
+
+    Returns:
+        int: The number of rows written.
+    """
+
+    header = ["timestamp", "sensor", "field"] + (["mean", "min", "max", "count"] if resample else ["value"])
+    writer = csv.writer(out) if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(header)
+
+    count = 0
+    for row in rows:
+        row = (strftime(TIMESTAMP_FORMAT, localtime(row[0])),) + tuple(row[1:])
+        if writer is not None:
+            writer.writerow(row)
+        else:
+            out.write(dumps(dict(zip(header, row)), separators=(",", ":")) + "\n")
+        count += 1
+    return count
@@ -0,0 +1,319 @@
+"""Store-and-forward delivery of readings to a central server.
+
+Readings are first written to a spool, an SQLite database in WAL mode, so
+nothing is lost while the server can't be reached or the process restarts.
+A background thread sends the oldest spooled readings in gzipped JSON
+batches and deletes them once the server has accepted them. After an
+outage the backlog is sent oldest first.
+"""
+
+import gzip
+import http.client
+import sqlite3
+import sys
+from json import dumps
+from threading import Event, Thread
+from time import monotonic, sleep, time
+from typing import Any
+from urllib.parse import urlsplit
+
+from resilience import RetryPolicy
+
+DEFAULT_SPOOL_PATH = "weathersensors-spool.db"
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_RECORDS = 1_000_000
+# Backoff between failed deliveries, in seconds
+DELIVERY_RETRY = RetryPolicy(base_delay=1.0, max_delay=300.0)
+
+class PermanentError(Exception):
+    """The server rejected a batch in a way that sending it again won't fix."""
+
+
+class Spool:
+    """A durable first-in, first-out queue of JSON records in an SQLite database.
+
+    Each thread needs its own `Spool` on the same path.
+
+    Args:
+        path (str): Database file. Created if it doesn't exist.
+        max_records (int, optional): Most records kept; the oldest are dropped beyond that. Defaults to DEFAULT_MAX_RECORDS.
+    """
+
+    def __init__(self, path: str, max_records: int = DEFAULT_MAX_RECORDS) -> None:
+        self.path: str = path
+        self.max_records: int = max_records
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # Still safe against process crashes in WAL mode; only a power cut can lose the last records
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS spool (id INTEGER PRIMARY KEY AUTOINCREMENT, record TEXT NOT NULL)")
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def put(self, record: dict[str, Any]) -> None:
+        """Add a record to the end of the queue."""
+
+        cursor = self._db.execute("INSERT INTO spool (record) VALUES (?)", (dumps(record, separators=(",", ":")),))
+        if cursor.lastrowid % 1000 == 0:
+            self._db.execute("DELETE FROM spool WHERE id <= ?", (cursor.lastrowid - self.max_records,))
+
+    def peek(self, limit: int) -> list[tuple[int, str]]:
+        """Return up to `limit` of the oldest records as `(id, json)` pairs, without removing them."""
+
+        return self._db.execute("SELECT id, record FROM spool ORDER BY id LIMIT ?", (limit,)).fetchall()
+
+    def ack(self, last_id: int) -> None:
+        """Remove every record up to and including `last_id`."""
+
+        self._db.execute("DELETE FROM spool WHERE id <= ?", (last_id,))
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class HTTPTransport:
+    """POSTs batches over one persistent HTTP(S) connection.
+
+    Batches are sent as a gzipped JSON array. Any 2xx response is success;
+    408, 429 and 5xx responses and network errors are worth retrying; other
+    errors raise `PermanentError`.
+
+    Args:
+        url (str): Endpoint to POST to, e.g. `https://example.com/ingest`.
+        timeout (float, optional): Seconds to wait for the server. Defaults to 10.
+        headers (dict, optional): Extra request headers, e.g. for authentication.
+    """
+
+    def __init__(self, url: str, timeout: float = 10.0, headers: dict[str, str] | None = None) -> None:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Not an HTTP URL: `{url}`.")
+        self.url: str = url
+        self._scheme = parts.scheme
+        self._host = parts.netloc
+        self._path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self._timeout = timeout
+        self._headers = {"Content-Type": "application/json", "Content-Encoding": "gzip", **(headers or {})}
+        self._connection: http.client.HTTPConnection | None = None
+
+    def send(self, body: bytes) -> None:
+        """Send a gzipped batch.
+
+        Raises:
+            OSError: If the batch should be sent again later.
+            PermanentError: If the server won't ever accept the batch.
+        """
+
+        # A kept-alive connection may have been closed by the server while
+        # idle, so a failure on one is tried once more on a fresh connection.
+        reused = self._connection is not None
+        while True:
+            if self._connection is None:
+                connection_class = http.client.HTTPSConnection if self._scheme == "https" else http.client.HTTPConnection
+                self._connection = connection_class(self._host, timeout=self._timeout)
+            try:
+                self._connection.request("POST", self._path, body, self._headers)
+                response = self._connection.getresponse()
+                response.read()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                if not reused:
+                    raise OSError(f"Could not reach {self.url}: {e}") from e
+                reused = False
+
+        if response.will_close:
+            self.close()
+        if 200 <= response.status < 300:
+            return
+        if response.status in (408, 429) or response.status >= 500:
+            raise OSError(f"{self.url} answered {response.status} {response.reason}")
+        raise PermanentError(f"{self.url} rejected the batch: {response.status} {response.reason}")
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class MQTTTransport:
+    """Publishes batches to an MQTT broker with QoS 1, using `paho-mqtt`.
+
+    Args:
+        url (str): `mqtt://[user:password@]host[:port]/topic`.
+        timeout (float, optional): Seconds to wait for the broker to acknowledge a batch. Defaults to 10.
+
+    Raises:
+        ImportError: If `paho-mqtt` is not installed.
+    """
+
+    def __init__(self, url: str, timeout: float = 10.0) -> None:
+        import paho.mqtt.client as mqtt  # type: ignore
+
+        parts = urlsplit(url)
+        self.url: str = url
+        self.topic: str = parts.path.lstrip("/") or "weathersensors"
+        self._timeout = timeout
+        self._client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2) if hasattr(mqtt, "CallbackAPIVersion") else mqtt.Client()
+        if parts.username:
+            self._client.username_pw_set(parts.username, parts.password)
+        # paho keeps the connection up and reconnects by itself
+        self._client.connect_async(parts.hostname, parts.port or 1883)
+        self._client.loop_start()
+
+    def send(self, body: bytes) -> None:
+        """Publish a gzipped batch.
+
+        Raises:
+            OSError: If the broker didn't acknowledge the batch in time.
+        """
+
+        if not self._client.is_connected():
+            raise OSError(f"Not connected to {self.url}")
+        info = self._client.publish(self.topic, body, qos=1)
+        info.wait_for_publish(self._timeout)
+        if not info.is_published():
+            raise OSError(f"{self.url} didn't acknowledge the batch")
+
+    def close(self) -> None:
+        self._client.loop_stop()
+        self._client.disconnect()
+
+
+def open_transport(url: str) -> HTTPTransport | MQTTTransport:
+    """Create the transport for a URL: `http(s)://...` or `mqtt://...`.
+
+    Raises:
+        ValueError: If the URL scheme isn't supported.
+    """
+
+    scheme = urlsplit(url).scheme
+    if scheme in ("http", "https"):
+        return HTTPTransport(url)
+    if scheme == "mqtt":
+        return MQTTTransport(url)
+    raise ValueError(f"Can't upload to `{url}`; use an http://, https:// or mqtt:// URL.")
+
+
+class Uploader:
+    """Spools readings and delivers them in batches from a background thread.
+
+    `put` only writes to the local spool, so the polling loop never waits on
+    the network. The sender thread sends one batch at a time and only takes
+    the next once the previous one is accepted; while the server is down it
+    backs off (with jitter, up to 5 minutes) and readings pile up in the
+    spool, to be sent once it is back.
+
+    Args:
+        transport: Sends a gzipped batch; see `HTTPTransport` and `MQTTTransport`.
+        spool_path (str, optional): Spool database file. Defaults to DEFAULT_SPOOL_PATH.
+        batch_size (int, optional): Most readings per batch. Defaults to DEFAULT_BATCH_SIZE.
+        retry (RetryPolicy, optional): Backoff between failed deliveries. Defaults to DELIVERY_RETRY.
+    """
+
+    def __init__(self, transport: Any, spool_path: str = DEFAULT_SPOOL_PATH, batch_size: int = DEFAULT_BATCH_SIZE,
+                 retry: RetryPolicy = DELIVERY_RETRY) -> None:
+        self.transport = transport
+        self.spool_path: str = spool_path
+        self.batch_size: int = batch_size
+        self.retry: RetryPolicy = retry
+        self.sent: int = 0
+        self.dropped: int = 0
+        self._spool = Spool(spool_path)
+        self._wake = Event()
+        self._stop = Event()
+        self._thread = Thread(target=self._run, name="uploader", daemon=True)
+        self._thread.start()
+
+    def put(self, data: dict[str, dict]) -> None:
+        """Spool a reading for delivery, stamped with the current time.
+
+        If the spool can't be written (e.g. the disk is full), the reading is
+        dropped and counted in `dropped`, and the error reported on stderr, so
+        the polling loop carries on.
+        """
+
+        try:
+            self._spool.put({"time": time(), **data})
+        except sqlite3.Error as e:
+            self.dropped += 1
+            print(f"Upload: can't spool a reading, dropping it ({self.dropped} so far): {e}", file=sys.stderr)
+            return
+        self._wake.set()
+
+    def _run(self) -> None:
+        spool = Spool(self.spool_path)
+        failures = 0
+        try:
+            while not self._stop.is_set():
+                try:
+                    batch = spool.peek(self.batch_size)
+                except sqlite3.Error as e:
+                    failures = self._back_off(failures, f"can't read the spool: {e}")
+                    continue
+                if not batch:
+                    self._wake.wait()
+                    self._wake.clear()
+                    continue
+
+                body = gzip.compress(("[" + ",".join(record for _, record in batch) + "]").encode())
+                try:
+                    self.transport.send(body)
+                except PermanentError as e:
+                    print(f"Upload: dropping {len(batch)} readings: {e}", file=sys.stderr)
+                except Exception as e:
+                    failures = self._back_off(failures, str(e))
+                    continue
+                else:
+                    self.sent += len(batch)
+                failures = 0
+                try:
+                    spool.ack(batch[-1][0])
+                except sqlite3.Error as e:
+                    # The batch stays spooled and is sent again
+                    failures = self._back_off(failures, f"can't update the spool: {e}")
+        finally:
+            spool.close()
+
+    def _back_off(self, failures: int, problem: str) -> int:
+        """Report a failed delivery and wait before the next try. Returns the new failure count."""
+
+        wait = self.retry.delay(failures)
+        print(f"Upload: {problem}; trying again in {wait:.1f} s", file=sys.stderr)
+        self._stop.wait(wait)
+        return failures + 1
+
+    def pending(self) -> int:
+        """Return the number of readings waiting to be delivered."""
+
+        return len(self._spool)
+
+    def flush(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for the spool to empty. Returns whether it did."""
+
+        deadline = monotonic() + timeout
+        while self.pending():
+            if monotonic() >= deadline or not self._thread.is_alive():
+                return False
+            sleep(0.05)
+        return True
+
+    def __enter__(self) -> "Uploader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Try to deliver what is spooled for up to `timeout` seconds, then stop.
+
+        Anything not delivered stays in the spool and is sent by the next run.
+        """
+
+        self.flush(timeout)
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=1)
+        self.transport.close()
+        self._spool.close()
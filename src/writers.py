@@ -0,0 +1,523 @@
+import os
+from importlib import import_module
+from json import dumps, loads
+from pathlib import Path
+from string import Formatter
+from time import localtime, strftime, time
+from typing import Any
+
+from instrumentation import STATS
+from output import CONSOLE_FLUSH_INTERVAL, ConsoleOutput, OutputFile, OutputOptions
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Readings the CSV writer holds back at most, waiting for every sensor to report once before writing the header
+CSV_HEADER_WAIT = 10
+
+class TimestampCache:
+    """Returns the current time formatted with `TIMESTAMP_FORMAT`, formatting it at most once a second.
+
+    The timestamp only changes once a second, but formatting it costs more
+    than the rest of a CSV row, so fast polling loops reuse the last one.
+    """
+
+    __slots__ = ("_second", "_text")
+
+    def __init__(self) -> None:
+        self._second: int | None = None
+        self._text: str = ""
+
+    def __call__(self, now: float | None = None) -> str:
+        second = int(time() if now is None else now)
+        if second != self._second:
+            self._second = second
+            self._text = strftime(TIMESTAMP_FORMAT, localtime(second))
+        return self._text
+
+_TIMESTAMPS = TimestampCache()
+
+def format_sensor_data(data: dict, timestamps: bool) -> str:
+    """Format sensor data as a human-readable string."""
+
+    lines = []
+    timestamp = _TIMESTAMPS() if timestamps else ""
+    for sensor in data:
+        if timestamps:
+            lines.append(f"({timestamp}) - {sensor.upper()}:")
+        else:
+            lines.append(f"{sensor.upper()}:")
+        for key, value in data[sensor].items():
+            lines.append(f"\t{key}: {value}")
+    return "\n".join(lines)
+
+def open_output(output_path: str | None, options: OutputOptions, kind: str) -> OutputFile | ConsoleOutput:
+    """Open the output file of a writer, or the console if there is no path.
+
+    Console output is held back for the options' `flush_interval`, or
+    CONSOLE_FLUSH_INTERVAL if it isn't set.
+    """
+
+    if output_path:
+        return OutputFile(output_path, options, kind)
+    return ConsoleOutput(options.line_buffered, flush_interval=options.flush_interval or CONSOLE_FLUSH_INTERVAL)
+
+
+class Writer:
+    """Base class for the output writers.
+
+    A writer is created once per run and receives every reading through
+    `write`. Writers are context managers so the polling loop can make sure
+    any open handles are closed (and buffered readings written) when it exits.
+
+    Args:
+        output_path (str, optional): File to write to. If omitted, writes to the console.
+        timestamps (bool, optional): Whether to add timestamps to each reading. Defaults to False.
+        options (OutputOptions, optional): Buffering, sync and rotation settings of the output file.
+    """
+
+    def __init__(self, output_path: str | None = None, timestamps: bool = False,
+                 options: OutputOptions | None = None) -> None:
+        self.output_path: str | None = output_path
+        self.timestamps: bool = timestamps
+        self.options: OutputOptions = options or OutputOptions()
+
+    def write(self, data: dict) -> None:
+        raise NotImplementedError
+
+    def flush_if_due(self) -> None:
+        """Write out buffered readings if the options' `flush_interval` has passed.
+
+        The polling loop calls this between reads, so buffered readings don't
+        wait for the next one when readings are far apart.
+        """
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "Writer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class TextWriter(Writer):
+    """Writes readings in the `\\tkey: value` text layout.
+
+    The output file is kept open and buffered, synced and rotated as set by
+    the options.
+    """
+
+    def __init__(self, output_path: str | None = None, timestamps: bool = False,
+                 options: OutputOptions | None = None) -> None:
+        super().__init__(output_path, timestamps, options)
+        self._file = OutputFile(output_path, self.options, "text") if output_path else None
+
+    def write(self, data: dict) -> None:
+        with STATS.time("format", "text"):
+            formatted = format_sensor_data(data, self.timestamps)
+        STATS.add_bytes("text", len(formatted) + 1)
+
+        if self._file is None:
+            print(formatted)
+        else:
+            self._file.write(formatted + '\n')
+
+    def flush_if_due(self) -> None:
+        if self._file is not None:
+            self._file.flush_if_due()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class JSONWriter(Writer):
+    """Writes readings as a single JSON document of `reading_N` keys.
+
+    The existing document is read once when the writer is created. After that
+    each reading overwrites the closing brace of the document with the new
+    entry and a new closing brace, so the file is valid JSON after every write
+    and the cost per reading stays constant.
+
+    Note:
+        The document can't be buffered or rotated, only synced. Use
+        `JSONLinesWriter` for long-running captures.
+    """
+
+    _CLOSING = "\n}\n"
+
+    def __init__(self, output_path: str | None = None, timestamps: bool = False,
+                 options: OutputOptions | None = None) -> None:
+        super().__init__(output_path, timestamps, options)
+        self._file = None
+        self._count: int = 0
+        if not output_path:
+            return
+
+        path = Path(output_path)
+        try:
+            current_data = loads(path.read_text())
+        except Exception:
+            current_data = {}
+        self._count = len(current_data)
+        # Rewrite the document once so it ends exactly as the appends expect
+        self._file = open(path, "w+b")
+        self._file.write((dumps(current_data, indent=2) + "\n" if current_data else "").encode())
+        self._file.flush()
+
+    def write(self, data: dict) -> None:
+        if self._file is None:
+            with STATS.time("format", "json"):
+                document = dumps(data, indent=2)
+            STATS.add_bytes("json", len(document) + 1)
+            print(document)
+            return
+
+        self._count += 1
+        if self.timestamps:
+            data["timestamp"] = _TIMESTAMPS()
+
+        with STATS.time("format", "json"):
+            # `{"reading_N": ...}` without its braces is the entry, already indented
+            entry = dumps({f"reading_{self._count}": data}, indent=2)[1:-2]
+            chunk = (("," if self._count > 1 else "{") + entry + self._CLOSING).encode()
+        STATS.add_bytes("json", len(chunk))
+
+        if self._count > 1:
+            self._file.seek(-len(self._CLOSING), 2)
+        self._file.write(chunk)
+        self._file.flush()
+        if self.options.fsync == "batch":
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self._file is not None:
+            if self.options.fsync != "never":
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+
+class JSONLinesWriter(Writer):
+    """Writes readings as JSON Lines (one compact JSON object per line).
+
+    The output file is opened once in append mode and every reading is a single
+    line write, so the cost per reading is constant however large the file gets.
+    It is buffered, synced and rotated as set by the options; with the default
+    options each line is written straight away, so a crash can at most
+    truncate the last line.
+    """
+
+    def __init__(self, output_path: str | None = None, timestamps: bool = False,
+                 options: OutputOptions | None = None) -> None:
+        super().__init__(output_path, timestamps, options)
+        self._file = open_output(output_path, self.options, "jsonl")
+        self._timestamp = TimestampCache()
+
+    def write(self, data: dict) -> None:
+        with STATS.time("format", "jsonl"):
+            record = {"timestamp": self._timestamp(), **data} if self.timestamps else data
+            line = dumps(record, separators=(",", ":"))
+        STATS.add_bytes("jsonl", len(line) + 1)
+        self._file.write(line + '\n')
+
+    def flush_if_due(self) -> None:
+        self._file.flush_if_due()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _csv_cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if type(value) is float or type(value) is int:
+        return repr(value)
+    text = str(value)
+    if any(char in text for char in ',"\r\n'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+class CSVWriter(Writer):
+    """Writes readings as CSV: one row per reading, one `sensor.field` column per field.
+
+    The first readings are held back until every sensor in them has reported
+    without an error (or CSV_HEADER_WAIT readings have come), so the columns
+    can be worked out from all of them and the header written once. Along
+    with the columns comes a plan of which sensor and field fills each cell,
+    so every row after that is built in one pass over the plan. If a later
+    reading brings a field that isn't a column yet, an output file is rotated
+    and a new one started with the new header; console output keeps its one
+    header and leaves the new field out. A sensor with an error leaves its
+    cells empty; use `jsonl` to keep the error messages.
+
+    Files are buffered, synced and rotated as set by the options, and every
+    rotated file starts with the header. Console output is written in large
+    blocks unless it is line-buffered (see `ConsoleOutput`).
+    """
+
+    def __init__(self, output_path: str | None = None, timestamps: bool = False,
+                 options: OutputOptions | None = None) -> None:
+        super().__init__(output_path, timestamps, options)
+        self._file = open_output(output_path, self.options, "csv")
+        self._timestamp = TimestampCache()
+        # Sensors and their fields, in column order; a sensor can come back in a later group
+        self._plan: list[tuple[str, tuple[str, ...]]] = []
+        self._columns: dict[str, set[str]] = {}
+        # Readings held back until the header is written, with their timestamps; None once it is
+        self._held: list[tuple[str, dict]] | None = []
+        self._seen: set[str] = set()
+
+    def _add_columns(self, data: dict) -> bool:
+        """Add any fields of `data` that aren't columns yet. Returns whether there were any."""
+
+        added = False
+        for sensor, readings in data.items():
+            if not isinstance(readings, dict) or "error" in readings:
+                continue
+            columns = self._columns.setdefault(sensor, set())
+            if readings.keys() <= columns:
+                continue
+            fields = tuple(field for field, value in readings.items() if field not in columns and not isinstance(value, (dict, list)))
+            columns.update(readings.keys())
+            if fields:
+                self._plan.append((sensor, fields))
+                added = True
+        return added
+
+    def header(self) -> str:
+        """Return the header line of the current columns."""
+
+        names = ["timestamp"] if self.timestamps else []
+        names += [_csv_cell(f"{sensor}.{field}") for sensor, fields in self._plan for field in fields]
+        return ",".join(names) + "\n"
+
+    def write(self, data: dict) -> None:
+        timestamp = self._timestamp() if self.timestamps else ""
+        if self._held is not None:
+            self._hold(timestamp, data)
+            return
+        if isinstance(self._file, OutputFile) and self._add_columns(data):
+            # Start a new file rather than write a second header into this one
+            self._file.flush()
+            self._file.header = self.header()
+            self._file.rotate()
+        self._write_row(timestamp, data)
+
+    def _hold(self, timestamp: str, data: dict) -> None:
+        self._held.append((timestamp, {sensor: dict(readings) if isinstance(readings, dict) else readings
+                                       for sensor, readings in data.items()}))
+        self._add_columns(data)
+        self._seen.update(data)
+        if self._seen <= self._columns.keys() or len(self._held) >= CSV_HEADER_WAIT:
+            self._write_held()
+
+    def _write_held(self) -> None:
+        """Write the header and the readings held back for it."""
+
+        held, self._held = self._held, None
+        if not held:
+            return
+        header = self.header()
+        if isinstance(self._file, OutputFile):
+            self._file.header = header
+        self._file.write(header)
+        for timestamp, data in held:
+            self._write_row(timestamp, data)
+
+    def _write_row(self, timestamp: str, data: dict) -> None:
+        with STATS.time("format", "csv"):
+            cells = [timestamp] if self.timestamps else []
+            for sensor, fields in self._plan:
+                readings = data.get(sensor)
+                if not isinstance(readings, dict) or "error" in readings:
+                    cells += [""] * len(fields)
+                else:
+                    get = readings.get
+                    cells += [_csv_cell(get(field)) for field in fields]
+            line = ",".join(cells) + "\n"
+        STATS.add_bytes("csv", len(line))
+        self._file.write(line)
+
+    def flush_if_due(self) -> None:
+        self._file.flush_if_due()
+
+    def close(self) -> None:
+        if self._file is not None:
+            if self._held is not None:
+                self._write_held()
+            self._file.close()
+            self._file = None
+
+
+class _Missing:
+    """Stands in for a value a reading doesn't have, and formats as nothing whatever the format spec."""
+
+    __slots__ = ()
+
+    def __format__(self, spec: str) -> str:
+        return ""
+
+    def __repr__(self) -> str:
+        return ""
+
+_MISSING = _Missing()
+
+def compile_template(template: str) -> tuple[str, list[str]]:
+    """Turn a row template into a format string of numbered fields and the name of each field.
+
+    `"{timestamp} {bme680.temperature:.1f}"` becomes `"{0} {1:.1f}"` and
+    `["timestamp", "bme680.temperature"]`, so each row is one `str.format` call.
+
+    Raises:
+        ValueError: If the template isn't valid.
+    """
+
+    parts, names = [], []
+    for literal, name, spec, conversion in Formatter().parse(template):
+        parts.append(literal.replace("{", "{{").replace("}", "}}"))
+        if name is None:
+            continue
+        if not name:
+            raise ValueError("Every field of the template needs a name, e.g. `{bme680.temperature}`.")
+        if "{" in (spec or ""):
+            raise ValueError(f"Nested fields aren't supported in templates: `{{{name}:{spec}}}`.")
+        parts.append("{" + str(len(names)) + (f"!{conversion}" if conversion else "") + (f":{spec}" if spec else "") + "}")
+        names.append(name)
+    return "".join(parts), names
+
+class TemplateWriter(Writer):
+    """Writes each reading as a line made from a template.
+
+    Fields are `{timestamp}` and `{sensor.field}` names, with any `str.format`
+    spec, e.g. `{timestamp} {bme680.temperature:.1f} {bme680.pressure:.0f}`.
+    The template is compiled once (see `compile_template`). A field that the
+    reading doesn't have, or whose sensor had an error, is left empty.
+
+    Output is buffered like `CSVWriter`'s.
+
+    Args:
+        template (str): The row template.
+
+    Raises:
+        ValueError: If the template is missing or invalid.
+    """
+
+    def __init__(self, output_path: str | None = None, timestamps: bool = False,
+                 options: OutputOptions | None = None, template: str | None = None) -> None:
+        if not template:
+            raise ValueError("The template format needs a template. Use --template to give one.")
+
+        super().__init__(output_path, timestamps, options)
+        self.template: str = template
+        self._format, self._names = compile_template(template)
+        self._file = open_output(output_path, self.options, "template")
+        self._timestamp = TimestampCache()
+        # Where each field name was found, as (sensor, field); sensor names can contain dots
+        self._paths: dict[str, tuple[str, str]] = {}
+
+    def _find(self, data: dict, name: str) -> tuple[str, str] | None:
+        sensor, _, field = name.rpartition(".")
+        if sensor in data:
+            return sensor, field
+        for index, char in enumerate(name):
+            if char == "." and name[:index] in data:
+                return name[:index], name[index + 1:]
+        return None
+
+    def _value(self, data: dict, name: str) -> Any:
+        if name == "timestamp":
+            return self._timestamp()
+        path = self._paths.get(name)
+        if path is None:
+            path = self._find(data, name)
+            if path is None:
+                return _MISSING
+            self._paths[name] = path
+        readings = data.get(path[0])
+        if not isinstance(readings, dict):
+            return _MISSING
+        value = readings.get(path[1])
+        return _MISSING if value is None else value
+
+    def write(self, data: dict) -> None:
+        with STATS.time("format", "template"):
+            line = self._format.format(*[self._value(data, name) for name in self._names]) + "\n"
+        STATS.add_bytes("template", len(line))
+        self._file.write(line)
+
+    def flush_if_due(self) -> None:
+        self._file.flush_if_due()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# Map of output format names to their writer classes. Writers in other
+# modules are given as `module:class` and only imported when used.
+WRITERS: dict[str, type | str] = {
+    "text": TextWriter,
+    "json": JSONWriter,
+    "jsonl": JSONLinesWriter,
+    "csv": CSVWriter,
+    "template": TemplateWriter,
+    "binary": "binlog:BinaryWriter",
+    "sqlite": "store:SQLiteWriter",
+}
+
+# Formats that can only be written to a file
+FILE_ONLY_FORMATS: set[str] = {"binary", "sqlite"}
+
+def open_writer(fmt: str, output_path: str | None = None, timestamps: bool = False,
+                options: OutputOptions | None = None, **settings: Any) -> Writer:
+    """Create the writer for the given output format.
+
+    Any other settings (e.g. the `template` of the template format) are passed on to the writer.
+    """
+
+    writer_class = WRITERS[fmt]
+    if isinstance(writer_class, str):
+        module_name, _, class_name = writer_class.partition(":")
+        writer_class = getattr(import_module(module_name), class_name)
+    return writer_class(output_path, timestamps, options, **settings)
+
+def convert_json_to_jsonl(source: str, destination: str) -> int:
+    """Convert a legacy `reading_N` JSON output file to JSON Lines.
+
+    Readings are written in index order, one per line, with any timestamp
+    that was stored in the reading kept as-is.
+
+    Args:
+        source (str): Path of the legacy JSON file.
+        destination (str): Path of the JSON Lines file to append to.
+
+    Returns:
+        int: The number of readings converted.
+
+    Raises:
+        OSError: If a file can't be read or written.
+        ValueError: If the source file is not valid JSON or not a legacy `reading_N` document.
+    """
+
+    document = loads(Path(source).read_text() or "{}")
+    if not isinstance(document, dict):
+        raise ValueError(f"{source} is not a legacy JSON output file.")
+
+    def index(key: str) -> int:
+        prefix, _, number = key.rpartition("_")
+        if prefix != "reading" or not number.isdigit():
+            raise ValueError(f"Unexpected key `{key}` in {source}.")
+        return int(number)
+
+    # Check every key before the destination is created
+    keys = sorted(document, key=index)
+    with open(destination, 'a') as f:
+        for key in keys:
+            f.write(dumps(document[key], separators=(",", ":")) + '\n')
+
+    return len(document)
@@ -1,4 +1,6 @@
+import glob
 import os
+import random
 import shutil
 import tempfile
 import pytest
@@ -16,24 +18,39 @@ def pytest_runtest_setup(item):
         if selected_marker != "hardware":
             pytest.skip("skipped hardware test: pass `-m hardware` to run")
 
+W1_SLAVE_CONTENT = "a1 01 4b 46 7f ff 0c 10 aa : crc=aa YES\na1 01 4b 46 7f ff 0c 10 aa t={}\n"
+
+class FakeSysfs:
+    """A fake `/sys` tree. Paths under `/sys` are redirected into a temporary directory."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, sys_path):
+        return os.path.join(self.root, sys_path.lstrip("/"))
+
+    def add_probe(self, rom, millidegrees=26312, content=None):
+        device = self.path(f"/sys/bus/w1/devices/{rom}")
+        os.makedirs(device, exist_ok=True)
+        with open(os.path.join(device, "w1_slave"), "w") as f:
+            f.write(content if content is not None else W1_SLAVE_CONTENT.format(millidegrees))
+
 @pytest.fixture
 def fake_sysfs_ds18b20(monkeypatch):
-    # Setup fake sysfs structure
-    fake_sys = tempfile.mkdtemp()
-    fake_i2c_path = os.path.join(fake_sys, "sys/bus/i2c/devices/i2c-2")
-    fake_w1_path = os.path.join(fake_sys, "sys/bus/w1/devices/28-000005e2fdc3")
-    os.makedirs(fake_i2c_path)
-    os.makedirs(fake_w1_path)
-
-    # Create files
-    with open(os.path.join(fake_i2c_path, "new_device"), "w") as f:
+    # 1. Setup fake sysfs structure
+    fake_sys = FakeSysfs(tempfile.mkdtemp())
+    os.makedirs(fake_sys.path("/sys/bus/i2c/devices/i2c-2"))
+    with open(fake_sys.path("/sys/bus/i2c/devices/i2c-2/new_device"), "w") as f:
         f.write("")
-    with open(os.path.join(fake_w1_path, "w1_slave"), "w") as f:
-        f.write("a1 01 4b 46 7f ff 0c 10 aa : crc=aa YESn\n1 01 4b 46 7f ff 0c 10 aa t=26312")
+    fake_sys.add_probe("28-000005e2fdc3")
+
+    # 2. Patch `glob.glob` to search the fake tree
+    real_glob = glob.glob
 
-    # 2. Patch `glob.glob` to find the fake slave file
-    def fake_glob(_path):
-        return [os.path.join(fake_w1_path, "w1_slave")]
+    def fake_glob(pattern, *args, **kwargs):
+        if not pattern.startswith("/sys/"):
+            return real_glob(pattern, *args, **kwargs)
+        return ["/" + os.path.relpath(path, fake_sys.root) for path in real_glob(fake_sys.path(pattern))]
 
     monkeypatch.setattr("glob.glob", fake_glob)
 
@@ -41,18 +58,16 @@ def fake_sysfs_ds18b20(monkeypatch):
     real_open = open
 
     def fake_open(file, mode='r', *args, **kwargs):
-        if "w1_slave" in file:
-            return real_open(os.path.join(fake_w1_path, "w1_slave"), mode, *args, **kwargs)
-        elif "new_device" in file:
-            return real_open(os.path.join(fake_i2c_path, "new_device"), mode, *args, **kwargs)
+        if isinstance(file, str) and file.startswith("/sys/"):
+            return real_open(fake_sys.path(file), mode, *args, **kwargs)
         return real_open(file, mode, *args, **kwargs)
 
     monkeypatch.setattr("builtins.open", fake_open)
 
-    yield 
+    yield fake_sys
 
     # 4. Cleanup
-    shutil.rmtree(fake_sys)
+    shutil.rmtree(fake_sys.root)
 
 @pytest.fixture
 def fake_bme680_sensor():
@@ -68,4 +83,78 @@ def fake_bme680_sensor():
 @pytest.fixture
 def mock_bme680_sensor(fake_bme680_sensor):
     with patch("BME680.bme680.BME680", return_value=fake_bme680_sensor):
-        yield fake_bme680_sensor
\ No newline at end of file
+        yield fake_bme680_sensor
+
+class FakeADS7830Bus:
+    """Stand-in for an SMBus with an ADS7830 on it.
+
+    Each channel returns its channel number times 10, or minus 1 for differential reads.
+    """
+
+    def __init__(self):
+        self.transactions = 0
+
+    def _value(self, command):
+        select = command >> 4
+        if select & 0x08:
+            channel = ((select & 0x03) << 1) | ((select & 0x04) >> 2)
+            return channel * 10
+        return 255 - (select & 0x03)
+
+    def i2c_rdwr(self, *messages):
+        self.transactions += 1
+        command = None
+        for message in messages:
+            if message.flags == 0:
+                command = list(message)[0]
+            else:
+                message.buf[0] = bytes([self._value(command)])
+
+    def write_byte(self, addr, value):
+        self._command = value
+
+    def read_byte(self, addr):
+        return self._value(self._command)
+
+@pytest.fixture
+def fake_ads7830_bus():
+    return FakeADS7830Bus()
+
+class FakeBME680Bus:
+    """Stand-in for an SMBus with a BME680 on it, for the real `bme680` driver.
+
+    The registers start out as fixed pseudo-random bytes (so the calibration
+    and field data give plausible readings), with the chip id in place and a
+    finished, heat stable conversion in the field registers. Forced mode writes
+    (conversions started) are counted.
+    """
+
+    def __init__(self):
+        from bme680 import constants
+        self._constants = constants
+        rng = random.Random(1)
+        self.registers = bytearray(rng.randrange(1, 256) for _ in range(256))
+        self.registers[constants.CHIP_ID_ADDR] = constants.CHIP_ID
+        self.registers[constants.CHIP_VARIANT_ADDR] = 0
+        self.registers[constants.FIELD0_ADDR] |= constants.NEW_DATA_MSK
+        for gas_lsb in (constants.FIELD0_ADDR + 14, constants.FIELD0_ADDR + 16):
+            self.registers[gas_lsb] |= constants.HEAT_STAB_MSK
+        self.conversions = 0
+
+    def read_byte_data(self, addr, register):
+        return self.registers[register]
+
+    def read_i2c_block_data(self, addr, register, length):
+        return list(self.registers[register:register + length])
+
+    def write_byte_data(self, addr, register, value):
+        if register == self._constants.CONF_T_P_MODE_ADDR and value & self._constants.MODE_MSK == self._constants.FORCED_MODE:
+            self.conversions += 1
+        self.registers[register] = value
+
+    def write_i2c_block_data(self, addr, register, values):
+        self.registers[register:register + len(values)] = bytes(values)
+
+@pytest.fixture
+def fake_bme680_bus():
+    return FakeBME680Bus()
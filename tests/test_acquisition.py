@@ -0,0 +1,149 @@
+import time
+from acquisition import AcquisitionEngine
+from resilience import CircuitBreaker, RetryPolicy
+
+class SlowReader:
+    def __init__(self, bus_number, delay, log=None, name=None, bus="i2c"):
+        self.BUS = bus
+        self.bus_number = bus_number
+        self.delay = delay
+        self.log = log
+        self.name = name
+
+    def get_readings(self):
+        time.sleep(self.delay)
+        if self.log is not None:
+            self.log.append(self.name)
+        return {"value": self.delay}
+
+def test_sensors_on_different_buses_are_read_concurrently():
+    engine = AcquisitionEngine({
+        "a": SlowReader(1, 0.2),
+        "b": SlowReader(2, 0.2),
+    })
+
+    start = time.monotonic()
+    result = engine.read(["a", "b"])
+    elapsed = time.monotonic() - start
+
+    assert result == {"a": {"value": 0.2}, "b": {"value": 0.2}}
+    assert elapsed < 0.35
+
+def test_sensors_on_the_same_bus_keep_their_order():
+    log = []
+    engine = AcquisitionEngine({
+        "first": SlowReader(2, 0.05, log, "first"),
+        "second": SlowReader(2, 0.0, log, "second"),
+    })
+
+    engine.read(["first", "second"])
+
+    assert log == ["first", "second"]
+
+def test_timeout_returns_error_entry():
+    engine = AcquisitionEngine(
+        {"hung": SlowReader(1, 0.5), "ok": SlowReader(2, 0.0)},
+        timeouts={"hung": 0.1},
+    )
+
+    result = engine.read(["hung", "ok"])
+
+    assert "error" in result["hung"]
+    assert result["ok"] == {"value": 0.0}
+    assert "error" in engine.read(["hung"])["hung"]  # still busy
+
+def test_unknown_sensor():
+    assert AcquisitionEngine({}).read(["nope"]) == {"nope": {"error": "Unknown sensor"}}
+
+class FlakyReader:
+    BUS = "i2c"
+    bus_number = 1
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = 0
+
+    def get_readings(self):
+        self.calls += 1
+        result = self.results.pop(0) if self.results else OSError(121, "Remote I/O error")
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+def test_failed_read_is_retried():
+    reader = FlakyReader([OSError(121, "Remote I/O error"), None, {"value": 1}])
+    engine = AcquisitionEngine({"flaky": reader}, retry=RetryPolicy(attempts=3, base_delay=0.001))
+
+    assert engine.read(["flaky"]) == {"flaky": {"value": 1}}
+    assert reader.calls == 3
+
+def test_failures_become_error_entries():
+    engine = AcquisitionEngine(
+        {"broken": FlakyReader([IndexError("list index out of range")] * 3), "ok": SlowReader(2, 0.0)},
+        retry=RetryPolicy(attempts=3, base_delay=0.001),
+    )
+
+    result = engine.read(["broken", "ok"])
+
+    assert result["broken"] == {"error": "IndexError: list index out of range"}
+    assert result["ok"] == {"value": 0.0}
+
+def test_circuit_breaker_skips_a_dead_sensor_then_probes_it():
+    now = [0.0]
+    reader = FlakyReader([])
+    engine = AcquisitionEngine(
+        {"dead": reader},
+        retry=RetryPolicy(attempts=1),
+        breaker=lambda: CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0]),
+    )
+
+    engine.read(["dead"])
+    engine.read(["dead"])
+    assert engine.breakers["dead"].state == "open"
+
+    assert "Skipped" in engine.read(["dead"])["dead"]["error"]
+    assert reader.calls == 2
+
+    now[0] = 10.0
+    reader.results = [{"value": 1}]
+    assert engine.read(["dead"]) == {"dead": {"value": 1}}
+    assert engine.breakers["dead"].state == "closed"
+
+class SplitReader(SlowReader):
+    def __init__(self, bus_number, delay, log=None, name=None):
+        super().__init__(bus_number, delay, log, name)
+        self.conversion_time = delay
+        self.fail_trigger = False
+
+    def trigger(self):
+        if self.fail_trigger:
+            raise OSError("no ack")
+        if self.log is not None:
+            self.log.append(f"trigger {self.name}")
+
+    def collect(self):
+        if self.log is not None:
+            self.log.append(self.name)
+        return {"value": self.delay}
+
+def test_split_phase_conversions_on_one_bus_overlap():
+    log = []
+    engine = AcquisitionEngine({
+        "a": SplitReader(1, 0.2, log, "a"),
+        "b": SplitReader(1, 0.2, log, "b"),
+        "c": SlowReader(1, 0.1, log, "c"),
+    })
+
+    start = time.monotonic()
+    result = engine.read(["a", "b", "c"])
+    elapsed = time.monotonic() - start
+
+    assert result == {"a": {"value": 0.2}, "b": {"value": 0.2}, "c": {"value": 0.1}}
+    assert log == ["trigger a", "trigger b", "c", "a", "b"]
+    assert elapsed < 0.3
+
+def test_failed_trigger_falls_back_to_a_full_read():
+    reader = SplitReader(1, 0.0)
+    reader.fail_trigger = True
+
+    assert AcquisitionEngine({"a": reader}).read(["a"]) == {"a": {"value": 0.0}}
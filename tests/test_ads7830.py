@@ -0,0 +1,73 @@
+import pytest
+from ADS7830 import ADS7830Reader, Channel, REDUCERS, parse_channels
+
+def test_ads7830_default_scan_nohardware(fake_ads7830_bus):
+    reader = ADS7830Reader(2, 0x48, bus=fake_ads7830_bus)
+    result = reader.get_readings()
+
+    assert result == {f"ch{n}": n * 10 for n in range(8)}
+    assert fake_ads7830_bus.transactions == 1
+
+def test_ads7830_calibrated_channels_nohardware(fake_ads7830_bus):
+    channels = [Channel("wind_vane", 3, scale=2.0, offset=1.0), Channel("rain", 2, differential=True)]
+    reader = ADS7830Reader(2, 0x48, channels=channels, bus=fake_ads7830_bus)
+
+    assert reader.get_readings() == {"wind_vane": 61.0, "rain": 254}
+
+def test_ads7830_single_read_matches_scan_nohardware(fake_ads7830_bus):
+    reader = ADS7830Reader(2, 0x48, bus=fake_ads7830_bus)
+
+    assert [reader.read_adc_single(n) for n in range(8)] == list(reader.get_readings().values())
+
+def test_parse_channels():
+    section = {
+        "address": "0x48",
+        "channel.wind_vane": "0",
+        "scale.wind_vane": "1.5",
+        "channel.rain": "diff 2",
+    }
+
+    assert parse_channels(section) == [
+        Channel("wind_vane", 0, False, 1.5, 0.0),
+        Channel("rain", 2, True, 1.0, 0.0),
+    ]
+
+def test_parse_channels_invalid():
+    with pytest.raises(ValueError):
+        parse_channels({"channel.rain": "sideways 2"})
+    with pytest.raises(ValueError):
+        parse_channels({"channel.rain": "9"})
+
+@pytest.mark.hardware
+def test_ads7830_read_hardware():
+    try:
+        reader = ADS7830Reader(2, 0x48)
+    except Exception as e:
+        pytest.fail(f"Error initializing ADS7830: {e}", pytrace=False)
+
+    result = reader.get_readings()
+
+    assert len(result) == 8
+
+def test_ads7830_oversampling_nohardware(fake_ads7830_bus):
+    channels = [Channel("light", 1), Channel("wind_vane", 2)]
+    reader = ADS7830Reader(2, 0x48, channels=channels, oversample=32, reducer="median", bus=fake_ads7830_bus)
+    result = reader.get_readings()
+
+    assert result["light"] == 10
+    assert result["wind_vane"] == 20
+    assert result["sample_rate"] > 0
+    assert fake_ads7830_bus.transactions == 4  # 128 messages in batches of 42
+
+@pytest.mark.parametrize("reducer, expected", [("mean", 32.0), ("median", 4), ("trimmed", 4.0)])
+def test_ads7830_reducers(reducer, expected):
+    assert REDUCERS[reducer]([1, 2, 3, 4, 5, 6, 203], 1 / 7) == expected
+
+def test_ads7830_invalid_reducer(fake_ads7830_bus):
+    with pytest.raises(ValueError):
+        ADS7830Reader(2, 0x48, reducer="mode", bus=fake_ads7830_bus)
+
+@pytest.mark.parametrize("setting", [{"oversample": "0"}, {"reducer": "mode"}, {"trim": "-0.1"}, {"trim": "0.5"}])
+def test_ads7830_options_from_config_checks_oversampling(setting):
+    with pytest.raises(ValueError):
+        ADS7830Reader.options_from_config({"channel.rain": "2", **setting})
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from aggregates import Aggregator, RollingSeries, capacity_for, format_window, parse_window, pressure_tendency
+
+def test_parse_and_format_window():
+    assert parse_window("90") == 90
+    assert parse_window("15m") == 900
+    assert parse_window("1h") == 3600
+    assert format_window(86400) == "1d"
+    assert format_window(5400) == "90m"
+    with pytest.raises(ValueError):
+        parse_window("0h")
+
+def test_rolling_series_matches_a_full_rescan():
+    rng = random.Random(1)
+    series = RollingSeries(capacity=50, windows=[10, 30])
+    history = []
+
+    for step in range(400):
+        now = step * 0.7
+        value = rng.uniform(-5, 5)
+        series.append(value, now)
+        history.append((now, value))
+
+        for index, seconds in enumerate(series.windows):
+            kept = history[-50:]
+            expected = [v for t, v in kept if t > now - seconds.seconds]
+            result = series.aggregates(index)
+            assert result["count"] == len(expected)
+            assert result["mean"] == pytest.approx(sum(expected) / len(expected))
+            assert result["min"] == min(expected)
+            assert result["max"] == max(expected)
+            assert result["change"] == pytest.approx(expected[-1] - expected[0])
+
+def test_window_is_limited_by_capacity():
+    series = RollingSeries(capacity=5, windows=[1000])
+    for step in range(20):
+        series.append(float(step), step)
+
+    assert len(series) == 5
+    assert series.aggregates()["count"] == 5
+    assert series.aggregates()["min"] == 15.0
+
+def test_capacity_for():
+    assert capacity_for([3600], 60) == 61
+    assert capacity_for([86400 * 365], 0.01) == 100_000
+
+def test_aggregator_skips_errors_and_reports_tendency():
+    aggregator = Aggregator([3600], capacity=100)
+    for step in range(10):
+        aggregator.update({
+            "bme680": {"pressure": 1000.0 - step, "temperature": 20.0},
+            "ds18b20": {"error": "timed out"},
+        }, now=step * 60.0)
+
+    summary = aggregator.summary()
+    assert set(summary) == {"bme680.pressure", "bme680.temperature"}
+    assert summary["bme680.pressure"]["1h"]["change"] == -9.0
+    assert summary["bme680.pressure"]["tendency"] == "falling"
+    assert aggregator.flat()["bme680.temperature.1h.mean"] == 20.0
+
+def test_pressure_tendency():
+    assert pressure_tendency(2.0) == "rising"
+    assert pressure_tendency(-0.5) == "steady"
+    assert pressure_tendency(-1.5) == "falling"
+
+def test_tendency_covers_three_hours_with_shorter_windows():
+    aggregator = Aggregator.for_interval([3600], 60)
+
+    # Pressure rises 0.6 hPa an hour: 1.8 hPa over the tendency window, only 0.6 over 1h
+    for minute in range(181):
+        aggregator.update({"bme680": {"pressure": 1000.0 + minute * 0.01, "temperature": 20.0}}, now=minute * 60.0)
+
+    summary = aggregator.summary()
+    assert summary["bme680.pressure"]["tendency"] == "rising"
+    assert summary["bme680.pressure"]["1h"]["change"] == pytest.approx(0.6, abs=0.02)
+    assert aggregator.series["bme680.temperature"].capacity == 61
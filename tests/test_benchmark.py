@@ -0,0 +1,32 @@
+import os
+from benchmark import bench_output, percentile, run_benchmarks
+from writers import FILE_ONLY_FORMATS, WRITERS
+
+READING = {"bme680": {"temperature": 22.0, "pressure": 1000.0, "humidity": 55.5, "gas_resistance": 12345}}
+
+def test_percentile():
+    values = list(range(1, 101))
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) == 0.0
+
+def test_run_benchmarks_covers_every_output_mode():
+    report = run_benchmarks(cycles=20, latency_scale=0)
+
+    assert report["acquisition"]["readings_per_second"] > 0
+    assert "growth_bytes" in report["memory"]
+    for fmt in WRITERS:
+        assert (f"output.{fmt}.console" in report) == (fmt not in FILE_ONLY_FORMATS)
+        assert report[f"output.{fmt}.file"]["bytes"] > 0
+
+def test_jsonl_write_cost_does_not_grow_with_file_size(tmp_path):
+    path = str(tmp_path / "data.jsonl")
+
+    small = bench_output("jsonl", READING, 200, path)
+    for _ in range(4):
+        bench_output("jsonl", READING, 2000, path)
+    large = bench_output("jsonl", READING, 200, path)
+
+    assert os.path.getsize(path) > 40 * small["bytes"]
+    assert large["mean_us"] < small["mean_us"] * 5 + 50
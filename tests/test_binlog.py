@@ -0,0 +1,114 @@
+import csv
+import io
+import json
+import math
+
+import pytest
+
+from binlog import BinaryWriter, chunk_paths, export, iter_records, load_columns, read_header
+
+READING = {"bme680": {"temperature": 22.0, "pressure": 1013.5, "gas_resistance": 51234}, "ads7830": {"light": 12.5}}
+
+def test_binary_writer_round_trip(tmp_path):
+    base = str(tmp_path / "data.wsb")
+
+    with BinaryWriter(base) as writer:
+        for _ in range(3):
+            writer.write(READING)
+
+    paths = chunk_paths(base)
+    assert len(paths) == 1
+    columns, _ = read_header(paths[0])
+    assert dict(columns)["bme680.gas_resistance"] == "<i8"
+
+    records = list(iter_records(paths[0]))
+    assert len(records) == 3
+    assert records[0]["bme680.temperature"] == 22.0
+    assert records[0]["bme680.gas_resistance"] == 51234
+    assert records[0]["t_wall"] > 0
+
+def test_binary_writer_missing_values_and_new_fields(tmp_path):
+    base = str(tmp_path / "data.wsb")
+
+    with BinaryWriter(base) as writer:
+        writer.write(READING)
+        writer.write({"bme680": {"temperature": 23.0}})
+        writer.write({**READING, "ds18b20": {"28-0001": 19.0}})
+
+    paths = chunk_paths(base)
+    assert len(paths) == 2
+    first = list(iter_records(paths[0]))
+    assert first[1]["bme680.pressure"] is None
+    assert first[1]["bme680.gas_resistance"] is None
+    assert list(iter_records(paths[1]))[0]["ds18b20.28-0001"] == 19.0
+
+def test_binary_writer_continues_existing_capture(tmp_path):
+    base = str(tmp_path / "data.wsb")
+
+    for _ in range(2):
+        with BinaryWriter(base, chunk_records=2) as writer:
+            for _ in range(3):
+                writer.write(READING)
+
+    assert len(chunk_paths(base)) == 4
+
+def test_check_binary_output_looks_at_the_chunks(tmp_path):
+    import main
+
+    base = str(tmp_path / "data.wsb")
+    main.check_binary_output(base, overwrite=False)
+    with BinaryWriter(base) as writer:
+        writer.write(READING)
+
+    with pytest.raises(SystemExit):
+        main.check_binary_output(base, overwrite=False)
+    main.check_binary_output(base, overwrite=True)
+    assert chunk_paths(base) == []
+
+def test_binary_writer_needs_a_file():
+    with pytest.raises(ValueError):
+        BinaryWriter()
+
+def test_load_columns(tmp_path):
+    pytest.importorskip("numpy")
+    base = str(tmp_path / "data.wsb")
+
+    with BinaryWriter(base) as writer:
+        writer.write(READING)
+        writer.write({**READING, "ds18b20": {"28-0001": 19.0}})
+
+    columns = load_columns(chunk_paths(base))
+    assert list(columns["bme680.temperature"]) == [22.0, 22.0]
+    assert math.isnan(columns["ds18b20.28-0001"][0])
+    assert columns["ds18b20.28-0001"][1] == 19.0
+
+def test_export_csv_and_json(tmp_path):
+    base = str(tmp_path / "data.wsb")
+
+    with BinaryWriter(base) as writer:
+        writer.write(READING)
+        writer.write({"bme680": {"temperature": 23.0}})
+
+    out = io.StringIO()
+    assert export(chunk_paths(base), "csv", out) == 2
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert rows[0]["ads7830.light"] == "12.5"
+    assert rows[1]["ads7830.light"] == ""
+
+    out = io.StringIO()
+    export(chunk_paths(base), "json", out)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert records[0]["bme680"]["gas_resistance"] == 51234
+    assert records[1]["bme680"]["temperature"] == 23.0
+
+def test_export_json_keeps_named_instances(tmp_path):
+    base = str(tmp_path / "data.wsb")
+
+    with BinaryWriter(base) as writer:
+        writer.write({"bme680.outdoor": {"temperature": 20.0}, "aggregates": {"bme680.outdoor.temperature.1h.mean": 19.5}})
+
+    out = io.StringIO()
+    export(chunk_paths(base), "json", out)
+    record = json.loads(out.getvalue())
+    assert record["bme680.outdoor"] == {"temperature": 20.0}
+    assert record["aggregates"] == {"bme680.outdoor.temperature.1h.mean": 19.5}
@@ -1,4 +1,6 @@
+import bme680
 import pytest
+from bme680 import constants
 from BME680 import BME680Reader
 
 def test_bme680_read_sensor_nohardware(mock_bme680_sensor):
@@ -12,6 +14,29 @@ def test_bme680_read_sensor_nohardware(mock_bme680_sensor):
         "gas_resistance": 12345
     }
 
+@pytest.mark.parametrize("variant", [0, 1])
+def test_bme680_collect_matches_the_driver_nohardware(fake_bme680_bus, variant):
+    bus = fake_bme680_bus
+    bus.registers[constants.CHIP_VARIANT_ADDR] = variant
+    reader = BME680Reader(_debug_sensor=bme680.BME680(0x77, bus))
+    started = bus.conversions
+
+    reader.trigger()
+    collected = reader.collect()
+    # Collecting reads the conversion trigger started without starting another
+    assert bus.conversions == started + 1
+
+    assert collected == reader.get_readings()
+    assert collected["gas_resistance"] is not None
+
+def test_bme680_collect_gives_up_without_new_data_nohardware(fake_bme680_bus, monkeypatch):
+    bus = fake_bme680_bus
+    reader = BME680Reader(_debug_sensor=bme680.BME680(0x77, bus))
+    bus.registers[constants.FIELD0_ADDR] &= ~constants.NEW_DATA_MSK
+    monkeypatch.setattr("BME680.sleep", lambda seconds: None)
+
+    assert reader.collect() is None
+
 @pytest.mark.hardware
 def test_bme680_read_sensor_hardware():
     try:
@@ -0,0 +1,67 @@
+import threading
+import pytest
+from bus import BusManager
+from ADS7830 import ADS7830Reader
+
+class FlakyBus:
+    def __init__(self, bus_number, failures=0):
+        self.failures = failures
+        self.closed = False
+
+    def read_i2c_block_data(self, addr, register, length):
+        if self.failures:
+            self.failures -= 1
+            raise OSError(121, "Remote I/O error")
+        return [0] * length
+
+    def write_byte_data(self, addr, register, value):
+        pass
+
+    def close(self):
+        self.closed = True
+
+def test_same_bus_number_shares_one_handle():
+    manager = BusManager(FlakyBus)
+
+    assert manager.get(2) is manager.get(2)
+    assert manager.get(2) is not manager.get(1)
+
+def test_transactions_and_bytes_are_counted():
+    manager = BusManager(FlakyBus)
+    bus = manager.get(2)
+
+    bus.read_i2c_block_data(0x77, 0x1D, 17)
+    bus.write_byte_data(0x77, 0x74, 0x25)
+
+    assert manager.stats() == {2: {"transactions": 2, "bytes": 20, "errors": 0, "reopens": 0}}
+
+def test_reopens_once_after_oserror():
+    handles = [FlakyBus(2, failures=1), FlakyBus(2)]
+    manager = BusManager(lambda number: handles.pop(0))
+    bus = manager.get(2)
+
+    assert bus.read_i2c_block_data(0x77, 0x1D, 3) == [0, 0, 0]
+    assert bus.stats()["reopens"] == 1
+    assert bus.stats()["errors"] == 1
+    assert not handles
+
+def test_error_after_reopen_is_raised():
+    manager = BusManager(lambda number: FlakyBus(number, failures=5))
+
+    with pytest.raises(OSError):
+        manager.get(2).read_i2c_block_data(0x77, 0x1D, 3)
+
+def test_readers_share_a_bus_safely(fake_ads7830_bus):
+    bus = BusManager(lambda number: fake_ads7830_bus).get(2)
+    readers = [ADS7830Reader(2, 0x48, bus=bus) for _ in range(4)]
+
+    results = []
+    threads = [threading.Thread(target=lambda r=reader: results.append(r.get_readings())) for reader in readers for _ in range(25)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(result == {f"ch{n}": n * 10 for n in range(8)} for result in results)
+    assert bus.stats()["transactions"] == 100
+    assert bus.stats()["bytes"] == 100 * 16
@@ -0,0 +1,130 @@
+import os
+import socket
+import sys
+import threading
+import time
+import pytest
+from aggregates import Aggregator
+from daemon import SensorDaemon, query_daemon, remove_stale_socket
+from scheduler import MultiRateScheduler
+import main
+
+@pytest.fixture
+def running_daemon(tmp_path):
+    reads = []
+
+    def read(names):
+        reads.append(list(names))
+        return {name: {"value": len(reads)} for name in names}
+
+    daemon = SensorDaemon(read, {"bme680": 0.05, "ds18b20": 0.05}, str(tmp_path / "ws.sock"), aggregator=Aggregator([60], 100))
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+
+    for _ in range(100):
+        if (tmp_path / "ws.sock").exists() and reads:
+            break
+        time.sleep(0.01)
+
+    yield daemon, reads
+
+    daemon.shutdown()
+    thread.join(timeout=1)
+
+def test_query_returns_cached_readings(running_daemon):
+    daemon, reads = running_daemon
+
+    response = query_daemon(daemon.socket_path, ["bme680"])
+
+    assert list(response["readings"]) == ["bme680"]
+    assert "value" in response["readings"]["bme680"]
+    assert response["timestamps"]["bme680"] > 0
+
+def test_concurrent_queries_do_not_read_sensors(running_daemon):
+    daemon, reads = running_daemon
+    before = len(reads)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(query_daemon(daemon.socket_path))) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 20
+    assert all(set(result["readings"]) == {"bme680", "ds18b20"} for result in results)
+    assert len(reads) - before < 20
+
+def test_unknown_sensor_has_error_entry(running_daemon):
+    daemon, _ = running_daemon
+
+    assert "error" in query_daemon(daemon.socket_path, ["ads7830"])["readings"]["ads7830"]
+
+def test_socket_is_removed_on_shutdown(running_daemon, tmp_path):
+    daemon, _ = running_daemon
+    daemon.shutdown()
+    time.sleep(0.1)
+
+    assert not (tmp_path / "ws.sock").exists()
+
+def test_query_aggregates(running_daemon):
+    daemon, reads = running_daemon
+
+    response = query_daemon(daemon.socket_path, ["bme680"], aggregates=True)
+
+    assert list(response["aggregates"]) == ["bme680.value"]
+    assert response["aggregates"]["bme680.value"]["1m"]["count"] >= 1
+
+def test_aggregates_of_named_instances(tmp_path):
+    daemon = SensorDaemon(lambda names: {}, {"bme680": 1, "bme680.outdoor": 1}, str(tmp_path / "ws.sock"), aggregator=Aggregator([60], 100))
+    daemon._aggregator.update({"bme680": {"value": 1.0}, "bme680.outdoor": {"value": 2.0}})
+
+    assert list(daemon.snapshot(["bme680.outdoor"], aggregates=True)["aggregates"]) == ["bme680.outdoor.value"]
+    assert list(daemon.snapshot(["bme680"], aggregates=True)["aggregates"]) == ["bme680.value"]
+
+def test_sampling_goes_on_after_a_failed_read(tmp_path, monkeypatch, capsys):
+    class TwoTicks(MultiRateScheduler):
+        def ticks(self, count=None):
+            return super().ticks(2)
+
+    reads = []
+
+    def read(names):
+        reads.append(names)
+        if len(reads) == 1:
+            raise RuntimeError("bus gone")
+        return {name: {"value": 1.0} for name in names}
+
+    monkeypatch.setattr("daemon.MultiRateScheduler", TwoTicks)
+    daemon = SensorDaemon(read, {"bme680": 0.01}, str(tmp_path / "ws.sock"))
+    daemon.sample_forever()
+
+    assert "bus gone" in capsys.readouterr().err
+    assert daemon.snapshot()["readings"]["bme680"] == {"value": 1.0}
+
+def test_read_from_daemon_reports_an_error_reply(monkeypatch, capsys):
+    monkeypatch.setattr(main, "query_daemon", lambda path, names: {"error": "Bad request: nope"})
+    monkeypatch.setattr(main, "stderr", sys.stderr)
+
+    with pytest.raises(SystemExit):
+        main.read_from_daemon("ws.sock", ["bme680"])
+    assert "Bad request: nope" in capsys.readouterr().err
+
+def test_remove_stale_socket(tmp_path, running_daemon):
+    daemon, _ = running_daemon
+    with pytest.raises(FileExistsError):
+        remove_stale_socket(daemon.socket_path)
+    assert os.path.exists(daemon.socket_path)
+
+    regular = tmp_path / "not-a-socket"
+    regular.write_text("keep me")
+    with pytest.raises(FileExistsError):
+        remove_stale_socket(str(regular))
+    assert regular.read_text() == "keep me"
+
+    stale = str(tmp_path / "stale.sock")
+    left_behind = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    left_behind.bind(stale)
+    left_behind.close()
+    remove_stale_socket(stale)
+    assert not os.path.exists(stale)
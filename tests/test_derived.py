@@ -0,0 +1,55 @@
+import pytest
+
+from derived import DerivedMetrics, air_quality, dew_point, heat_index, sea_level_pressure
+
+def test_scalar_formulas():
+    assert dew_point(20.0, 50.0) == pytest.approx(9.26, abs=0.01)
+    assert heat_index(32.0, 70.0) == pytest.approx(40.6, abs=0.3)
+    assert heat_index(20.0, 50.0) == pytest.approx(19.6, abs=0.5)
+    assert sea_level_pressure(1000.0, 15.0, 0.0) == 1000.0
+    assert sea_level_pressure(950.0, 15.0, 500.0) == pytest.approx(1008, abs=1)
+    assert air_quality(60_000.0, 40.0) == 0
+    assert air_quality(25_000.0, 40.0) > air_quality(45_000.0, 40.0)
+
+def test_apply_adds_metrics_to_matching_sensors():
+    derived = DerivedMetrics(altitude=350)
+    data = {
+        "bme680": {"temperature": 20.0, "humidity": 50.0, "pressure": 980.0, "gas_resistance": 50_000.0},
+        "ds18b20": {"28-0001": 19.0},
+        "ads7830": {"error": "timed out"},
+    }
+
+    derived.apply(data)
+
+    assert set(data["bme680"]) >= {"dew_point", "heat_index", "sea_level_pressure", "iaq"}
+    assert data["ds18b20"] == {"28-0001": 19.0}
+    assert data["ads7830"] == {"error": "timed out"}
+
+def test_apply_skips_impossible_values():
+    data = {"bme680": {"temperature": 20.0, "humidity": 0.0}}
+
+    DerivedMetrics().apply(data)
+
+    assert "dew_point" not in data["bme680"]
+
+def test_columns_match_scalars():
+    np = pytest.importorskip("numpy")
+    derived = DerivedMetrics(altitude=120)
+    temperature = np.array([-5.0, 20.0, 30.0, 35.0, np.nan])
+    humidity = np.array([80.0, 50.0, 90.0, 10.0, 50.0])
+    pressure = np.full(5, 1000.0)
+    gas = np.array([10_000.0, 50_000.0, 80_000.0, 30_000.0, 40_000.0])
+
+    columns = derived.compute_columns({
+        "bme680.temperature": temperature,
+        "bme680.humidity": humidity,
+        "bme680.pressure": pressure,
+        "bme680.gas_resistance": gas,
+    })
+
+    for i in range(4):
+        expected = derived.compute({"temperature": temperature[i], "humidity": humidity[i],
+                                    "pressure": pressure[i], "gas_resistance": gas[i]})
+        for metric, value in expected.items():
+            assert columns[f"bme680.{metric}"][i] == pytest.approx(float(value))
+    assert np.isnan(columns["bme680.dew_point"][4])
@@ -1,10 +1,60 @@
+import os
 import pytest
 from DS18B20 import DS18B20Reader
 
 def test_read_temperature_nohardware(fake_sysfs_ds18b20):
     reader = DS18B20Reader(2, 0x18)
     temp = reader.get_readings()
-    assert round(temp, 3) == 26.312
+    assert temp == {"28-000005e2fdc3": 26.312}
+
+def test_read_multiple_probes_nohardware(fake_sysfs_ds18b20):
+    fake_sysfs_ds18b20.add_probe("28-000005e2aaaa", 18500)
+    fake_sysfs_ds18b20.add_probe("28-000005e2bbbb", -4250)
+
+    reader = DS18B20Reader(2, 0x18)
+
+    assert reader.get_readings() == {
+        "28-000005e2aaaa": 18.5,
+        "28-000005e2bbbb": -4.25,
+        "28-000005e2fdc3": 26.312,
+    }
+    # A probe that hangs mustn't keep the interpreter from exiting
+    assert all(worker._thread.daemon for worker in reader._workers)
+
+def add_bulk_master(fake_sysfs):
+    bulk_read = fake_sysfs.path("/sys/bus/w1/devices/w1_bus_master1/therm_bulk_read")
+    os.makedirs(os.path.dirname(bulk_read))
+    with open(bulk_read, "w") as f:
+        f.write("0\n")
+    return bulk_read
+
+def test_bulk_conversion_is_read_from_temperature_nohardware(fake_sysfs_ds18b20):
+    bulk_read = add_bulk_master(fake_sysfs_ds18b20)
+    # A different value than w1_slave's, to tell where the reading came from
+    with open(fake_sysfs_ds18b20.path("/sys/bus/w1/devices/28-000005e2fdc3/temperature"), "w") as f:
+        f.write("21500\n")
+
+    reader = DS18B20Reader(2, 0x18)
+
+    assert reader.get_readings() == {"28-000005e2fdc3": 21.5}
+    with open(bulk_read) as f:
+        assert f.read() == "trigger\n"
+
+def test_w1_slave_is_read_without_a_bulk_master_nohardware(fake_sysfs_ds18b20):
+    with open(fake_sysfs_ds18b20.path("/sys/bus/w1/devices/28-000005e2fdc3/temperature"), "w") as f:
+        f.write("21500\n")
+
+    reader = DS18B20Reader(2, 0x18)
+
+    assert reader.get_readings() == {"28-000005e2fdc3": 26.312}
+
+def test_crc_failure_reads_as_none_nohardware(fake_sysfs_ds18b20):
+    bad = "a1 01 4b 46 7f ff 0c 10 aa : crc=ab NO\na1 01 4b 46 7f ff 0c 10 aa t=85000\n"
+    fake_sysfs_ds18b20.add_probe("28-000005e2dead", content=bad)
+
+    reader = DS18B20Reader(2, 0x18)
+
+    assert reader.get_readings()["28-000005e2dead"] is None
 
 @pytest.mark.hardware
 def test_read_temperature_hardware():
@@ -15,4 +65,21 @@ def test_read_temperature_hardware():
     
     temp = reader.get_readings()
     assert temp is not None
-    print(f"DS18B20 temperature reading: {temp}")
\ No newline at end of file
+    print(f"DS18B20 temperature reading: {temp}")
+
+def test_split_read_collects_the_bulk_conversion_nohardware(fake_sysfs_ds18b20, monkeypatch):
+    from acquisition import AcquisitionEngine
+    from DS18B20 import constants
+
+    monkeypatch.setattr(constants, "CONVERSION_TIME", 0.01)
+    add_bulk_master(fake_sysfs_ds18b20)
+    with open(fake_sysfs_ds18b20.path("/sys/bus/w1/devices/28-000005e2fdc3/temperature"), "w") as f:
+        f.write("21500\n")
+    reader = DS18B20Reader(2, 0x18)
+    assert reader.conversion_time == 0.0
+
+    engine = AcquisitionEngine({"ds18b20": reader})
+    try:
+        assert engine.read(["ds18b20"]) == {"ds18b20": {"28-000005e2fdc3": 21.5}}
+    finally:
+        engine.close()
@@ -0,0 +1,53 @@
+import configparser
+
+from filters import DeadbandFilter, DeadbandSettings, Downsampler
+
+def section(text):
+    config = configparser.ConfigParser()
+    config.read_string("[sensors.bme680]\n" + text)
+    return config["sensors.bme680"]
+
+def test_settings_from_config():
+    assert DeadbandSettings.from_config(section("address = 0x77")) is None
+
+    settings = DeadbandSettings.from_config(section("deadband = 0.5\ndeadband.pressure = 0.1\nheartbeat = 600"))
+    assert settings == DeadbandSettings(0.5, {"pressure": 0.1}, 600.0)
+
+    assert DeadbandSettings.from_config(section("heartbeat = 60")).default == 0.0
+
+def test_deadband_drops_small_changes():
+    deadband = DeadbandFilter({"bme680": DeadbandSettings(None, {"temperature": 0.5}, None)})
+
+    assert deadband.apply({"bme680": {"temperature": 20.0}}, now=0)
+    assert deadband.apply({"bme680": {"temperature": 20.3}}, now=1) == {}
+    # Compared with the value last written, so slow drift still gets through
+    assert deadband.apply({"bme680": {"temperature": 20.6}}, now=2) == {"bme680": {"temperature": 20.6}}
+    assert deadband.apply({"bme680": {"error": "timed out"}}, now=3) == {"bme680": {"error": "timed out"}}
+
+def test_heartbeat_and_unfiltered_sensors():
+    deadband = DeadbandFilter({"bme680": DeadbandSettings(1.0, {}, 10.0)})
+
+    deadband.apply({"bme680": {"temperature": 20.0}}, now=0)
+    assert deadband.apply({"bme680": {"temperature": 20.0}, "ds18b20": {"a": 1.0}}, now=5) == {"ds18b20": {"a": 1.0}}
+    assert deadband.apply({"bme680": {"temperature": 20.0}}, now=10) == {"bme680": {"temperature": 20.0}}
+
+def test_downsampler_means_each_period():
+    downsampler = Downsampler(60)
+
+    assert downsampler.add({"bme680": {"temperature": 20.0, "status": "ok"}}, 0) is None
+    assert downsampler.add({"bme680": {"temperature": 22.0, "status": "ok"}}, 30) is None
+    assert downsampler.add({"bme680": {"error": "timed out"}}, 45) is None
+
+    finished = downsampler.add({"bme680": {"temperature": 30.0}}, 61)
+    assert finished == {"bme680": {"temperature": 21.0, "status": "ok"}}
+
+    downsampler.add({"ds18b20": {"error": "timed out"}}, 62)
+    assert downsampler.flush() == {"bme680": {"temperature": 30.0}, "ds18b20": {"error": "timed out"}}
+    assert downsampler.flush() is None
+
+def test_downsampler_skips_missing_values():
+    downsampler = Downsampler(60)
+    for second, value in enumerate([20.0, 22.0, None, 30.0]):
+        downsampler.add({"ds18b20": {"28-1": value, "28-2": None, "status": "ok" if second else 1.0}}, 60.0 + second)
+
+    assert downsampler.flush() == {"ds18b20": {"28-1": 24.0, "28-2": None, "status": 1.0}}
@@ -0,0 +1,64 @@
+import main
+from acquisition import AcquisitionEngine
+from instrumentation import STATS, Histogram, Stats
+from simulated import SimulatedReader
+
+def test_histogram_quantiles():
+    histogram = Histogram()
+    for _ in range(98):
+        histogram.observe(0.0008)
+    histogram.observe(0.2)
+    histogram.observe(0.3)
+
+    assert histogram.count == 100
+    assert histogram.quantile(0.5) == 0.001
+    assert histogram.quantile(0.99) == 0.25
+    assert histogram.max == 0.3
+
+def test_disabled_stats_record_nothing():
+    stats = Stats()
+
+    with stats.time("read", "bme680"):
+        pass
+    stats.count_error("bme680")
+    stats.add_bytes("text", 10)
+
+    assert stats.histograms == {} and stats.errors == {} and stats.bytes_written == {}
+
+def test_prometheus_export():
+    stats = Stats(enabled=True)
+    stats.observe("read", "bme680", 0.19)
+    stats.count_error("ds18b20")
+    stats.add_bytes("jsonl", 120)
+
+    text = stats.prometheus({2: {"transactions": 5, "bytes": 40, "errors": 0, "reopens": 0}})
+
+    assert 'weathersensors_stage_seconds_bucket{stage="read",label="bme680",le="0.25"} 1' in text
+    assert 'weathersensors_stage_seconds_count{stage="read",label="bme680"} 1' in text
+    assert 'weathersensors_errors_total{sensor="ds18b20"} 1' in text
+    assert 'weathersensors_bytes_written_total{format="jsonl"} 120' in text
+    assert 'weathersensors_bus_transactions_total{bus="2"} 5' in text
+
+def test_engine_records_per_sensor_latency(monkeypatch):
+    monkeypatch.setattr(STATS, "enabled", True)
+    monkeypatch.setattr(STATS, "histograms", {})
+    engine = AcquisitionEngine({"bme680": SimulatedReader("bme680", latency=0.01)})
+
+    engine.read(["bme680"])
+
+    assert STATS.histograms[("read", "bme680")].count == 1
+    assert STATS.histograms[("read", "bme680")].total >= 0.01
+
+def test_sigusr1_report_waits_for_the_loop(monkeypatch):
+    reports = []
+    monkeypatch.setattr(main, "report_stats", lambda stats_file=None: reports.append(stats_file))
+
+    # Taking the stats lock in the handler would deadlock; it only sets a flag
+    with STATS._lock:
+        main.request_report()
+    assert reports == []
+
+    main.idle_sleep(0, [lambda: main.report_if_requested("stats.prom")])
+    assert reports == ["stats.prom"]
+    main.report_if_requested()
+    assert reports == ["stats.prom"]
@@ -0,0 +1,115 @@
+import gzip
+import io
+import os
+from datetime import date, timedelta
+
+import pytest
+
+from output import ConsoleOutput, OutputFile, OutputOptions, parse_size
+
+def test_parse_size():
+    assert parse_size("512") == 512
+    assert parse_size("64K") == 64 * 1024
+    assert parse_size("10mb") == 10 * 1024 ** 2
+    with pytest.raises(ValueError):
+        parse_size("lots")
+
+def test_output_file_buffers_batches(tmp_path):
+    path = tmp_path / "data.txt"
+    output = OutputFile(str(path), OutputOptions(batch_size=3))
+
+    output.write("a\n")
+    output.write("b\n")
+    assert path.read_text() == ""
+    output.write("c\n")
+    assert path.read_text() == "a\nb\nc\n"
+
+    output.write("d\n")
+    output.close()
+    assert path.read_text() == "a\nb\nc\nd\n"
+
+def test_output_file_flush_interval(tmp_path):
+    path = tmp_path / "data.txt"
+    output = OutputFile(str(path), OutputOptions(batch_size=100, flush_interval=1e-9))
+
+    output.write("a\n")
+    output.write("b\n")
+    assert path.read_text() == "a\nb\n"
+    output.close()
+
+def test_output_file_rotates_by_size(tmp_path):
+    path = tmp_path / "data.txt"
+    output = OutputFile(str(path), OutputOptions(rotate_size=10))
+
+    for line in ("12345\n", "67890\n", "abcde\n"):
+        output.write(line)
+    output.close()
+
+    rotated = sorted(name for name in os.listdir(tmp_path) if name != "data.txt")
+    assert len(rotated) == 2
+    assert all(name.startswith("data.") and name.endswith(".txt") for name in rotated)
+    assert path.read_text() == "abcde\n"
+
+def test_output_file_rotates_daily_and_compresses(tmp_path):
+    path = tmp_path / "data.txt"
+    output = OutputFile(str(path), OutputOptions(rotate_daily=True, compress=True, fsync="close"))
+
+    output.write("yesterday\n")
+    output._day = date.today() - timedelta(days=1)
+    output.write("today\n")
+    output.close()
+
+    compressed = [name for name in os.listdir(tmp_path) if name.endswith(".gz")]
+    assert len(compressed) == 1
+    assert gzip.decompress((tmp_path / compressed[0]).read_bytes()) == b"yesterday\n"
+    assert path.read_text() == "today\n"
+
+def test_console_output_buffers_unless_line_buffered():
+    stream = io.StringIO()
+    console = ConsoleOutput(buffer_size=10, stream=stream)
+
+    console.write("12345\n")
+    assert stream.getvalue() == ""
+    console.write("67890\n")
+    assert stream.getvalue() == "12345\n67890\n"
+
+    console = ConsoleOutput(line_buffered=True, stream=stream)
+    console.write("x\n")
+    assert stream.getvalue().endswith("x\n")
+
+def test_output_file_flush_if_due_and_byte_sizes(tmp_path, monkeypatch):
+    path = tmp_path / "data.txt"
+    clock = [100.0]
+    monkeypatch.setattr("output.monotonic", lambda: clock[0])
+    output = OutputFile(str(path), OutputOptions(batch_size=100, flush_interval=5, rotate_size=8))
+
+    output.write("°°°\n")
+    output.flush_if_due()
+    assert path.read_text(encoding="utf-8") == ""
+    clock[0] += 5
+    output.flush_if_due()
+    assert path.read_text(encoding="utf-8") == "°°°\n"
+
+    # 7 bytes so far, though only 4 characters: another line doesn't fit in 8
+    output.write("x\n")
+    output.flush()
+    output.close()
+    assert path.read_text(encoding="utf-8") == "x\n"
+
+def test_console_output_writes_out_text_held_back_too_long(monkeypatch):
+    stream = io.StringIO()
+    clock = [100.0]
+    monkeypatch.setattr("output.monotonic", lambda: clock[0])
+    console = ConsoleOutput(stream=stream, flush_interval=1.0)
+
+    console.write("a\n")
+    console.flush_if_due()
+    assert stream.getvalue() == ""
+    clock[0] += 1
+    console.flush_if_due()
+    assert stream.getvalue() == "a\n"
+
+    console.write("b\n")
+    clock[0] += 2
+    console.write("c\n")
+    assert stream.getvalue() == "a\nb\nc\n"
@@ -0,0 +1,32 @@
+import random
+
+from resilience import CircuitBreaker, RetryPolicy
+
+def test_retry_delays_are_jittered_and_capped():
+    policy = RetryPolicy(attempts=5, base_delay=0.1, max_delay=0.3)
+    rng = random.Random(0)
+
+    delays = [policy.delay(attempt, rng) for attempt in range(5) for _ in range(50)]
+
+    assert all(0 <= delay <= 0.3 for delay in delays)
+    assert len(set(delays)) > 1
+
+def test_breaker_backs_off_while_probes_fail():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5, max_reset_timeout=15, clock=lambda: now[0])
+
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    for expected_wait in (10, 15, 15):
+        now[0] += breaker.retry_in()
+        assert breaker.allow()
+        assert breaker.state == "half-open"
+        breaker.record_failure()
+        assert breaker.retry_in() == expected_wait
+
+    now[0] += 15
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
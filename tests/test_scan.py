@@ -0,0 +1,64 @@
+import errno
+
+from scan import Device, generate_config, probe_bus, scan
+
+class FakeBus:
+    """An I2C bus with a BME680 at 0x76, a chip with another id at 0x77,
+    an ADS7830 at 0x48 and a DS2482 held by the kernel at 0x18."""
+
+    def __init__(self, number=1):
+        self.closed = False
+
+    def _check(self, address):
+        if address == 0x18:
+            raise OSError(errno.EBUSY, "Device or resource busy")
+        if address not in (0x48, 0x76, 0x77):
+            raise OSError(errno.ENXIO, "No such device or address")
+
+    def read_byte_data(self, address, register):
+        self._check(address)
+        if address == 0x48:
+            return 0x80
+        return 0x61 if address == 0x76 else 0x60
+
+    def write_byte(self, address, value):
+        self._check(address)
+
+    def read_byte(self, address):
+        self._check(address)
+        return 0
+
+    def close(self):
+        self.closed = True
+
+def test_probe_bus_fingerprints_chips():
+    assert probe_bus(FakeBus(), 1) == [
+        Device("ds18b20", 1, 0x18),
+        Device("ads7830", 1, 0x48),
+        Device("bme680", 1, 0x76),
+    ]
+
+def test_scan_skips_buses_that_cannot_be_opened(capsys):
+    def factory(number):
+        if number == 2:
+            raise FileNotFoundError(errno.ENOENT, "No such file or directory")
+        return FakeBus(number)
+
+    devices = scan([1, 2], factory)
+
+    assert {device.bus for device in devices} == {1}
+    assert "Could not open bus 2" in capsys.readouterr().err
+
+def test_generate_config_names_several_sensors_of_a_type():
+    config = generate_config([
+        Device("bme680", 1, 0x76),
+        Device("bme680", 1, 0x77),
+        Device("ads7830", 1, 0x48),
+        Device("ads7830", 2, 0x48),
+        Device("ds18b20", 1, 0x18),
+    ])
+
+    assert "[sensors.bme680.0x76]\naddress = 0x76\nbus = 1\n" in config
+    assert "[sensors.bme680.0x77]" in config
+    assert "[sensors.ads7830.bus2-0x48]\naddress = 0x48\nbus = 2\n" in config
+    assert "[sensors.ds18b20]\n" in config
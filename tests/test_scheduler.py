@@ -0,0 +1,89 @@
+import pytest
+from scheduler import MultiRateScheduler, Scheduler
+
+class FakeClock:
+    def __init__(self, start=1000.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+def make_scheduler(interval, clock, **kwargs):
+    return Scheduler(interval, clock=clock, wall_clock=clock, sleep=clock.sleep, **kwargs)
+
+def test_deadlines_do_not_drift():
+    clock = FakeClock()
+    scheduler = make_scheduler(1.0, clock)
+
+    deadlines = []
+    for tick in scheduler.ticks(5):
+        deadlines.append(tick.deadline)
+        clock.now += 0.3  # time spent reading and writing
+
+    assert deadlines == [1000.0, 1001.0, 1002.0, 1003.0, 1004.0]
+    assert scheduler.overruns == 0
+
+def test_overrun_skips_missed_ticks():
+    clock = FakeClock()
+    scheduler = make_scheduler(1.0, clock)
+
+    ticks = []
+    for tick in scheduler.ticks(3):
+        ticks.append(tick)
+        if tick.index == 0:
+            clock.now += 2.5
+
+    assert [tick.index for tick in ticks] == [0, 3, 4]
+    assert ticks[1].missed == 2
+    assert scheduler.overruns == 1
+    assert scheduler.missed == 2
+
+def test_align_to_wall_clock():
+    clock = FakeClock(start=1012.25)
+    scheduler = make_scheduler(60, clock, align=True)
+
+    tick = next(scheduler.ticks(1))
+
+    assert tick.timestamp % 60 == 0
+    assert tick.deadline == 1020.0
+
+def test_sub_second_interval():
+    clock = FakeClock()
+    ticks = list(make_scheduler(0.25, clock).ticks(4))
+
+    assert [tick.deadline for tick in ticks] == [1000.0, 1000.25, 1000.5, 1000.75]
+
+def test_invalid_interval():
+    with pytest.raises(ValueError):
+        Scheduler(0)
+
+def test_multi_rate_schedule_merges_due_sensors():
+    clock = FakeClock()
+    scheduler = MultiRateScheduler({"fast": 1.0, "slow": 3.0}, clock=clock, wall_clock=clock, sleep=clock.sleep)
+
+    due = [(tick.deadline, names) for tick, names in scheduler.ticks(5)]
+
+    assert due == [
+        (1000.0, ["fast", "slow"]),
+        (1001.0, ["fast"]),
+        (1002.0, ["fast"]),
+        (1003.0, ["fast", "slow"]),
+        (1004.0, ["fast"]),
+    ]
+
+def test_multi_rate_overrun_skips_missed_deadlines():
+    clock = FakeClock()
+    scheduler = MultiRateScheduler({"fast": 1.0, "slow": 4.0}, clock=clock, wall_clock=clock, sleep=clock.sleep)
+
+    ticks = scheduler.ticks(2)
+    next(ticks)
+    clock.now += 2.5
+    tick, names = next(ticks)
+
+    assert tick.deadline == 1003.0
+    assert names == ["fast"]
+    assert tick.missed == 2
+    assert scheduler.overruns == 1
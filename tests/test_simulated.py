@@ -0,0 +1,32 @@
+import pytest
+import main
+from simulated import PROFILES, SimulatedReader
+
+@pytest.mark.parametrize("kind", list(PROFILES))
+def test_simulated_reader_returns_profile_fields(kind):
+    reader = SimulatedReader(kind, latency=0, seed=1)
+
+    assert set(reader.get_readings()) == set(PROFILES[kind]["fields"])
+
+def test_simulated_reader_noise():
+    reader = SimulatedReader("bme680", latency=0, noise=0.001, seed=1)
+    readings = [reader.get_readings()["pressure"] for _ in range(50)]
+
+    assert len(set(readings)) > 1
+    assert all(abs(value - 1013.25) < 10 for value in readings)
+
+def test_simulated_reader_failure_injection():
+    reader = SimulatedReader("ds18b20", latency=0, failure_rate=1.0)
+
+    with pytest.raises(OSError):
+        reader.get_readings()
+
+def test_simulate_without_config_section(tmp_path):
+    config = tmp_path / "sensors.ini"
+    config.write_text("[sensors.bme680]\nsimulate = true\nsim.latency = 0.5\n")
+
+    sensor_configs = main.load_config(str(config), ["bme680", "ds18b20"], simulate=True)
+
+    assert sensor_configs["bme680"].sensor_class is SimulatedReader
+    assert sensor_configs["bme680"].options == {"kind": "bme680", "latency": 0.5}
+    assert sensor_configs["ds18b20"].options == {"kind": "ds18b20"}
@@ -0,0 +1,65 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import main
+
+SRC = Path(__file__).parent.parent / "src"
+
+# Seconds `weathersensors --list` may take from `import main` to exit
+COLD_START_BUDGET = 0.25
+
+LIST_SCRIPT = """
+import sys
+from time import perf_counter
+start = perf_counter()
+sys.argv = ["weathersensors", "--list"]
+import main
+try:
+    main.main()
+except SystemExit:
+    pass
+elapsed = perf_counter() - start
+drivers = sorted({"bme680", "smbus2", "BME680", "DS18B20", "ADS7830"} & set(sys.modules))
+print(elapsed, ",".join(drivers), file=sys.stderr)
+"""
+
+def test_list_cold_start_within_budget():
+    result = subprocess.run(
+        [sys.executable, "-c", LIST_SCRIPT], cwd=SRC, capture_output=True, text=True, check=True
+    )
+    elapsed, _, drivers = result.stderr.strip().partition(" ")
+
+    assert "bme680" in result.stdout
+    assert drivers == "", f"--list imported sensor drivers: {drivers}"
+    assert float(elapsed) < COLD_START_BUDGET
+
+def test_load_config_does_not_construct_sensors(tmp_path, monkeypatch):
+    config = tmp_path / "sensors.ini"
+    config.write_text("[sensors.ds18b20]\naddress = 0x18\nbus = 2\ninterval = 30\n")
+    monkeypatch.setattr(main, "SENSOR_INSTANCES", {})
+
+    sensor_configs = main.load_config(str(config), ["ds18b20"])
+
+    assert list(sensor_configs) == ["ds18b20"]
+    assert sensor_configs["ds18b20"].address == 0x18
+    assert sensor_configs["ds18b20"].interval == 30.0
+    assert main.SENSOR_INSTANCES == {}
+
+def test_named_instances_and_missing_sections(tmp_path):
+    config = tmp_path / "sensors.ini"
+    config.write_text(
+        "[sensors.bme680.indoor]\naddress = 0x76\nbus = 1\n\n"
+        "[sensors.bme680.outdoor]\naddress = 0x77\nbus = 1\n"
+    )
+
+    # Types without a section are left out rather than being an error
+    assert main.select_sensors(str(config)) == ["bme680.indoor", "bme680.outdoor"]
+    assert main.select_sensors(str(config), ["bme680"]) == ["bme680.indoor", "bme680.outdoor"]
+    assert main.select_sensors(str(config), ["bme680.outdoor"]) == ["bme680.outdoor"]
+
+    sensor_configs = main.load_config(str(config))
+
+    assert sensor_configs["bme680.indoor"].address == 0x76
+    assert sensor_configs["bme680.outdoor"].address == 0x77
+    assert sensor_configs["bme680.outdoor"].sensor_class.__name__ == "BME680Reader"
@@ -0,0 +1,83 @@
+import io
+import json
+
+import pytest
+
+from output import OutputOptions
+from store import SQLiteWriter, connect, parse_time, query, write_rows
+
+def fill(path, count, start=1_000_000.0, step=60.0, monkeypatch=None):
+    clock = iter(start + i * step for i in range(count))
+    monkeypatch.setattr("store.time", lambda: next(clock))
+    with SQLiteWriter(f"sqlite:///{path}", options=OutputOptions(batch_size=10)) as writer:
+        for i in range(count):
+            writer.write({
+                "bme680": {"temperature": float(i), "pressure": 1000.0 + i},
+                "ds18b20": {"error": "timed out"} if i == 3 else {"28-0001": 19.0},
+            })
+
+def test_writer_stores_numeric_fields_and_errors(tmp_path, monkeypatch):
+    path = str(tmp_path / "data.db")
+    fill(path, 25, monkeypatch=monkeypatch)
+
+    db = connect(path)
+    assert db.execute("SELECT COUNT(*) FROM readings").fetchone()[0] == 25 * 3 - 1
+    assert db.execute("SELECT sensor, message FROM errors").fetchall() == [("ds18b20", "timed out")]
+
+def test_query_range_and_filters(tmp_path, monkeypatch):
+    path = str(tmp_path / "data.db")
+    fill(path, 25, monkeypatch=monkeypatch)
+
+    rows = list(query(connect(path), 1_000_000.0 + 60 * 5, 1_000_000.0 + 60 * 10, ["bme680"], ["temperature"]))
+
+    assert [row[3] for row in rows] == [5.0, 6.0, 7.0, 8.0, 9.0]
+    assert all(row[1:3] == ("bme680", "temperature") for row in rows)
+
+def test_query_resamples_in_sql(tmp_path, monkeypatch):
+    path = str(tmp_path / "data.db")
+    fill(path, 30, start=0.0, monkeypatch=monkeypatch)
+
+    rows = list(query(connect(path), sensors=["bme680"], fields=["temperature"], resample=600))
+
+    assert [row[0] for row in rows] == [0.0, 600.0, 1200.0]
+    assert rows[0][3:] == (4.5, 0.0, 9.0, 10)
+
+def test_write_rows_json(tmp_path, monkeypatch):
+    path = str(tmp_path / "data.db")
+    fill(path, 2, monkeypatch=monkeypatch)
+
+    out = io.StringIO()
+    assert write_rows(query(connect(path), sensors=["ds18b20"]), None, "json", out) == 2
+    assert json.loads(out.getvalue().splitlines()[0])["field"] == "28-0001"
+
+def test_parse_time():
+    assert parse_time("now", now=1000.0) == 1000.0
+    assert parse_time("10m", now=1000.0) == 400.0
+    assert parse_time("1700000000") == 1_700_000_000.0
+    with pytest.raises(ValueError):
+        parse_time("yesterday")
+
+def test_query_sensor_type_matches_named_instances(tmp_path):
+    path = str(tmp_path / "data.db")
+    with SQLiteWriter(path) as writer:
+        writer.write({"bme680": {"value": 1.0}, "bme680.outdoor": {"value": 2.0}, "bme680x": {"value": 3.0}})
+
+    db = connect(path)
+    assert sorted(row[1] for row in query(db, sensors=["bme680"])) == ["bme680", "bme680.outdoor"]
+    assert [row[1] for row in query(db, sensors=["bme680.outdoor"])] == ["bme680.outdoor"]
+
+def test_failed_flush_is_rolled_back_and_retried(tmp_path, capsys):
+    path = str(tmp_path / "data.db")
+    writer = SQLiteWriter(path, options=OutputOptions(batch_size=100))
+    writer.write({"bme680": {"temperature": 21.0}, "ds18b20": {"error": "timed out"}})
+
+    other = connect(path)
+    other.execute("DROP TABLE errors")
+    writer.flush()
+    assert "Could not write 1 readings" in capsys.readouterr().err
+    assert other.execute("SELECT COUNT(*) FROM readings").fetchone()[0] == 0
+
+    connect(path).close()
+    writer.close()
+    assert other.execute("SELECT COUNT(*) FROM readings").fetchone()[0] == 1
+    assert other.execute("SELECT COUNT(*) FROM errors").fetchone()[0] == 1
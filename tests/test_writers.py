@@ -0,0 +1,133 @@
+import json
+
+import pytest
+
+from output import OutputOptions
+from writers import CSV_HEADER_WAIT, CSVWriter, JSONLinesWriter, JSONWriter, TemplateWriter, compile_template, convert_json_to_jsonl
+
+READING = {"bme680": {"temperature": 22.0, "humidity": 55.5}}
+
+def test_jsonl_writer_appends_one_line_per_reading(tmp_path):
+    path = tmp_path / "data.jsonl"
+
+    with JSONLinesWriter(str(path)) as writer:
+        writer.write(READING)
+        writer.write(READING)
+
+    lines = path.read_text().splitlines()
+    assert len(lines) == 2
+    assert [json.loads(line) for line in lines] == [READING, READING]
+
+def test_jsonl_writer_timestamps(tmp_path):
+    path = tmp_path / "data.jsonl"
+
+    with JSONLinesWriter(str(path), timestamps=True) as writer:
+        writer.write(READING)
+
+    record = json.loads(path.read_text())
+    assert "timestamp" in record
+    assert record["bme680"] == READING["bme680"]
+
+def test_convert_legacy_json(tmp_path):
+    legacy = tmp_path / "data.json"
+    converted = tmp_path / "data.jsonl"
+
+    writer = JSONWriter(str(legacy))
+    for i in range(11):
+        writer.write({"ds18b20": {"temperature": float(i)}})
+
+    assert convert_json_to_jsonl(str(legacy), str(converted)) == 11
+
+    temperatures = [json.loads(line)["ds18b20"]["temperature"] for line in converted.read_text().splitlines()]
+    assert temperatures == [float(i) for i in range(11)]
+
+def test_convert_json_to_jsonl_checks_keys_before_writing(tmp_path):
+    legacy = tmp_path / "data.json"
+    legacy.write_text(json.dumps({"reading_0": READING, "extra": READING}))
+    converted = tmp_path / "data.jsonl"
+
+    with pytest.raises(ValueError):
+        convert_json_to_jsonl(str(legacy), str(converted))
+    assert not converted.exists()
+
+def test_json_writer_appends_to_existing_document(tmp_path):
+    path = tmp_path / "data.json"
+
+    with JSONWriter(str(path)) as writer:
+        writer.write({"ds18b20": {"temperature": 1.0}})
+    with JSONWriter(str(path)) as writer:
+        writer.write({"ds18b20": {"temperature": 2.0}})
+        writer.write({"ds18b20": {"temperature": 3.0}})
+
+    document = json.loads(path.read_text())
+    assert list(document) == ["reading_1", "reading_2", "reading_3"]
+    assert path.read_text() == json.dumps(document, indent=2) + "\n"
+
+def test_jsonl_writer_batches(tmp_path):
+    path = tmp_path / "data.jsonl"
+
+    with JSONLinesWriter(str(path), options=OutputOptions(batch_size=10)) as writer:
+        writer.write(READING)
+        assert path.read_text() == ""
+
+    assert json.loads(path.read_text()) == READING
+
+def test_csv_writer_waits_for_every_sensor_before_the_header(tmp_path):
+    path = tmp_path / "data.csv"
+
+    with CSVWriter(str(path)) as writer:
+        writer.write({"bme680": {"temperature": 22.0, "humidity": 55.5}, "ds18b20": {"error": "Timed out"}})
+        assert path.read_text() == ""
+        writer.write({"bme680": {"temperature": 22.5, "humidity": 55.0}, "ds18b20": {"28-1": 19.5}})
+        writer.write({"bme680": {"error": "No data"}, "ds18b20": {"28-1": 19.0}})
+
+    assert path.read_text().splitlines() == [
+        "bme680.temperature,bme680.humidity,ds18b20.28-1",
+        "22.0,55.5,",
+        "22.5,55.0,19.5",
+        ",,19.0",
+    ]
+
+def test_csv_writer_starts_a_new_file_for_new_columns(tmp_path):
+    path = tmp_path / "data.csv"
+
+    with CSVWriter(str(path)) as writer:
+        writer.write({"bme680": {"temperature": 22.0}})
+        writer.write({"bme680": {"temperature": 22.5, "note": 'a, "b"'}})
+
+    rotated = [file for file in tmp_path.iterdir() if file != path]
+    assert len(rotated) == 1
+    assert rotated[0].read_text().splitlines() == ["bme680.temperature", "22.0"]
+    assert path.read_text().splitlines() == ["bme680.temperature,bme680.note", '22.5,"a, ""b"""']
+
+def test_csv_writer_keeps_one_header_on_the_console(capsys):
+    with CSVWriter() as writer:
+        for _ in range(CSV_HEADER_WAIT):
+            writer.write({"bme680": {"temperature": 22.0}, "ds18b20": {"error": "Timed out"}})
+        writer.write({"bme680": {"temperature": 22.5}, "ds18b20": {"28-1": 19.5}})
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "bme680.temperature"
+    assert lines[1:] == ["22.0"] * CSV_HEADER_WAIT + ["22.5"]
+
+def test_csv_writer_repeats_the_header_after_rotation(tmp_path):
+    path = tmp_path / "data.csv"
+
+    with CSVWriter(str(path), timestamps=True, options=OutputOptions(rotate_size=40)) as writer:
+        for _ in range(3):
+            writer.write(READING)
+
+    for file in tmp_path.iterdir():
+        assert file.read_text().startswith("timestamp,bme680.temperature,bme680.humidity\n")
+
+def test_template_writer(capsys):
+    with TemplateWriter(template="{bme680.temperature:.1f} {bme680.outdoor.humidity:>5} [{bme680.pressure:.1f}] {{x}}") as writer:
+        writer.write({"bme680": {"temperature": 22.04}, "bme680.outdoor": {"humidity": 55.5}})
+        writer.write({"bme680": {"error": "No data"}, "bme680.outdoor": {"humidity": 60}})
+
+    assert capsys.readouterr().out.splitlines() == ["22.0  55.5 [] {x}", "    60 [] {x}"]
+
+def test_compile_template():
+    assert compile_template("{timestamp} {a.b!r:>4}") == ("{0} {1!r:>4}", ["timestamp", "a.b"])
+    with pytest.raises(ValueError):
+        compile_template("{} {a.b}")